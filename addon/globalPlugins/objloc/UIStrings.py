@@ -45,6 +45,9 @@ IG_TOGGLE_CARET_LOCATION_REPORTING = _("Toggle caret location reporting via posi
 # Description for cycling through caret reporting modes in the input gesture dialog
 IG_CYCLE_CARET_MODE = _("Cycle through caret reporting modes")
 
+# Description of the script showing the add-on's performance metrics in the input gesture dialog
+IG_REPORT_METRICS = _("Show performance metrics of positional tones")
+
 # ui.message() when fetching parent object for positional audio and there is no parent to fetch
 MSG_PARENT_NOT_AVAILABLE = _("Parent object not available")
 
@@ -94,6 +97,9 @@ MSG_CARET_TONES_ON = _("Caret location reporting on")
 # ui.message() when positional tones for a caret are switched off via gesture
 MSG_CARET_TONES_OFF = _("Caret location reporting off")
 
+# ui.message() when performance metrics are asked for, but NVDA was not started with them on
+MSG_METRICS_OFF = _("Performance metrics are off, start NVDA with the OBJLOC_METRICS environment variable set to 1")
+
 # UI strings defined in objLocTones 24.06.1
 # =========================================
 
@@ -196,5 +202,69 @@ SET_EASY_TABLE_NAV = _("Play positional tones for cell locations when Easy Table
 
 # Added in 26.1
 SET_MIDI_SYNTHESIZER = _("MIDI synthesizer:")
+# Translators: The first item of the MIDI synthesizer list, that stands for whatever synthesizer the system uses by default
+SET_MIDI_DEFAULT_SYNTHESIZER = _("Default")
+# Translators: 0 means that only whole notes are played, i.e. vertical positions are rounded to the nearest of 128 MIDI notes
+SET_MIDI_BEND_RANGE = _("MIDI pitch bend range in semitones (0 to play whole notes only):")
+
+# Label in settings for how vertical positions are turned into pitches
+SET_PITCH_SCALE = _("Pitch scale:")
+
+# Equal steps in Hz between the lowest and the highest pitch (the classic behaviour)
+SET_PITCH_SCALE_LINEAR = _("Linear")
+
+# Equal musical intervals, i.e. each row is the same number of semitones apart
+SET_PITCH_SCALE_LOG = _("Logarithmic (equal musical steps)")
+
+# Equal steps on the mel scale, which follows how humans perceive pitch distances
+SET_PITCH_SCALE_MEL = _("Mel (equal perceived steps)")
+
+# Pitches are rounded to the notes of the major pentatonic scale
+SET_PITCH_SCALE_PENTATONIC = _("Pentatonic notes")
+
+# DO NOT CHANGE THE ORDER OF CHOICES
+# Choice detection is index based and hard-coded because of settings and translations
+# The index is saved to settings so that it can be unrelated to any locale
+# The order must match posTones.pitchScales
+SET_PITCH_SCALE_CHOICES = [SET_PITCH_SCALE_LINEAR, SET_PITCH_SCALE_LOG, SET_PITCH_SCALE_MEL, SET_PITCH_SCALE_PENTATONIC]
+
+# Label in settings for how positional tones are spread when there is more than one monitor
+SET_MONITORS = _("With multiple monitors, play positions relative to:")
+
+# The whole virtual desktop is treated as one big screen
+SET_MONITORS_DESKTOP = _("All monitors together")
+
+# Each monitor has the full pitch and stereo range for itself
+SET_MONITORS_EACH = _("Each monitor separately")
+
+# Like the above, plus a short tone when a position is on another monitor than the last one
+SET_MONITORS_CUE = _("Each monitor separately, with a cue when moving to another monitor")
+
+# DO NOT CHANGE THE ORDER OF CHOICES
+# Choice detection is index based and hard-coded because of settings and translations
+# The index is saved to settings so that it can be unrelated to any locale
+# The order must match posTones.MONITORS_* constants
+SET_MONITORS_CHOICES = [SET_MONITORS_DESKTOP, SET_MONITORS_EACH, SET_MONITORS_CUE]
+
+# Label in settings for stretching positional tones over an object instead of the screen
+SET_STRETCH = _("Stretch positional tones over:")
+
+# Positions are played relative to the screen (the classic behaviour)
+SET_STRETCH_NONE = _("The screen")
+
+# Positions within the focused editable use the full pitch range, e.g. the caret at the top of a small edit field gives the highest pitch
+SET_STRETCH_EDITABLE = _("The focused editable")
+
+# Positions within the window of the active application use the full pitch range, wherever it is on the screen
+SET_STRETCH_FOREGROUND = _("The foreground window")
+
+# Positions within the table or list holding the navigator object use the full pitch range, e.g. its first row gives the highest pitch
+SET_STRETCH_CONTAINER = _("The table or list being navigated")
+
+# DO NOT CHANGE THE ORDER OF CHOICES
+# Choice detection is index based and hard-coded because of settings and translations
+# The index is saved to settings so that it can be unrelated to any locale
+# The order must match posTones.STRETCH_* constants
+SET_STRETCH_CHOICES = [SET_STRETCH_NONE, SET_STRETCH_EDITABLE, SET_STRETCH_FOREGROUND, SET_STRETCH_CONTAINER]
 
 SET_FOREGROUND_OUTLINE = _("Play an outline of each window when it is brought to foreground")
\ No newline at end of file
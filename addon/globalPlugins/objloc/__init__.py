@@ -16,18 +16,30 @@ import wx
 from scriptHandler   import script, getLastScriptRepeatCount
 from keyboardHandler import KeyboardInputGesture
 from logHandler      import log
+from eventHandler    import isPendingEvents
+from .profiler     import startup
+startup.start("imports")
 from .posTones     import *
 from .utils        import *
 from .geometry     import *
 from .UIStrings    import *
 from .settings     import *
+from .trace        import traced, EVENT_FOREGROUND, EVENT_NAVIGATOR, EVENT_CARET, EVENT_MOUSE, EVENT_KEY
+from .metrics      import timed
 from .             import posTones
+from .             import trace
+from .             import metrics
 from .             import dependencies as deps
 from time          import monotonic as time
+startup.stop()
+
+# Gestures that zoom text in most applications, after which text metrics of editables need to be measured again
+ZOOM_KEYS = ("control+plus", "control+minus", "control+=", "control+0", "control+numpadPlus", "control+numpadMinus", "control+numpad0")
 
 class GlobalPlugin (globalPluginHandler.GlobalPlugin):
     def __init__ (self):
         super(globalPluginHandler.GlobalPlugin, self).__init__()
+        startup.start("settables")
 
         # Configurable attributes
         # Note: Settings() later manages auto save and additional args makes them show in settings panel and react to events there
@@ -37,19 +49,24 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
 
         # Navigation:
         self.active        = Settable(True, # Is real time reporting on or off
-                             label=SET_POSITIONAL_AUDIO, group=SET_GROUP_NAVIGATION,
+                             label=SET_POSITIONAL_AUDIO, group=SET_GROUP_NAVIGATION, profile=False,
                              reactor=self.Toggle, retractor=self.Toggle)
         self.reportOutline = Settable(False, # Automatically report outline of each activated foreground object
-                             label=SET_FOREGROUND_OUTLINE, group=SET_GROUP_NAVIGATION,
+                             label=SET_FOREGROUND_OUTLINE, group=SET_GROUP_NAVIGATION, profile=False,
                              reactor=self.ToggleForegroundOutline, retractor=self.ToggleForegroundOutline)
         self.easyTableNav  = ETN = Settable(True, # Is cell reporting in ETN layered mode enabled or not
-                             label=SET_EASY_TABLE_NAV, group=SET_GROUP_NAVIGATION,
+                             label=SET_EASY_TABLE_NAV, group=SET_GROUP_NAVIGATION, profile=False,
                              reactor=self.ToggleETN, retractor=self.ToggleETN)
         self.duration      = Settable(40, # Duration of a positional tone in Msec
                              label=SET_TONE_DURATION, group=SET_GROUP_NAVIGATION,
                              filter=valset)
+        self.stretchMode   = Settable(SET_STRETCH_CHOICES.index(SET_STRETCH_NONE), # What positions are played relative to, one of posTones.STRETCH_*
+                             choices=tuple(SET_STRETCH_CHOICES), # tuple() means wx.Choice(), instead of wx.ListBox() in settings panel
+                             label=SET_STRETCH, group=SET_GROUP_NAVIGATION,
+                             reactor=lambda e: ( setattr(self, "stretchMode", e.GetSelection()), setattr(posTones, "stretchMode", e.GetSelection()), e.Skip() ),
+                             retractor=lambda attr: ( attr.set(), setattr(posTones, "stretchMode", self.stretchMode) ))
         # Caret:
-        self.caret         = Settable(True, label=SET_CARET, group=SET_GROUP_CARET, # Whether to report caret location in editable fields or not
+        self.caret         = Settable(True, label=SET_CARET, group=SET_GROUP_CARET, profile=False, # Whether to report caret location in editable fields or not
                              reactor=self.ToggleCaret, retractor=self.ToggleCaret)
         self.caretMode     = Settable(SET_CARET_CHOICES.index(SET_CARET_BOTH), # Whether to report vertical, horizontal, both or none of caret movements
                              choices=tuple(SET_CARET_CHOICES), # tuple() means wx.Choice(), instead of wx.ListBox() in settings panel
@@ -70,7 +87,7 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
                              label=SET_MOUSE_MONITOR_TIMEOUT, group=SET_GROUP_MOUSE,
                              filter=valset)
         self.autoMouse     = Settable(False,
-                             label=SET_MOUSE_MONITOR_AUTO_START, group=SET_GROUP_MOUSE,
+                             label=SET_MOUSE_MONITOR_AUTO_START, group=SET_GROUP_MOUSE, profile=False,
                              reactor=self.ToggleMouseMonitorAutostart, retractor=self.ToggleMouseMonitorAutostart)
         self.refPoint      = Settable(SET_MOUSE_REF_CHOICES.index(SET_MOUSE_REF_FOCUS), # Which point location to announce along with the current mouse position
                              choices=tuple(SET_MOUSE_REF_CHOICES), # tuple() means wx.Choice(), instead of wx.ListBox() in settings panel
@@ -79,16 +96,32 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         # Tones:
         # * Temporary controls for MIDI until out of experimental phase
         self.midi          = Settable(False,
-                             label=SET_MIDI, group=SET_GROUP_TONES,
+                             label=SET_MIDI, group=SET_GROUP_TONES, profile=False,
                              reactor=self.ToggleMIDI, retractor=self.ToggleMIDI)
         self.instrument    = Settable(115,
                              choices=tuple(posTones.general_midi_instruments),
                              label=SET_MIDI_INSTRUMENT, group=SET_GROUP_TONES, enabled=False,
                              reactor=self.ChangeInstrument, retractor=self.ChangeInstrument)
-        #self.midiSynth     = Settable(0,
-        #                     choices=tuple(),
-        #                     label=SET_MIDI_SYNTHESIZER, group=SET_GROUP_TONES,
-        #                     finisher=lambda attr: attr.get_gui_control().Set([x[1] for x in posTones.midi.list_output_devices()]))
+        self.midiSynth     = Settable("", # Interface and name of the MIDI synthesizer (see midi.device_key()), "" for the system's default
+                             choices=(SET_MIDI_DEFAULT_SYNTHESIZER,), # Filled by FillSynths() when the panel opens
+                             label=SET_MIDI_SYNTHESIZER, group=SET_GROUP_TONES, enabled=False, profile=False,
+                             filter=(lambda attr, value: "" if value==SET_MIDI_DEFAULT_SYNTHESIZER else value),
+                             adjuster=(lambda attr, value: value or SET_MIDI_DEFAULT_SYNTHESIZER),
+                             finisher=self.FillSynths,
+                             reactor=self.ChangeSynth, retractor=self.ChangeSynth)
+        self.bendRange     = Settable(2, # How far the MIDI pitch bend reaches, fractions of notes between rows are bent within it
+                             label=SET_MIDI_BEND_RANGE, group=SET_GROUP_TONES, enabled=False,
+                             min=0, max=24,
+                             reactor=self.ChangeBendRange, retractor=self.ChangeBendRange)
+        self.pitchScale    = Settable(SET_PITCH_SCALE_CHOICES.index(SET_PITCH_SCALE_LINEAR), # How vertical positions are turned into pitches, index into posTones.pitchScales
+                             choices=tuple(SET_PITCH_SCALE_CHOICES), # tuple() means wx.Choice(), instead of wx.ListBox() in settings panel
+                             label=SET_PITCH_SCALE, group=SET_GROUP_TONES,
+                             reactor=self.ChangePitchScale, retractor=self.ChangePitchScale)
+        self.monitorMode   = Settable(SET_MONITORS_CHOICES.index(SET_MONITORS_DESKTOP), # How tones are spread over multiple monitors, one of posTones.MONITORS_*
+                             choices=tuple(SET_MONITORS_CHOICES), # tuple() means wx.Choice(), instead of wx.ListBox() in settings panel
+                             label=SET_MONITORS, group=SET_GROUP_TONES,
+                             reactor=lambda e: ( setattr(self, "monitorMode", e.GetSelection()), setattr(posTones, "monitorMode", e.GetSelection()), e.Skip() ),
+                             retractor=lambda attr: ( attr.set(), setattr(posTones, "monitorMode", self.monitorMode) ))
         self.lVolume       = Settable(maxVolume, # Volume of positional tones on the left stereo channel, float in range 0.0 to 1.0
                              label=SET_LEFT_VOLUME, group=SET_GROUP_TONES,
                              min=1, max=100, ratio=100,
@@ -101,9 +134,11 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
                              label=SET_SWAP_STEREO_CHANNELS, group=SET_GROUP_TONES,
                              reactor=self.SwapChannels)
         # Make particular dependency related options not show in settings dialog if that add-on is not available
+        startup.start("dependencies")
         ETN.show = deps.checkAddonUsability("easyTableNavigator", logging=False,
                         versionCheck=(lambda addon: addon.version>"2026.7.0"))
         # Load the configurables from settings if possible
+        startup.start("settings")
         self.settings = S = Settings()
         try:
             S.load(self)
@@ -114,8 +149,12 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             self.easyTableNav = False
             ETN.value = False
             ETN.save = False # Do not save the value change in this case, so if ETN returns the setting is valid once more
+        # Per application profiles are switched to by the foreground events
+        S.profiles.listen(self.ApplyProfile)
         # Setup a settings panel
+        startup.start("panel")
         SetPanel(S, self)
+        startup.start("bindings")
 
         # Flow control flags
         self.focusing     = True  # A flag to prevent double beeps on focus of text area children
@@ -141,7 +180,7 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             self.Activate()
         else:
             self.event_becomeNavigatorObject = self._on_passThrough
-            self.event_foreground = self._on_passThrough
+            self.event_foreground = self._on_appSwitch
             if self.caret:
                 self.ActivateCaret()
             else:
@@ -150,14 +189,12 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             self.event_mouseMove = self._on_autoMouseMove
         else:
             self.event_mouseMove = self._on_passThrough
+        self.SyncTones()
         if self.midi:
-            try:
-                posTones.setGenerator("MIDI")
-                posTones.player.set_instrument(self.instrument)
-                self.settings["instrument"].enable = True
-            except:
-                posTones.setGenerator("NVDA")
-                self.midi = False
+            # Only starts the warm-up, the MIDI device is initialized in the background
+            startup.start("midi")
+            self.StartMIDI()
+        startup.finish()
 
     def Activate (self):
         self.event_becomeNavigatorObject = self._on_becomeNavigatorObject
@@ -168,13 +205,13 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         if self.reportOutline:
             self.event_foreground = self._on_foreground
         else:
-            self.event_foreground = self._on_passThrough
+            self.event_foreground = self._on_appSwitch
         self.focusing = True
         self.typing = False
 
     def Deactivate (self):
         self.event_becomeNavigatorObject = self._on_passThrough
-        self.event_foreground = self._on_passThrough
+        self.event_foreground = self._on_appSwitch
         self.DeactivateCaret()
         if self.easyTableNav:
             deps.disableAddonSupport("easyTableNavigator")
@@ -230,6 +267,39 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             pass
         e.Skip()
 
+    def SwitchProfile (self, obj):
+        """
+        Lays the settings profile of the application owning obj, if it has one, over the settings.
+        """
+        try:
+            app = obj.appModule.appName
+        except:
+            return
+        self.settings.profiles.switch(app)
+
+    def ApplyProfile (self, changed):
+        """
+        Called by the settings profiles with the Attribute()s whose values a profile switch changed.
+        Applies those that take effect outside of the plugin, nothing is saved and the panel is not touched.
+        """
+        names = set(attr.name for attr in changed)
+        if "instrument" in names and self.midi:
+            posTones.setInstrument(self.instrument)
+        self.SyncTones(names)
+
+    def SyncTones (self, names=None):
+        """
+        Applies the settings that posTones keeps a copy of, those in names only if given.
+        """
+        if names is None or "bendRange" in names:
+            posTones.setBendRange(self.bendRange)
+        if names is None or "pitchScale" in names:
+            posTones.setPitchScale(self.pitchScale)
+        if names is None or "monitorMode" in names:
+            posTones.monitorMode = self.monitorMode
+        if names is None or "stretchMode" in names:
+            posTones.stretchMode = self.stretchMode
+
     def ChangeVolume (self, e):
         """
         Used primarily to change volume immediately from settings panel.
@@ -260,30 +330,63 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         except:
             pass
 
+    def StartMIDI (self, announce=False):
+        """
+        Switches positional tones to MIDI in the background, see posTones.startMIDI().
+        Beeps are played until the MIDI device is ready.
+        If announce is True, a positional tone is played as soon as MIDI is ready, so the change can be heard.
+        """
+        self.midi = True
+        self.settings["instrument"].enable = True
+        self.settings["midiSynth"].enable  = True
+        self.settings["bendRange"].enable  = True
+        posTones.startMIDI(self.instrument, callback=(lambda status: self._on_midiStatus(status, announce)), synth=self.midiSynth)
+
+    def StopMIDI (self):
+        posTones.setGenerator("NVDA")
+        self.midi = False
+        self.settings["instrument"].enable = False
+        self.settings["midiSynth"].enable  = False
+        self.settings["bendRange"].enable  = False
+
+    def _on_midiStatus (self, status, announce=False):
+        """
+        Called in the main thread when the MIDI warm-up finishes.
+        If the device failed, or did not respond in time, beeps stay and MIDI is turned off.
+        """
+        if not self.midi or getattr(self, "settings", None) is None:
+            # MIDI turned off or the plugin terminated meanwhile
+            return
+        if status!="ready":
+            self.StopMIDI()
+            self.settings.refresh_panel(self, "midi")
+            log.error("MIDI is unavailable (%s): %s" % (status, posTones.midiError))
+            return
+        synth = self.settings["midiSynth"]
+        if synth.has_gui_control():
+            # The panel was opened while MIDI was starting, now the devices are known
+            self.FillSynths(synth)
+        if not announce or not self.active:
+            return
+        try:
+            x, y = getObjectPos(caret=self.caret)
+            playCoordinates(x, y, self.duration, self.lVolume, self.rVolume, self.stereoSwap)
+        except:
+            pass
+
     def ToggleMIDI (self, e):
         if not isinstance(e, wx.Event):
             if self.midi:
-                posTones.setGenerator("NVDA")
-                self.midi = False
-                self.settings["instrument"].enable = False
+                self.StopMIDI()
                 return
-            try:
-                posTones.setGenerator("MIDI")
-                self.settings["instrument"].set()
-                posTones.player.set_instrument(self.instrument)
-                self.midi = True
-                self.settings["instrument"].enable = True
-            except:
-                posTones.setGenerator("NVDA")
-                self.midi = False
+            self.settings["instrument"].set()
+            self.StartMIDI()
             return
         if not e.IsChecked():
             e.Skip()
             if not self.midi:
                 return
-            posTones.setGenerator("NVDA")
-            self.midi = False
-            self.settings["instrument"].enable = False
+            self.StopMIDI()
             if not self.active:
                 return
             try:
@@ -297,23 +400,7 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             e.GetEventObject().SetValue(False)
             return
         e.Skip()
-        try:
-            posTones.setGenerator("MIDI")
-            posTones.player.set_instrument(self.instrument)
-            self.midi = True
-            self.settings["instrument"].enable = True
-            if not self.active:
-                return
-            try:
-                x, y = getObjectPos(caret=self.caret)
-                playCoordinates(x, y, self.duration, self.lVolume, self.rVolume, self.stereoSwap)
-            except:
-                pass
-        except Exception as err:
-            posTones.setGenerator("NVDA")
-            self.midi = False
-            e.GetEventObject().SetValue(False)
-            log.error("Toggling MIDI colossally failed because of "+str(err))
+        self.StartMIDI(announce=True)
 
     def ChangeInstrument (self, e):
         if isinstance(e, wx.Event):
@@ -322,7 +409,57 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         else:
             e.set()
         if self.midi:
-            posTones.player.set_instrument(self.instrument)
+            posTones.setInstrument(self.instrument)
+
+    def ChangeBendRange (self, e):
+        if isinstance(e, wx.Event):
+            self.settings.refresh_instance(self, "bendRange")
+            e.Skip()
+        else:
+            e.set()
+        posTones.setBendRange(self.bendRange)
+
+    def ChangePitchScale (self, e):
+        if isinstance(e, wx.Event):
+            self.pitchScale = e.GetSelection()
+            e.Skip()
+        else:
+            e.set()
+        # Recomputes the tone tables once, instead of on each tone
+        posTones.setPitchScale(self.pitchScale)
+        if not isinstance(e, wx.Event) or not self.active:
+            return
+        # Play coordinates of the current object to hear the new scale immediately
+        try:
+            x, y = getObjectPos(caret=self.caret)
+            playCoordinates(x, y, self.duration, self.lVolume, self.rVolume, self.stereoSwap)
+        except:
+            pass
+
+    def FillSynths (self, attr):
+        """
+        Fills the MIDI synthesizer choice in the settings panel.
+        The list comes from the cached device table, so opening the panel does not enumerate the devices again.
+        While MIDI is off, only the default and the selected synthesizer are listed.
+        """
+        synths = posTones.listSynths() or []
+        if self.midiSynth and self.midiSynth not in synths:
+            # Keep a synthesizer that is currently absent, so that saving the panel does not forget it
+            synths.append(self.midiSynth)
+        ctrl = attr.get_gui_control()
+        ctrl.Set([SET_MIDI_DEFAULT_SYNTHESIZER]+synths)
+        ctrl.SetStringSelection(self.midiSynth or SET_MIDI_DEFAULT_SYNTHESIZER)
+
+    def ChangeSynth (self, e):
+        if isinstance(e, wx.Event):
+            value = e.GetString()
+            self.midiSynth = "" if value==SET_MIDI_DEFAULT_SYNTHESIZER else value
+            e.Skip()
+        else:
+            e.set()
+        if self.midi and self.midiSynth!=posTones.midiSynth:
+            # Reopen MIDI on the newly selected synthesizer, beeps fill in meanwhile
+            self.StartMIDI()
 
     def ToggleCaret (self, e=None):
         """
@@ -376,7 +513,7 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         if switch:
             self.event_foreground = self._on_foreground
         else:
-            self.event_foreground = self._on_passThrough
+            self.event_foreground = self._on_appSwitch
 
     def terminate (self):
         """
@@ -391,14 +528,19 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             posTones.setGenerator("NVDA")
         except:
             pass
+        if posTones.staleTones:
+            log.debug("Object Location Tones dropped %i stale positional tones" % posTones.staleTones)
         try:
             self.settings.save(self)
         except SettingsError as e:
             log.warning(str(e))
+        self.settings.close()
         if self.easyTableNav:
             deps.disableAddonSupport("easyTableNavigator")
         del self.settings
         RemovePanel()
+        trace.recorder.close()
+        metrics.registry.dump()
 
     @script(
         gesture="kb:control+Shift+NumpadDelete",
@@ -551,6 +693,7 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         self.DeactivateMouseMonitor()
         self.Toggle()
         self.settings.refresh_panel(self, "active")
+        self.settings.save(self, defer=True)
         ui.message(MSG_POSITIONAL_TONES_ON if self.active else MSG_POSITIONAL_TONES_OFF)
 
     @script(
@@ -575,6 +718,7 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             self.ToggleCaret()
             msg = MSG_CARET_TONES_ON if self.caret else MSG_CARET_TONES_OFF
         self.settings.refresh_panel(self, "caret")
+        self.settings.save(self, defer=True)
         ui.message(msg)
 
     @script(
@@ -589,8 +733,21 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         mode = 0 if mode==len(SET_CARET_CHOICES) else mode
         self.caretMode = mode
         self.settings.refresh_panel(self, "caretMode")
+        self.settings.save(self, defer=True)
         ui.message(SET_CARET_REPORT+" "+SET_CARET_CHOICES[mode])
 
+    @script(description=IG_REPORT_METRICS, category=IG_CATEGORY)
+    def script_reportMetrics (self, gesture):
+        """
+        Shows p50, p95 and p99 times of event handlers, position lookups, tones and MIDI writes,
+        and also writes them to the NVDA log. Available only when NVDA is started with OBJLOC_METRICS=1.
+        """
+        text = metrics.registry.dump()
+        if text is None:
+            ui.message(MSG_METRICS_OFF)
+            return
+        ui.browseableMessage(text, IG_CATEGORY)
+
     def _on_passThrough (self, obj, nextHandler, *args, **kwargs):
         """
         An event handler that just passes the event to the next handler and does nothing else.
@@ -598,36 +755,59 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         """
         nextHandler()
 
-    def processForeground (self):
+    def processForeground (self, tag=None):
+        if posTones.isStale(tag):
+            # Another window came to foreground during the delay, its own outline is on the way
+            return
         try:
             obj = self.lastForeground or getForegroundObject()
             rect  = BBox(obj)
-            after = playPoints(200, rect.corners, self.duration+20, self.lVolume, self.rVolume, self.stereoSwap)
+            after = playPoints(200, rect.corners, self.duration+20, self.lVolume, self.rVolume, self.stereoSwap, tag)
             if self.caret:
                 try:
                     oX, oY = getCaretPos(obj)
-                    wx.CallLater(after+40, playCoordinates, oX, oY, self.durationCaret+150, self.lVolume, self.rVolume, self.stereoSwap)
-                    wx.CallLater(after+50, setattr, self, "processing", False)
+                    wx.CallLater(after+40, playCoordinates, oX, oY, self.durationCaret+150, self.lVolume, self.rVolume, self.stereoSwap, tag)
+                    wx.CallLater(after+50, self.endProcessing, tag)
                 except:
-                    wx.CallLater(after+10, setattr, self, "processing", False)
+                    wx.CallLater(after+10, self.endProcessing, tag)
             else:
-                wx.CallLater(after+10, setattr, self, "processing", False)
+                wx.CallLater(after+10, self.endProcessing, tag)
             self.focusing = True # Prevent tone in caret event if foreground played successfully
         except:
             self.processing = False
 
+    def endProcessing (self, tag=None):
+        """
+        Clears the processing flag, unless it was taken over by a newer generation meanwhile.
+        """
+        if tag is None or tag==posTones.generation:
+            self.processing = False
+
+    @traced(EVENT_FOREGROUND)
+    @timed("event_foreground")
     def _on_foreground (self, obj, nextHandler):
         try:
             nextHandler()
         finally:
-            if self.processing:
+            self.SwitchProfile(obj)
+            if self.processing and obj is self.lastForeground:
                 return
+            # A newer window takes over, tones still scheduled for the previous one are dropped
             self.processing = True
             self.lastForeground = obj
-            wx.CallLater(150, self.processForeground)
+            wx.CallLater(150, self.processForeground, posTones.newGeneration())
 
     event_foreground = _on_foreground
 
+    def _on_appSwitch (self, obj, nextHandler):
+        """
+        The foreground event handler while outlines are not reported, it only switches the settings profile.
+        """
+        self.SwitchProfile(obj)
+        nextHandler()
+
+    @traced(EVENT_NAVIGATOR)
+    @timed("event_becomeNavigatorObject")
     def _on_becomeNavigatorObject (self, obj, nextHandler, *args, **kwargs):
         """
         Event handler that plays a positional tone upon navigation.
@@ -636,15 +816,22 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         if self.processing:
             nextHandler()
             return
+        tag = posTones.newGeneration()
         try:
             x, y = getObjectPos(obj, caret=self.caret)
-            playCoordinates(x, y, self.duration, self.lVolume, self.rVolume, self.stereoSwap)
-        except:
-            pass
+            if isPendingEvents("gainFocus"):
+                # Focus moved on while the position was being retrieved, the tone would be stale
+                posTones.dropStale()
+            else:
+                playCoordinates(x, y, self.duration, self.lVolume, self.rVolume, self.stereoSwap, tag)
+        except Exception as e:
+            metrics.registry.failed("event_becomeNavigatorObject", e)
         nextHandler()
 
     event_becomeNavigatorObject = _on_becomeNavigatorObject
 
+    @traced(EVENT_CARET)
+    @timed("event_caret")
     def _on_caret (self, obj, nextHandler):
         """
         Event handler that plays a positional tone upon caret movements.
@@ -662,8 +849,8 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             try:
                 x, y = getCaretPos(obj)
                 playCoordinates(x, y, self.durationCaret, self.lVolume, self.rVolume, self.stereoSwap)
-            except:
-                pass
+            except Exception as e:
+                metrics.registry.failed("event_caret", e)
             nextHandler()
             return
         if self.caretMode==3:
@@ -682,12 +869,13 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             try:
                 x, y = getCaretPos(obj)
                 playCoordinates(x, y, self.durationCaret, self.lVolume, self.rVolume, self.stereoSwap)
-            except:
-                pass
+            except Exception as e:
+                metrics.registry.failed("event_caret", e)
         nextHandler()
 
     event_caret = _on_passThrough
 
+    @timed("mouseMonitor timer")
     def _on_mouseMonitor (self, e):
         """
         Timer callback to play positional tones of a mouse cursor location and the current reference point.
@@ -696,7 +884,8 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         try:
             mp     = getCursorPos()
             oX, oY = getObjectPos(caret=self.caret)
-        except:
+        except Exception as e:
+            metrics.registry.failed("mouseMonitor timer", e)
             self.DeactivateMouseMonitor()
             ui.message(MSG_LOCATION_UNAVAILABLE)
             return
@@ -713,38 +902,43 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         wx.CallAfter(playCoordinates, mp[0], mp[1], self.duration+40, self.lVolume, self.rVolume, self.stereoSwap)
         if self.refPoint==0:
             # Play focused objects pos as a ref point
-            wx.CallLater(self.duration+100, playCoordinates, oX, oY, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap)
+            wx.CallLater(self.duration+100, playCoordinates, oX, oY, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap, posTones.generation)
         elif self.refPoint==1:
             # Top left of the foreground window
             try:
                 wlpx, wlpy, _, _ = getForegroundObject().location
-            except:
+            except Exception as e:
+                metrics.registry.failed("mouseMonitor timer", e)
                 return
-            wx.CallLater(self.duration+100, playCoordinates, wlpx, wlpy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap)
+            wx.CallLater(self.duration+100, playCoordinates, wlpx, wlpy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap, posTones.generation)
         elif self.refPoint==2:
             # Center of the foreground window
             try:
                 wcpx, wcpy = getForegroundObject().location.center
-            except:
+            except Exception as e:
+                metrics.registry.failed("mouseMonitor timer", e)
                 return
-            wx.CallLater(self.duration+100, playCoordinates, wcpx, wcpy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap)
+            wx.CallLater(self.duration+100, playCoordinates, wcpx, wcpy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap, posTones.generation)
         elif self.refPoint==3:
             # Top left corner of the screen, that is (0, 0)
-            wx.CallLater(self.duration+100, playCoordinates, 0, 0, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap)
+            wx.CallLater(self.duration+100, playCoordinates, 0, 0, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap, posTones.generation)
         elif self.refPoint==4:
             # Center of the virtual screen as given by the desktop object
             try:
                 dcpx, dcpy = getDesktopObject().location.center
-            except:
+            except Exception as e:
+                metrics.registry.failed("mouseMonitor timer", e)
                 return
-            wx.CallLater(self.duration+100, playCoordinates, dcpx, dcpy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap)
+            wx.CallLater(self.duration+100, playCoordinates, dcpx, dcpy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap, posTones.generation)
         elif self.refPoint==6:
             pspx, pspy = self.startMousePos
-            wx.CallLater(self.duration+100, playCoordinates, pspx, pspy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap)
+            wx.CallLater(self.duration+100, playCoordinates, pspx, pspy, self.duration+70, self.lVolume, self.rVolume, self.stereoSwap, posTones.generation)
         #else:
         #    # None --> Play the same coordinates twice in a row
-        #    wx.CallLater(self.duration+100, playCoordinates, mp[0], mp[1], self.duration+70, self.lVolume, self.rVolume, self.stereoSwap)
+        #    wx.CallLater(self.duration+100, playCoordinates, mp[0], mp[1], self.duration+70, self.lVolume, self.rVolume, self.stereoSwap, posTones.generation)
 
+    @traced(EVENT_MOUSE)
+    @timed("event_mouseMove")
     def _on_mouseMove (self, obj, nextHandler, x, y):
         """
         NVDA event used during mouse monitoring that checks for the current
@@ -755,7 +949,8 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         try:
             fobj = getFocusObject()
             oX, oY = getObjectPos(fobj, caret=self.caret)
-        except:
+        except Exception as e:
+            metrics.registry.failed("event_mouseMove", e)
             self.DeactivateMouseMonitor()
             ui.message(MSG_LOCATION_UNAVAILABLE)
             nextHandler()
@@ -778,20 +973,24 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
             ui.message(MSG_LOCATION_REACHED)
         nextHandler()
 
+    @traced(EVENT_MOUSE)
+    @timed("event_mouseMove auto start")
     def _on_autoMouseMove (self, obj, nextHandler, x, y):
         """
         NVDA event used to auto-start mouse monitoring after a mouse moves.
         """
         try:
             self.entered = (x, y) in BBox(getFocusObject())
-        except:
-            pass
+        except Exception as e:
+            metrics.registry.failed("event_mouseMove auto start", e)
         self.startMousePos = (x, y)
         self.ActivateMouseMonitor()
         nextHandler()
 
     event_mouseMove = _on_passThrough
 
+    @traced(EVENT_KEY)
+    @timed("keyDown")
     def _on_keyDown (self, gesture):
         """
         Notifies other relevant methods that typing has taken  place.
@@ -808,6 +1007,9 @@ class GlobalPlugin (globalPluginHandler.GlobalPlugin):
         # but since we use it only in event_caret() handler it will not cause problems
         # Automatic caret event upon gaining focus should not report, thus last key from previous field shouldn't cause an erroneous report
         self.typing = willEnterText(gesture)
+        if getKeyName(gesture) in ZOOM_KEYS:
+            # Font size of the focused editable might change, let caret positions measure it again
+            invalidateTextMetrics()
 
     def _on_easyTableNav (self, obj, event=None):
         try:
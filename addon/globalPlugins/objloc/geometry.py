@@ -40,3 +40,35 @@ class BBox (object):
             return (self.X1 <= obj[0] <= self.X2) and (self.Y1 <= obj[1] <= self.Y4)
         obj = obj if isinstance(obj, BBox) else BBox(obj)
         return any((xy in self) for xy in obj.corners)
+
+class Frame (object):
+    """
+    A rectangle over which the pitch and the stereo pan ranges of positional tones are spread.
+    E.g. a monitor or the whole virtual desktop.
+    Edges are inclusive, like the screen bounds positional tones always used.
+    """
+    __slots__ = ("left", "top", "width", "height", "right", "bottom", "index", "primary")
+    def __init__ (self, left, top, width, height, index=0, primary=False):
+        self.left    = left
+        self.top     = top
+        self.width   = width
+        self.height  = height
+        self.right   = left+width
+        self.bottom  = top+height
+        self.index   = index # Which monitor, -1 for frames that are not monitors
+        self.primary = primary
+
+    def __contains__ (self, point):
+        x, y = point
+        return self.left <= x <= self.right and self.top <= y <= self.bottom
+
+    def distance (self, x, y):
+        """
+        Returns the squared distance between the point x, y and the nearest point of the frame.
+        """
+        dx = self.left-x if x<self.left else (x-self.right if x>self.right else 0)
+        dy = self.top-y if y<self.top else (y-self.bottom if y>self.bottom else 0)
+        return dx*dx+dy*dy
+
+    def __repr__ (self):
+        return "Frame(%i, %i, %i, %i, index=%i)" % (self.left, self.top, self.width, self.height, self.index)
@@ -0,0 +1,142 @@
+# Part of Object Location Tones
+# Hot path metrics
+# Times the event handlers, position lookups, tone playing and MIDI writes with a monotonic clock,
+# keeps the times in fixed-bucket histograms and counts the exceptions passing through them by type.
+# The metrics are off unless the OBJLOC_METRICS environment variable is set to 1.
+# When off, timed() returns the functions as they are, so they cost nothing.
+# The report, with p50, p95 and p99 of each stage, is written to the NVDA log when the add-on terminates,
+# and on demand by the "report performance metrics" script (no gesture is assigned by default).
+
+from time       import perf_counter_ns as clock
+from bisect     import bisect_left
+from functools  import wraps
+from logHandler import log
+
+import os
+
+__all__ = ["Histogram", "Stage", "Metrics", "registry", "timed"]
+
+# Upper bounds of histogram buckets in nanoseconds: four buckets per octave from 1 us to about 4 s,
+# so a percentile read from the histogram is at most 19% above the real one
+BOUNDS = tuple(int(1000*2**(i/4.0)) for i in range(89))
+
+class Histogram (object):
+    """
+    Counts of samples in the fixed buckets given by BOUNDS, and one more for longer ones.
+    """
+    __slots__ = ("counts", "count", "total", "max")
+    def __init__ (self):
+        self.counts = [0]*(len(BOUNDS)+1)
+        self.count  = 0
+        self.total  = 0
+        self.max    = 0
+
+    def add (self, ns):
+        self.counts[bisect_left(BOUNDS, ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns>self.max:
+            self.max = ns
+
+    def percentile (self, p):
+        """
+        Returns the upper bound of the bucket holding the p-th percentile in nanoseconds, but never more than the maximum.
+        """
+        if not self.count:
+            return 0
+        rank = self.count*p/100.0
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen>=rank and n:
+                return min(BOUNDS[i], self.max) if i<len(BOUNDS) else self.max
+        return self.max
+
+class Stage (object):
+    """
+    Times and errors of one instrumented function.
+    Stages are updated without locking, so samples from different threads at the same moment may rarely be lost,
+    which is fine for statistics and keeps the hot path short.
+    """
+    __slots__ = ("name", "histogram", "errors", "add")
+    def __init__ (self, name):
+        self.name      = name
+        self.histogram = Histogram()
+        self.errors    = {} # Exception type name --> count
+        self.add       = self.histogram.add
+
+    def failed (self, error):
+        """
+        Counts the exception error, or an error description.
+        """
+        name = type(error).__name__ if isinstance(error, BaseException) else str(error)
+        self.errors[name] = self.errors.get(name, 0)+1
+
+class Metrics (object):
+    """
+    The registry of all stages.
+    """
+    def __init__ (self, enabled=False):
+        self.enabled = enabled
+        self.stages  = {}
+
+    def stage (self, name):
+        s = self.stages.get(name)
+        if s is None:
+            s = self.stages[name] = Stage(name)
+        return s
+
+    def failed (self, name, error):
+        """
+        Counts an error of the named stage that was caught elsewhere, e.g. a failed MIDI write reported by the supervisor.
+        """
+        if self.enabled:
+            self.stage(name).failed(error)
+
+    def report (self):
+        """
+        Returns the report as a list of lines of text, with times in microseconds.
+        """
+        lines = ["%-28s %8s %10s %10s %10s %10s  %s" % ("stage", "count", "p50 us", "p95 us", "p99 us", "max us", "errors")]
+        for name in sorted(self.stages):
+            s = self.stages[name]
+            h = s.histogram
+            errors = ", ".join("%s: %i" % e for e in sorted(s.errors.items()))
+            lines.append("%-28s %8i %10.1f %10.1f %10.1f %10.1f  %s" % (name, h.count, h.percentile(50)/1000.0,
+                         h.percentile(95)/1000.0, h.percentile(99)/1000.0, h.max/1000.0, errors))
+        return lines
+
+    def dump (self):
+        """
+        Writes the report to the NVDA log and returns it as text, or returns None if the metrics are off.
+        """
+        if not self.enabled:
+            return None
+        text = "\n".join(self.report())
+        log.info("Object Location Tones performance metrics:\n"+text)
+        return text
+
+def timed (name):
+    """
+    Decorates a function to time its calls as the stage name, and to count exceptions raised through it.
+    When the metrics are off, the function itself is returned.
+    """
+    def decorator (func):
+        if not registry.enabled:
+            return func
+        stage = registry.stage(name)
+        add, failed = stage.add, stage.failed
+        @wraps(func)
+        def wrapper (*args, **kwargs):
+            t = clock()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                failed(e)
+                raise
+            finally:
+                add(clock()-t)
+        return wrapper
+    return decorator
+
+registry = Metrics(os.environ.get("OBJLOC_METRICS", "") not in ("", "0"))
@@ -40,6 +40,9 @@ __all__ = [
     "get_default_output_id",
     "get_device_info",
     "list_output_devices",
+    "output_devices",
+    "device_key",
+    "find_output_device",
     "init",
     "quit",
     "get_init",
@@ -47,7 +50,8 @@ __all__ = [
     "frequency_to_midi",
     "midi_to_frequency",
     "midi_to_ansi_note",
-    "general_midi_instruments"
+    "Supervisor",
+    "SupervisedOutput"
 ]
 
 __theclasses__ = ["Input", "Output"]
@@ -98,10 +102,13 @@ def quit():  # pylint: disable=redefined-builtin
 
     It is safe to call this function more than once.
     """
+    global _devices
     if _module_init():
         # TODO: find all Input and Output classes and close them first?
         _pypm.Terminate()
         _module_init(False)
+    # Device ids are valid only until PortMidi is terminated
+    _devices = None
 
 def get_init():
     """returns True if the midi module is currently initialized
@@ -245,8 +252,54 @@ def get_device_info(an_id):
     _check_init()
     return _pypm.GetDeviceInfo(an_id)
 
-def list_output_devices ():
-    return list(filter(lambda c: (c[3] if c else 0), (get_device_info(x) for x in range(get_count()))))
+_devices = None # Cached [(device_id, device_info), ...] of output devices, see output_devices()
+
+def output_devices (refresh=False):
+    """returns a cached table of output devices
+    output_devices(refresh=False): return [(device_id, interf, name), ...]
+
+    interf and name are decoded to str.
+    The devices are enumerated on the first call after init(), or when refresh is True,
+    later calls return the same list. Note that PortMidi itself sees devices that were
+    added or removed only after quit() and init(), which also clears the table.
+    """
+    return [(device_id, _decode(info[0]), _decode(info[1])) for device_id, info in _device_table(refresh)]
+
+def _device_table (refresh=False):
+    global _devices
+    _check_init()
+    if _devices is None or refresh:
+        infos = ((device_id, _pypm.GetDeviceInfo(device_id)) for device_id in range(_pypm.CountDevices()))
+        _devices = [(device_id, info) for device_id, info in infos if info and info[3]]
+    return _devices
+
+def _decode (s):
+    return s.decode("utf-8", "replace") if isinstance(s, bytes) else str(s)
+
+def device_key (interf, name):
+    """returns a string identifying an output device by its interface and name
+    device_key(interf, name): return str
+
+    Unlike device ids, which follow the order in which the system lists the devices,
+    the key stays the same when devices are added, removed or reordered,
+    so it is what should be stored in settings.
+    """
+    return "%s: %s" % (interf, name)
+
+def find_output_device (key, refresh=False):
+    """returns the id of the output device with the given key
+    find_output_device(key, refresh=False): return device_id
+
+    key is as returned by device_key(). Only the cached device table is searched,
+    see output_devices(). Returns -1 if there is no such device.
+    """
+    for device_id, interf, name in output_devices(refresh):
+        if device_key(interf, name)==key:
+            return device_id
+    return -1
+
+def list_output_devices (refresh=False):
+    return [info for device_id, info in _device_table(refresh)]
 
 class Input:
     """Input is used to get midi input from midi devices.
@@ -642,3 +695,6 @@ class MidiException(Exception):
 
     def __str__(self):
         return repr(self.parameter)
+
+# Needs Output() and the module level functions above, thus imported last
+from .supervisor import *
@@ -1,6 +1,7 @@
-from threading import Thread, Condition
+from threading import Thread, Event
 from time import monotonic as time
 from collections import deque
+from .ring import Ring
 
 class Note (object):
     __slots__ = ("output", "note", "duration", "velocity", "channel", "started", "playing")
@@ -38,7 +39,17 @@ class Note (object):
         return isinstance(other, Note) and self.note==other.note and self.channel==other.channel
 
 class Player (Thread):
-    def __init__ (self, output, duration=-1, velocity=127, channel=0):
+    """
+    Plays notes and sends channel messages from its own thread.
+    All methods only put a command into a lock-free Ring() and return, so the caller
+    (NVDA's main thread) never waits for the output nor contends with the player for a lock.
+    The player thread is woken only when the ring goes from empty to non-empty,
+    otherwise it sleeps until the next playing note is due to stop.
+    The cached channel state (instrument, volume, expression, pan, pitch bend) is updated
+    immediately by the caller, so getters see the new values before they are sent.
+    Commands should come from one thread at a time (see Ring()).
+    """
+    def __init__ (self, output, duration=-1, velocity=127, channel=0, capacity=256):
         Thread.__init__(self)
         self.daemon = True
         self.output = output
@@ -49,92 +60,112 @@ class Player (Thread):
         self.volumes     = {}
         self.expressions = {}
         self.bends       = {}
+        self.pans        = {}
+        self.bend_ranges = {}
+        self.ring    = Ring(capacity)
+        self.wake    = Event()
+        self.queue   = deque() # Playing notes, touched by the player thread only
+        self.dropped = 0       # Commands lost because the ring was full
+        self.running = True
         self.set_volume(1.0)
         self.set_expression(1.0)
         self.set_pitch_bend(0.0)
-        self.queue   = deque()
-        self.waiter  = Condition()
-        self.running = False
         self.start()
 
+    def command (self, func, *args):
+        """
+        Has the player thread call func(*args).
+        """
+        woke = self.ring.push((func, args))
+        if woke:
+            self.wake.set()
+        elif woke is None:
+            self.dropped += 1
+
     def tick (self):
-        with self.waiter:
-            self.waiter.notify()
+        self.wake.set()
 
     def run (self):
-        waiter = self.waiter
-        self.running = True
-        with waiter:
-            waiter.wait()
+        ring = self.ring
+        wake = self.wake
         while self.running:
-            with waiter:
-                timeouts = deque()
-                keep = deque()
-                while self.queue and self.running:
-                    note = self.queue.popleft()
-                    if note.playing and note.duration>=0:
-                        remains = note.duration -(time()-note.started)
-                        if remains>0:
-                            timeouts.append(remains)
-                        else:
-                            note.stop()
-                            continue
-                    elif note.shouldStop():
-                        note.stop()
-                        continue
-                    if note.playing:
-                        keep.append(note)
-                self.queue.extend(keep)
-                if timeouts:
-                    waiter.wait(min(timeouts))
-                else:
-                    waiter.wait()
+            cmd = ring.pop()
+            if cmd is not None:
+                func, args = cmd
+                try:
+                    func(*args)
+                except Exception:
+                    pass
+                continue
+            timeout = self._expire()
+            wake.clear()
+            if ring or not self.running:
+                # A command arrived before clearing, it would not wake us
+                continue
+            wake.wait(timeout)
+        self._stop_notes()
+
+    def _expire (self):
+        """
+        Stops the notes whose time is up and returns seconds until the next one is due, None if none is.
+        """
+        queue = self.queue
+        timeouts = []
+        for note in list(queue):
+            if note.playing and note.duration>=0:
+                remains = note.duration -(time()-note.started)
+                if remains>0:
+                    timeouts.append(remains)
+                    continue
+                note.stop()
+            elif note.playing:
+                continue
+            queue.remove(note)
+        return min(timeouts) if timeouts else None
 
     def quit (self):
         self.running = False
-        self.stop()
-        with self.waiter:
-            self.waiter.notify_all()
-        self.join()
+        self.wake.set()
+        if self.is_alive():
+            self.join()
+        else:
+            self._stop_notes()
 
     def stop (self):
-        waiter = self.waiter
-        with waiter:
-            while True:
-                try:
-                    note = self.queue.popleft()
-                except:
-                    break
-                note.stop()
-            waiter.notify()
+        self.command(self._stop_notes)
+
+    def _stop_notes (self):
+        queue = self.queue
+        while queue:
+            queue.popleft().stop()
 
     def play (self, note, duration=None, velocity=None, channel=None):
         duration = self.duration if duration is None else duration
         velocity = self.velocity if velocity is None else velocity
         channel = self.channel if channel is None else channel
-        waiter = self.waiter
+        self.command(self._play, note, duration, velocity, channel)
+
+    def _play (self, note, duration, velocity, channel):
         n = Note(self.output, note, duration, velocity, channel)
-        with waiter:
-            try:
-                ln = self.queue[-1]
-            except:
-                ln = None
-            if ln==n and ln.playing:
-                ln.started = time()
-                ln.duration = duration if duration<=0 else duration/1000.0
-                if ln.velocity!=velocity:
-                    ln.output.note_off(note, ln.velocity, channel)
-                    ln.velocity = velocity
-                    ln.output.note_on(note, velocity, channel)
-                waiter.notify()
-                return
-            self.queue.append(n.play())
-            waiter.notify()
+        try:
+            ln = self.queue[-1]
+        except IndexError:
+            ln = None
+        if ln==n and ln.playing:
+            ln.started = time()
+            ln.duration = duration if duration<=0 else duration/1000.0
+            if ln.velocity!=velocity:
+                ln.output.note_off(note, ln.velocity, channel)
+                ln.velocity = velocity
+                ln.output.note_on(note, velocity, channel)
+            return
+        self.queue.append(n.play())
 
     def pan (self, left=1.0, right=1.0, channel=None):
         channel = self.channel if channel is None else channel
         n = 64 if left+right==0 else int(round((right / (left + right))*127))
-        self.output.write_short(0xB0 + channel, 10, n)
+        self.pans[channel] = n
+        self.command(self.output.write_short, 0xB0 + channel, 10, n)
         return n
 
     def get_volume (self, channel=None):
@@ -144,8 +175,8 @@ class Player (Thread):
     def set_volume (self, volume=1.0, channel=None):
         channel = self.channel if channel is None else channel
         volume = int(volume*127)
-        self.output.write_short(0xB0 + channel, 7, volume)
         self.volumes[channel] = volume
+        self.command(self.output.write_short, 0xB0 + channel, 7, volume)
 
     volume = property(get_volume, set_volume)
 
@@ -156,8 +187,8 @@ class Player (Thread):
     def set_expression (self, volume=1.0, channel=None):
         channel = self.channel if channel is None else channel
         volume = int(round(volume*127))
-        self.output.write_short(0xB0 + channel, 11, volume)
         self.expressions[channel] = volume
+        self.command(self.output.write_short, 0xB0 + channel, 11, volume)
 
     expression = property(get_expression, set_expression)
 
@@ -167,8 +198,8 @@ class Player (Thread):
 
     def set_instrument (self, instrument=0, channel=None):
         channel = self.channel if channel is None else channel
-        self.output.set_instrument(instrument, channel)
         self.instruments[channel] = instrument
+        self.command(self.output.set_instrument, instrument, channel)
 
     instrument = property(get_instrument, set_instrument)
 
@@ -180,8 +211,66 @@ class Player (Thread):
     def set_pitch_bend (self, bend=0, channel=None):
         channel = self.channel if channel is None else channel
         value = int(bend*8192 if bend<0 else bend*8191)
-        self.output.pitch_bend(value, channel)
         self.bends[channel] = value
+        self.command(self.output.pitch_bend, value, channel)
 
     pitch_bend = property(get_pitch_bend, set_pitch_bend)
 
+    def bend (self, value=0, channel=None, always=False):
+        """
+        Sets the raw 14 bit pitch bend value, from -8192 to 8191, with 0 meaning no bend.
+        Unless always is True, nothing is sent if the channel is already bent that much,
+        so consecutive notes that share the bend cost no extra messages.
+        Returns True if the message was sent.
+        """
+        channel = self.channel if channel is None else channel
+        if not always and self.bends.get(channel)==value:
+            return False
+        self.bends[channel] = value
+        self.command(self.output.pitch_bend, value, channel)
+        return True
+
+    def get_bend_range (self, channel=None):
+        channel = self.channel if channel is None else channel
+        return self.bend_ranges.get(channel, 2.0)
+
+    def set_bend_range (self, semitones=2.0, channel=None):
+        """
+        Sets how far the full pitch bend reaches, in semitones (cents as the fraction),
+        using registered parameter number 0 (pitch bend sensitivity).
+        Synthesizers default to 2 semitones.
+        """
+        channel = self.channel if channel is None else channel
+        self.bend_ranges[channel] = semitones
+        self.command(self._write_bend_range, self.output, semitones, channel)
+
+    bend_range = property(get_bend_range, set_bend_range)
+
+    @staticmethod
+    def _write_bend_range (output, semitones, channel):
+        status = 0xB0 + channel
+        cents = int(round(semitones*100))
+        output.write_short(status, 101, 0) # Select RPN 0
+        output.write_short(status, 100, 0)
+        output.write_short(status, 6, cents//100)  # Data entry, semitones
+        output.write_short(status, 38, cents%100)  # Data entry LSB, cents
+        output.write_short(status, 101, 127) # Deselect, so that stray data entries do not change it
+        output.write_short(status, 100, 127)
+
+    def replay (self, output):
+        """
+        Writes the cached state of all channels (instrument, volume, expression, pan, pitch bend range and pitch bend)
+        to the given output. Used to restore the player's sound on a reopened output.
+        """
+        for channel, instrument in list(self.instruments.items()):
+            output.set_instrument(instrument, channel)
+        for channel, semitones in list(self.bend_ranges.items()):
+            self._write_bend_range(output, semitones, channel)
+        for channel, volume in list(self.volumes.items()):
+            output.write_short(0xB0 + channel, 7, volume)
+        for channel, volume in list(self.expressions.items()):
+            output.write_short(0xB0 + channel, 11, volume)
+        for channel, n in list(self.pans.items()):
+            output.write_short(0xB0 + channel, 10, n)
+        for channel, value in list(self.bends.items()):
+            output.pitch_bend(value, channel)
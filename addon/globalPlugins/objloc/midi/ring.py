@@ -0,0 +1,69 @@
+"""
+Part of the modified midi package (by Dalen Bernaca in 2026 under GPL)
+
+A fixed capacity ring buffer for passing commands from one producer thread
+to one consumer thread without locks.
+
+The slots are preallocated, the producer only ever moves the tail and the
+consumer only ever moves the head. A slot is filled before the tail is moved
+past it and emptied before the head is, and since each of these is a single
+store under the GIL, neither side can see a half written slot.
+Any number of threads may push, as long as they do not do it at the same time
+(e.g. all pushes come from NVDA's main thread, or are otherwise serialized).
+"""
+
+__all__ = ["Ring"]
+
+class Ring (object):
+    """
+    Single producer, single consumer queue of a fixed capacity.
+    push() never blocks nor waits for the consumer, when the ring is full it just returns None, and the item is dropped.
+    push() also tells whether the ring was empty before, so the producer knows
+    when the consumer may be sleeping and needs waking up, and can skip waking it otherwise.
+    """
+    __slots__ = ("slots", "mask", "head", "tail")
+    def __init__ (self, capacity=256):
+        size = 1
+        while size<capacity:
+            size <<= 1
+        self.slots = [None]*size
+        self.mask  = size-1
+        self.head  = 0 # Next slot to read, moved by the consumer only
+        self.tail  = 0 # Next slot to write, moved by the producer only
+
+    @property
+    def capacity (self):
+        return self.mask+1
+
+    def push (self, item):
+        """
+        Appends item. Returns None if the ring is full, and the item was not added,
+        True if the ring was empty before, i.e. the consumer may need waking up, and False otherwise.
+        """
+        tail = self.tail
+        if tail-self.head>self.mask:
+            return None
+        self.slots[tail & self.mask] = item
+        self.tail = tail+1
+        # The head is read again only after the item is published, so if the consumer
+        # took everything before it meanwhile, and may be going to sleep, this says so
+        return self.head==tail
+
+    def pop (self):
+        """
+        Removes and returns the oldest item, or None if the ring is empty.
+        """
+        head = self.head
+        if head==self.tail:
+            return None
+        i = head & self.mask
+        item = self.slots[i]
+        self.slots[i] = None
+        self.head = head+1
+        return item
+
+    def __len__ (self):
+        return self.tail-self.head
+
+    def __bool__ (self):
+        return self.tail!=self.head
@@ -0,0 +1,276 @@
+"""
+Part of the modified midi package (by Dalen Bernaca in 2026 under GPL)
+
+Keeps a MIDI output alive without user's intervention.
+
+Third party synthesizers often stop accepting messages after the computer
+wakes up from sleep or hibernation, or when a virtual machine resumes, and
+devices may appear and disappear at any time. The Supervisor watches the
+output for failed writes, an aborted or closed stream and changes of the
+system's device list. When any of these happens, it reinitializes PortMidi,
+reopens the output with an increasing delay between attempts and replays
+the per-channel state (instrument, volume, expression, pan and pitch bend)
+cached by the attached Player, so that the player continues as if nothing
+happened.
+
+Usage:
+
+    supervisor = Supervisor(get_default_output_id())
+    player = Player(supervisor.output)
+    supervisor.attach(player)
+    supervisor.start()
+    ...
+    player.quit()
+    supervisor.output.close() # Also stops the supervisor, and waits for it
+"""
+
+from threading import Thread, Event, Lock, current_thread
+from time      import monotonic as time
+from .         import Output, init, quit, get_default_output_id
+import sys
+
+__all__ = ["Supervisor", "SupervisedOutput", "device_list_probe"]
+
+def device_list_probe ():
+    """
+    Returns a function that returns a cheap signature of the system's MIDI output device list,
+    or None when no such function is available on this platform.
+    PortMidi does not see device changes until it is reinitialized, so on Windows
+    the number of output devices is asked from the Windows multimedia API directly.
+    """
+    if sys.platform!="win32":
+        return None
+    try:
+        from ctypes import windll
+        count = windll.winmm.midiOutGetNumDevs
+        count()
+    except Exception:
+        return None
+    return count
+
+class SupervisedOutput (object):
+    """
+    Stands in for an Output() and forwards everything to the currently opened one.
+    Writes never raise. A failed write (which includes writes to an aborted or closed output)
+    is reported to the supervisor, and while the output is being reopened, messages are dropped.
+    Writes hold the writing lock, so the output is never closed, nor PortMidi reinitialized, in the middle of one.
+    """
+    def __init__ (self, supervisor, output):
+        self.supervisor = supervisor
+        self.output     = output
+        self.writing    = Lock()
+
+    def write_short (self, status, data1=0, data2=0):
+        with self.writing:
+            o = self.output
+            if o is None:
+                return
+            try:
+                o.write_short(status, data1, data2)
+            except Exception as e:
+                self.supervisor.failed(e, o)
+
+    def write (self, data):
+        with self.writing:
+            o = self.output
+            if o is None:
+                return
+            try:
+                o.write(data)
+            except Exception as e:
+                self.supervisor.failed(e, o)
+
+    def write_sys_ex (self, when, msg):
+        with self.writing:
+            o = self.output
+            if o is None:
+                return
+            try:
+                o.write_sys_ex(when, msg)
+            except Exception as e:
+                self.supervisor.failed(e, o)
+
+    # Higher level writes of Output(), which then go through write_short() above
+    note_on        = Output.note_on
+    note_off       = Output.note_off
+    set_instrument = Output.set_instrument
+    pitch_bend     = Output.pitch_bend
+
+    def close (self):
+        """
+        Stops the supervisor, waiting for it to finish, and closes the real output.
+        """
+        self.supervisor.quit()
+        self.supervisor.join_thread()
+        with self.writing:
+            o, self.output = self.output, None
+        if o is not None:
+            try:
+                o.close()
+            except Exception:
+                pass
+
+    def __getattr__ (self, a):
+        o = self.output
+        if o is None:
+            raise AttributeError(f"'SupervisedOutput' object has no attribute '{a}' while reconnecting")
+        return getattr(o, a)
+
+class Supervisor (Thread):
+    """
+    Watches a MIDI output and reopens it when it stops working.
+    Checks are done every interval seconds and immediately after a failed write.
+    Reconnection attempts are retried with a delay that doubles after each failure,
+    starting at min_backoff and capped at max_backoff seconds.
+    notify, if given, is called from the supervisor's thread with an event name and a detail:
+    ("failed", <error>), ("reconnected", <device id>) or ("retrying", <error>).
+    resolve, if given, is called to get the device id to reopen, instead of reusing the original one.
+    join_timeout is how many seconds closing the output waits for the thread, as reopening may hang in a bad driver.
+    """
+    join_timeout = 5.0
+    def __init__ (self, device_id, latency=0, buffer_size=256, interval=2.0, min_backoff=0.5, max_backoff=30.0,
+                  probe=Ellipsis, resolve=None, notify=None):
+        Thread.__init__(self, name="MIDI output supervisor")
+        self.daemon      = True
+        self.device_id   = device_id
+        self.latency     = latency
+        self.buffer_size = buffer_size
+        self.interval    = interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.probe       = device_list_probe() if probe is Ellipsis else probe
+        self.resolve     = resolve
+        self.notify      = notify
+        self.player      = None
+        self.error       = None  # Last failure, None if healthy
+        self.reconnects  = 0     # Number of successful reconnections
+        self.since       = time() # When was the output (re)opened
+        self.running     = True
+        self.wake        = Event()
+        self.lock        = Lock()
+        self.output = SupervisedOutput(self, Output(device_id, latency, buffer_size))
+
+    def attach (self, player):
+        """
+        Sets the Player() whose cached channel state is replayed after reconnecting.
+        """
+        self.player = player
+
+    @property
+    def healthy (self):
+        return self.error is None
+
+    def failed (self, error, output=None):
+        """
+        Reports a failure of the output. Called by SupervisedOutput() from whichever thread wrote.
+        Failures of an output that was already replaced are ignored.
+        """
+        with self.lock:
+            if output is not None and output is not self.output.output:
+                return
+            if self.error is None:
+                self.error = error
+        self.wake.set()
+
+    def check (self):
+        """
+        Returns an error describing the problem with the current output, or None if it looks fine.
+        """
+        o = self.output.output
+        if o is None or getattr(o, "_output", None) is None:
+            return "MIDI output closed"
+        if o._aborted:
+            return "MIDI output aborted"
+        return None
+
+    def run (self):
+        probe = self.probe
+        signature = probe() if probe else None
+        while self.running:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if not self.running:
+                break
+            if self.error is None:
+                problem = self.check()
+                if problem is None and probe:
+                    try:
+                        current = probe()
+                    except Exception:
+                        current = signature
+                    if current!=signature:
+                        signature = current
+                        problem = "MIDI device list changed"
+                if problem is None:
+                    continue
+                self.failed(problem)
+            if self.notify:
+                self.notify("failed", self.error)
+            self.reconnect()
+            if probe:
+                try:
+                    signature = probe()
+                except Exception:
+                    pass
+
+    def reconnect (self):
+        """
+        Reopens the output, retrying with backoff until it succeeds or the supervisor quits.
+        """
+        delay = self.min_backoff
+        while self.running:
+            try:
+                self._reopen()
+                return True
+            except Exception as e:
+                if self.notify:
+                    self.notify("retrying", e)
+            self.wake.wait(delay)
+            self.wake.clear()
+            delay = min(delay*2, self.max_backoff)
+        return False
+
+    def _reopen (self):
+        # Waits for a write in progress, the writes after it are dropped until the new output is in place
+        with self.output.writing, self.lock:
+            old, self.output.output = self.output.output, None
+        if old is not None:
+            try:
+                old.close()
+            except Exception:
+                pass
+        # PortMidi sees devices that came and went only after reinitialization
+        quit()
+        init()
+        device_id = self.resolve() if self.resolve else self.device_id
+        if device_id is None or device_id<0:
+            device_id = get_default_output_id()
+        o = Output(device_id, self.latency, self.buffer_size)
+        if self.player:
+            self.player.replay(o)
+        with self.output.writing, self.lock:
+            if not self.running:
+                # Closed meanwhile, the new output is not wanted
+                try:
+                    o.close()
+                except Exception:
+                    pass
+                return
+            self.device_id = device_id
+            self.output.output = o
+            self.error = None
+            self.reconnects += 1
+            self.since = time()
+        if self.notify:
+            self.notify("reconnected", device_id)
+
+    def quit (self):
+        self.running = False
+        self.wake.set()
+
+    def join_thread (self):
+        """
+        Waits at most join_timeout seconds for the thread to finish, unless called from the thread itself.
+        """
+        if self.is_alive() and current_thread() is not self:
+            self.join(self.join_timeout)
@@ -0,0 +1,123 @@
+# Part of Object Location Tones
+# Monitor topology
+# Knows where the monitors are on the virtual desktop, so that positional tones
+# can be spread over one monitor at a time, or over the whole virtual desktop,
+# including monitors left of or above the primary one, which have negative coordinates
+
+from .geometry import Frame
+from .utils    import getDesktopObject
+
+import sys
+
+__all__ = ["Topology", "getMonitorRects", "getSignature", "getTopology"]
+
+# GetSystemMetrics() indexes
+SM_XVIRTUALSCREEN  = 76
+SM_YVIRTUALSCREEN  = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+SM_CMONITORS       = 80
+MONITORINFOF_PRIMARY = 1
+
+class Topology (object):
+    """
+    Monitors as Frame()s, and the virtual desktop as the Frame() that bounds them all.
+    monitorAt() looks the monitor of a point up, trying the last found monitor first,
+    as consecutive tones nearly always land on the same one.
+    """
+    def __init__ (self, rects):
+        """
+        rects is a sequence of (left, top, width, height, primary) tuples, one per monitor.
+        """
+        self.monitors = tuple(Frame(l, t, w, h, i, p) for i, (l, t, w, h, p) in enumerate(rects))
+        left   = min(m.left for m in self.monitors)
+        top    = min(m.top for m in self.monitors)
+        right  = max(m.right for m in self.monitors)
+        bottom = max(m.bottom for m in self.monitors)
+        self.desktop = Frame(left, top, right-left, bottom-top, -1)
+        self.last    = self.monitors[0]
+
+    def monitorAt (self, x, y):
+        """
+        Returns the monitor that contains the point x, y.
+        Points in gaps between monitors of different sizes belong to the nearest monitor.
+        Returns None for points outside of the virtual desktop.
+        """
+        m = self.last
+        if m.left <= x <= m.right and m.top <= y <= m.bottom:
+            return m
+        for m in self.monitors:
+            if m.left <= x <= m.right and m.top <= y <= m.bottom:
+                self.last = m
+                return m
+        if (x, y) not in self.desktop:
+            return None
+        return min(self.monitors, key=(lambda m: m.distance(x, y)))
+
+    def __len__ (self):
+        return len(self.monitors)
+
+def getMonitorRects ():
+    """
+    Returns a list of (left, top, width, height, primary) tuples describing all monitors,
+    or None if monitors cannot be enumerated.
+    """
+    if sys.platform!="win32":
+        return None
+    try:
+        from ctypes import windll, Structure, WINFUNCTYPE, POINTER, sizeof, byref
+        from ctypes.wintypes import BOOL, DWORD, RECT, HANDLE, HDC, LPARAM
+        user32 = windll.user32
+    except Exception:
+        return None
+
+    class MONITORINFO (Structure):
+        _fields_ = [("cbSize", DWORD), ("rcMonitor", RECT), ("rcWork", RECT), ("dwFlags", DWORD)]
+
+    rects = []
+    def callback (hMonitor, hdc, rect, data):
+        info = MONITORINFO()
+        info.cbSize = sizeof(info)
+        if user32.GetMonitorInfoW(hMonitor, byref(info)):
+            r = info.rcMonitor
+            rects.append((r.left, r.top, r.right-r.left, r.bottom-r.top, bool(info.dwFlags & MONITORINFOF_PRIMARY)))
+        return True
+    try:
+        user32.EnumDisplayMonitors(None, None, WINFUNCTYPE(BOOL, HANDLE, HDC, POINTER(RECT), LPARAM)(callback), 0)
+    except Exception:
+        return None
+    return rects or None
+
+def getSignature ():
+    """
+    Returns a cheap value that changes whenever monitors are added, removed, moved or resized.
+    """
+    if sys.platform=="win32":
+        try:
+            from ctypes import windll
+            metrics = windll.user32.GetSystemMetrics
+            return (metrics(SM_CMONITORS), metrics(SM_XVIRTUALSCREEN), metrics(SM_YVIRTUALSCREEN),
+                    metrics(SM_CXVIRTUALSCREEN), metrics(SM_CYVIRTUALSCREEN))
+        except Exception:
+            pass
+    return tuple(getDesktopObject().location)
+
+_topology  = None
+_signature = None
+
+def getTopology ():
+    """
+    Returns the Topology() of the current monitors.
+    It is built once and rebuilt only when getSignature() changes.
+    Without monitor enumeration, the desktop object is the only monitor.
+    """
+    global _topology, _signature
+    signature = getSignature()
+    if _topology is None or signature!=_signature:
+        rects = getMonitorRects()
+        if not rects:
+            l, t, w, h = getDesktopObject().location
+            rects = [(l, t, w, h, True)]
+        _topology  = Topology(rects)
+        _signature = signature
+    return _topology
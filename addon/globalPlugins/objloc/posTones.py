@@ -1,11 +1,17 @@
 # Part of Object Location Tones
 # This module contains routines to produce positional tones
 
-from time   import monotonic as time
-from tones  import beep
-from .utils import getDesktopObject
-from .      import midi
-from .midi  import general_midi_instruments
+from time         import monotonic as time
+from math         import log2, log10
+from threading    import Thread, Timer, Lock
+from tones        import beep
+from logHandler   import log
+from .monitors    import getTopology
+from .geometry    import Frame
+from .trace       import recorder
+from .metrics     import registry, timed
+from .utils       import getFocusObject, getForegroundObject, getNavigatorObject, getContainer, isEditable
+from .instruments import general_midi_instruments
 
 import config
 import wx
@@ -22,87 +28,611 @@ lastCoords = (-1, -1, 0.0) # Last coordinates played (for avoiding doubleing ton
                            # values are (x, y, <tone duration>)
 lastPlayed = 0.0           # When was the last tone played (to detect tone doubles requested before their time) (in seconds)
 
-def playCoordinates (x, y, d=40, lVolume=1.0, rVolume=1.0, stereoSwap=False):
+# How positional tones are spread when there is more than one monitor
+# Indexes match UIStrings.SET_MONITORS_CHOICES
+MONITORS_DESKTOP = 0 # Over the whole virtual desktop, as one big screen
+MONITORS_EACH    = 1 # Over each monitor separately, so every monitor has the full pitch and pan range
+MONITORS_CUE     = 2 # Like MONITORS_EACH, but a short cue marks crossing to another monitor
+monitorMode = MONITORS_DESKTOP
+monitorCue  = (1760, 20) # Pitch in Hz and duration in ms of the monitor switch cue
+lastMonitor = -1         # Index of the monitor of the last played tone
+
+# Stretching plays positions relative to a reference object instead of the screen,
+# so that the whole pitch and pan ranges are spread over it
+# Indexes match UIStrings.SET_STRETCH_CHOICES
+STRETCH_NONE       = 0 # Relative to the screen (see monitorMode)
+STRETCH_EDITABLE   = 1 # Relative to the focused editable, if the focus is in one
+STRETCH_FOREGROUND = 2 # Relative to the foreground window
+STRETCH_CONTAINER  = 3 # Relative to the table or list containing the navigator object
+stretchMode = STRETCH_NONE
+
+_reference = [None, None, None, None] # [source object, reference object, its location, its Frame()]
+
+def _referenceObject ():
+    """
+    Returns the object to stretch positions over, according to stretchMode, or None.
+    The source object (focus, foreground or navigator) and the reference found for it are remembered,
+    so e.g. looking for the table of a cell is done once per cell, not once per tone.
+    """
+    if stretchMode==STRETCH_EDITABLE:
+        source = getFocusObject()
+        reference = source if isEditable(source) else None
+    elif stretchMode==STRETCH_FOREGROUND:
+        source = reference = getForegroundObject()
+    elif stretchMode==STRETCH_CONTAINER:
+        source = getNavigatorObject()
+        if source is _reference[0]:
+            return _reference[1]
+        reference = getContainer(source)
+    else:
+        return None
+    _reference[0], _reference[1] = source, reference
+    return reference
+
+def referenceFrame ():
+    """
+    Returns the Frame() of the reference object of stretchMode, or None if there is none.
+    The Frame() is reused until the reference object's location changes.
+    """
+    try:
+        reference = _referenceObject()
+        if reference is None:
+            return None
+        location = reference.location
+    except Exception:
+        return None
+    if not location or location[2]<=0 or location[3]<=0:
+        return None
+    if location==_reference[2] and reference is _reference[1]:
+        return _reference[3]
+    l, t, w, h = location
+    _reference[2], _reference[3] = location, Frame(l, t, w, h, -1)
+    return _reference[3]
+
+def frameAt (x, y):
+    """
+    Returns the Frame() the point x, y should be played relative to,
+    i.e. the reference frame of stretchMode if the point is in it, otherwise the frame
+    given by monitorMode, or None if the point is not on any monitor.
+    """
+    if stretchMode!=STRETCH_NONE:
+        frame = referenceFrame()
+        if frame is not None and (x, y) in frame:
+            return frame
+    topology = getTopology()
+    if monitorMode==MONITORS_DESKTOP:
+        frame = topology.desktop
+        return frame if (x, y) in frame else None
+    return topology.monitorAt(x, y)
+
+# Generations tell tones that are still wanted from stale ones
+# Each focus or foreground change starts a new generation and tones requested
+# for an older one, e.g. scheduled with wx.CallLater(), are dropped instead of played
+generation = 0 # The current generation
+staleTones = 0 # How many stale tones were dropped
+
+def newGeneration ():
+    """
+    Starts a new generation, making all tones tagged with older ones stale, and returns it.
+    """
+    global generation
+    generation += 1
+    return generation
+
+def isStale (tag):
+    """
+    Returns True, and counts the tone as dropped, if tag is a generation older than the current one.
+    A tag of None is never stale.
+    """
+    global staleTones
+    if tag is None or tag==generation:
+        return False
+    staleTones += 1
+    recorder.stale()
+    return True
+
+def dropStale ():
+    """
+    Counts a tone that its caller decided not to play because it became stale.
+    """
+    global staleTones
+    staleTones += 1
+    recorder.stale()
+
+@timed("playCoordinates")
+def playCoordinates (x, y, d=40, lVolume=1.0, rVolume=1.0, stereoSwap=False, tag=None):
     """
     Plays a positional tone for given x and y coordinates,
-    relative to current desktop window size.
+    relative to the reference object (see stretchMode), or to the monitor or the virtual desktop they are on (see monitorMode).
     If the method is called more than once with same coordinates and already playing,
     the duplicate call will not produce any tones.
     If the coordinates represent a point that is located out of the screen,
     the tone will also not be played.
+    If tag is given, the tone is played only if it is still the current generation (see newGeneration()).
     """
-    global lastCoords, lastPlayed
+    global lastCoords, lastPlayed, lastMonitor
+    if isStale(tag):
+        return
     # If the same coordinates were just played, and asked to be played again before the last tone ended
     # just don't do it and that is that.
     t = time()
     lx, ly, ld = lastCoords
     if x==lx and ly==ly and t-lastPlayed<=ld:
         return
-    screenWidth, screenHeight = getDesktopObject().location[2:]
-    if 0 <= x <= screenWidth and 0 <= y <= screenHeight:
-        curPitch = minPitch + ((maxPitch - minPitch) * ((screenHeight - y) / float(screenHeight)))
+    frame = frameAt(x, y)
+    if frame is None:
+        return
+    screenWidth, screenHeight = frame.width, frame.height
+    # Relative to the frame, points in gaps between monitors are moved to the nearest edge
+    fx = min(max(x-frame.left, 0), screenWidth)
+    fy = min(max(y-frame.top, 0), screenHeight)
+    gen  = generator
+    tone = toneTable(screenHeight, gen)[int(fy)]
+    screenWidth = screenWidth or 1
+    if stereoSwap:
+        right = int((85 * ((screenWidth - float(fx)) / screenWidth)) * rVolume)
+        left  = int((85 * (float(fx) / screenWidth)) * lVolume)
+    else:
+        left  = int((85 * ((screenWidth - float(fx)) / screenWidth)) * lVolume)
+        right = int((85 * (float(fx) / screenWidth)) * rVolume)
+    lastPlayed = t
+    lastCoords = (x, y, d/1000.0)
+    switched = frame.index>=0 and lastMonitor>=0 and lastMonitor!=frame.index
+    if frame.index>=0:
+        lastMonitor = frame.index
+    if switched and monitorMode==MONITORS_CUE:
+        # Tells where the new monitor is by panning the cue, the tone follows right after it
+        cueHz, cueDuration = monitorCue
+        desktop = getTopology().desktop
+        pan = ((frame.left+frame.width/2.0)-desktop.left)/(desktop.width or 1)
         if stereoSwap:
-            right = int((85 * ((screenWidth - float(x)) / screenWidth)) * rVolume)
-            left  = int((85 * (float(x) / screenWidth)) * lVolume)
-        else:
-            left  = int((85 * ((screenWidth - float(x)) / screenWidth)) * lVolume)
-            right = int((85 * (float(x) / screenWidth)) * rVolume)
-        generator(curPitch, d, left=left, right=right)
-        lastPlayed = t
-        lastCoords = (x, y, d/1000.0)
+            pan = 1-pan
+        # Played by the current generator, so with MIDI the cue comes in the chosen instrument
+        cue = cueTone(cueHz, gen)
+        cueLeft, cueRight = int(60*(1-pan)*lVolume), int(60*pan*rVolume)
+        gen(cue, cueDuration, left=cueLeft, right=cueRight)
+        recorder.tone(cue, cueDuration, cueLeft, cueRight)
+        wx.CallLater(cueDuration+10, _playLater, tag, gen, tone, d, left, right)
+        lastPlayed += (cueDuration+10)/1000.0
+        return
+    gen(tone, d, left=left, right=right)
+    recorder.tone(tone, d, left, right)
+
+def _playLater (tag, gen, tone, d, left, right):
+    if isStale(tag):
+        return
+    gen(tone, d, left=left, right=right)
+    recorder.tone(tone, d, left, right)
 
-def playPoints (delay, points, d=40, lVolume=1.0, rVolume=1.0, stereoSwap=False):
+def playPoints (delay, points, d=40, lVolume=1.0, rVolume=1.0, stereoSwap=False, tag=None):
     """
     Plays a sequence of coordinates with delay between them.
     It does it by using wx.CallAfter() and wx.CallLater() to schedule playCoordinates() calls.
     points need to be a sequence of points that can be unpacked to x and y.
     delay is in milliseconds.
-    All other arguments are passed to each playCoordinates() call in turn.
+    All other arguments are passed to each playCoordinates() call in turn,
+    so with a tag, the remaining points are dropped as soon as a new generation starts.
     Returns a number of milliseconds necessary to play the next point
     after the playPoints is done, using the same delay.
     Substracting the delay value from returned value will tell you exactly how long will take to play all the points.
     """
     i = iter(points)
     x, y = next(i)
-    wx.CallAfter(playCoordinates, x, y, d, lVolume, rVolume, stereoSwap)
+    wx.CallAfter(playCoordinates, x, y, d, lVolume, rVolume, stereoSwap, tag)
     after = d+delay
     for x, y in i:
-        wx.CallLater(after, playCoordinates, x, y, d, lVolume, rVolume, stereoSwap)
+        wx.CallLater(after, playCoordinates, x, y, d, lVolume, rVolume, stereoSwap, tag)
         after += d+delay
     return after
 
 player = None
+midi   = None # The midi package, imported by loadMIDI() only when MIDI is actually requested
 
-def note (pitch, duration, left=100, right=100):
-    note = int(round(((pitch-minPitch)/maxPitch)*127))
-    #note  = int(scale)
-    #bend  = scale-note
+def loadMIDI ():
+    """
+    Imports the midi package on first use and returns it.
+    MIDI is off by default, so there is no point in paying for the package,
+    and later for its native pypm binary, on each NVDA start.
+    """
+    global midi
+    if midi is None:
+        from . import midi as m
+        midi = m
+    return midi
+
+bendRange  = 2.0   # How far the MIDI pitch bend reaches in semitones, 0 to play plain notes without bending them
+resendBend = False # Send the pitch bend before each note, even if unchanged (for synthesizers that reset it by themselves)
+
+def note (tone, duration, left=100, right=100):
+    """
+    Plays a MIDI note. tone is a (note, bend) pair from noteTable().
+    """
+    n, bend = tone
     player.pan(left, right)
-    #player.set_pitch_bend(bend)
+    if bendRange:
+        player.bend(bend, always=resendBend)
     v = ((left/85) +(right/85))*0.8
     player.set_expression(v)
-    player.play(note, duration)
-    #wx.CallLater(duration, player.tick)
-    #player.tick(duration)
+    player.play(n, duration)
 
-def none (pitch, duration, left, right):
+def none (tone, duration, left, right):
     pass
 
+def hzToNote (hz):
+    """
+    Returns the MIDI note of the pitch hz in Hz, with a fraction, note 69 being A4 at 440 Hz.
+    """
+    return 69+12*log2(hz/440.0) if hz>0 else 0.0
+
+def cueTone (hz, gen):
+    """
+    Returns the tone that plays the pitch hz in Hz on the generator gen, e.g. a cue outside of the tone tables.
+    """
+    if gen is note:
+        return (min(127, max(0, int(round(hzToNote(hz))))), 0)
+    return hz
+
 generator = beep
 
-def setGenerator (name="NVDA"):
+# Pitch scales map a vertical position t, from 0.0 at the bottom to 1.0 at the top, to a pitch between low and high Hz
+def linearScale (t, low, high):
+    return low + (high-low)*t
+
+def logScale (t, low, high):
+    """
+    Rows are equal musical intervals apart.
+    """
+    if low<=0:
+        return linearScale(t, low, high)
+    return low*(high/low)**t
+
+def melScale (t, low, high):
+    """
+    Rows are equally apart on the mel scale, i.e. as humans perceive pitch distances.
+    """
+    low, high = 2595*log10(1+low/700.0), 2595*log10(1+high/700.0)
+    return 700*(10**((low + (high-low)*t)/2595)-1)
+
+_pentatonic = (0, 2, 4, 7, 9) # Semitones of the major pentatonic scale above C
+
+def pentatonicScale (t, low, high):
+    """
+    Like logScale(), but rounded to the nearest note of the major pentatonic scale,
+    so that neighbouring rows form steps of a musical scale.
+    """
+    hz = logScale(t, low, high)
+    if hz<=0:
+        return hz
+    m = hzToNote(hz)
+    k = int(round(m))
+    n = min((n for n in range(k-2, k+3) if n%12 in _pentatonic), key=(lambda n: abs(n-m)))
+    return float(min(high, max(low, 440.0*2**((n-69)/12.0))))
+
+pitchScales = [linearScale, logScale, melScale, pentatonicScale] # Indexed by the pitchScale setting
+pitchScale  = linearScale
+
+def setPitchScale (scale):
+    """
+    Selects the pitch scale by its index in pitchScales, or by the function itself.
+    """
+    global pitchScale
+    pitchScale = pitchScales[scale] if isinstance(scale, int) else scale
+    invalidateTones()
+
+# Tone tables map each pixel row of a frame, top row first, to whatever the generator plays,
+# so that no pitch computation is done while playing
+_tables = {} # (table builder, frame height) --> table
+
+def hzTable (height):
+    """
+    Returns pitches in Hz for rows 0 to height of a frame that is height pixels tall, according to pitchScale.
+    """
+    span  = float(height) or 1.0
+    scale = pitchScale
+    return [scale((height-y)/span, minPitch, maxPitch) for y in range(height+1)]
+
+def noteTable (height):
+    """
+    Returns (note, bend) pairs for rows 0 to height of a frame that is height pixels tall.
+    Each row plays the pitch hzTable() gives it, so MIDI follows the pitch scale just like beeps do:
+    the nearest MIDI note, and the remaining fraction of a note as a 14 bit pitch bend relative to bendRange,
+    so the vertical resolution is not limited to whole notes.
+    """
+    table = []
+    for hz in hzTable(height):
+        position = hzToNote(hz)
+        n = min(127, max(0, int(round(position))))
+        bend = int(round((position-n)*8192/bendRange)) if bendRange else 0
+        table.append((n, min(8191, max(-8192, bend))))
+    return table
+
+_builders = {note: noteTable} # Generator --> its table builder, others play Hz
+
+def toneTable (height, gen=None):
+    """
+    Returns a cached tone table of the given generator (the current one by default) for a frame height pixels tall.
+    """
+    builder = _builders.get(generator if gen is None else gen, hzTable)
+    key = (builder, height)
+    table = _tables.get(key)
+    if table is None:
+        if len(_tables)>=16:
+            _tables.clear()
+        table = _tables[key] = builder(height)
+    return table
+
+def invalidateTones ():
+    """
+    Drops all tone tables. Call after changing anything they are computed from.
+    """
+    _tables.clear()
+
+def setBendRange (semitones):
+    """
+    Sets bendRange and applies it to the player, if MIDI is running.
+    """
+    global bendRange
+    bendRange = semitones
+    invalidateTones()
+    with _lock:
+        if player:
+            if semitones:
+                player.set_bend_range(semitones)
+            else:
+                player.bend(0)
+
+# MIDI health, as seen by the rest of the add-on
+midiStatus  = "off" # One of "off", "starting", "ready", "reconnecting", "failed" or "timeout"
+midiError   = None  # Description of the reason for "reconnecting", "failed" or "timeout" status
+midiSynth   = ""    # Key of the MIDI synthesizer to use (see midi.device_key()), "" for the system's default
+midiTimeout = 10.0  # Seconds to wait for a MIDI device to become ready before giving up on it
+warmUp      = None  # The last WarmUp() thread started
+_lock       = Lock() # Makes switching of the player and the generator atomic in relation to the warm-up
+
+def _openMIDI (instrument=None):
+    """
+    Initializes the midi package, opens the default MIDI output and returns a Player() for it.
+    The output is watched by a midi.Supervisor() that reopens it if the synthesizer stops working,
+    e.g. after sleep or hibernation, so MIDI keeps working without user's intervention.
+    This can block for a very long time with misbehaving third party synthesizers.
+    """
+    loadMIDI().init()
+    supervisor = midi.Supervisor(resolveSynth(), resolve=resolveSynth, notify=_on_midiEvent)
+    if registry.enabled:
+        # All messages, notes included, go through the output's write_short()
+        supervisor.output.write_short = timed("midi.write")(supervisor.output.write_short)
+    p = midi.Player(supervisor.output)
+    supervisor.attach(p)
+    supervisor.start()
+    if bendRange:
+        p.set_bend_range(bendRange)
+    if instrument is not None:
+        p.set_instrument(instrument)
+    return p
+
+def resolveSynth ():
+    """
+    Returns the device id of the MIDI synthesizer selected by midiSynth,
+    or of the system's default one, if none is selected or the selected one is not present.
+    The device is looked up in midi's cached device table, so PortMidi's devices are
+    enumerated once per its initialization, i.e. when MIDI is turned on and after the output fails.
+    """
+    if midiSynth:
+        device_id = midi.find_output_device(midiSynth)
+        if device_id>=0:
+            return device_id
+        log.warning("MIDI synthesizer %r is not available, using the default one" % midiSynth)
+    return midi.get_default_output_id()
+
+def listSynths ():
+    """
+    Returns the keys of available MIDI synthesizers from the cached device table,
+    or None if MIDI is not running, so that the list cannot be obtained without initializing the device.
+    """
+    with _lock:
+        if player is None:
+            return None
+        return [midi.device_key(interf, name) for device_id, interf, name in midi.output_devices()]
+
+def _releasePlayer (p):
+    """
+    Stops the player, closes its output and stops the output's supervisor, but leaves PortMidi initialized.
+    """
+    p.quit()
+    if isinstance(p, midi.Player):
+        p.output.close() # Stops the supervisor as well
+
+def _closePlayer (p):
+    _releasePlayer(p)
+    if isinstance(p, midi.Player):
+        midi.quit()
+
+def _on_midiEvent (event, detail):
+    """
+    Receives notifications from the midi.Supervisor() thread.
+    While the output is being reopened, tones are not switched to beeps, they are just dropped.
+    """
+    global midiStatus, midiError
+    if event=="failed":
+        log.warning("MIDI output stopped working (%s), reconnecting..." % detail)
+        registry.failed("midi.write", detail)
+        with _lock:
+            if midiStatus=="ready":
+                midiStatus = "reconnecting"
+                midiError  = str(detail)
+    elif event=="reconnected":
+        log.info("MIDI output reopened on device %s" % detail)
+        with _lock:
+            if midiStatus=="reconnecting":
+                midiStatus = "ready"
+                midiError  = None
+    elif event=="retrying":
+        log.debug("Reopening MIDI output failed because of %s, retrying..." % repr(detail))
+
+class WarmUp (Thread):
+    """
+    Initializes the MIDI device in the background, so that NVDA does not wait for it.
+    Until the device is ready, tones are left to tones.beep().
+    When ready, the player is published first and the generator switched to note() right after,
+    both under the lock, so a tone is either a beep or a complete MIDI note.
+    If the device is not ready in time, the status becomes "timeout", and if the thread
+    ever finishes afterwards, it closes what it opened.
+    """
+    def __init__ (self, instrument=None, callback=None, timeout=None):
+        Thread.__init__(self, name="Object Location Tones MIDI warm-up")
+        self.daemon     = True
+        self.instrument = instrument
+        self.callback   = callback
+        self.cancelled  = False
+        self.timer      = None
+        self.arm(timeout)
+
+    def arm (self, timeout=None):
+        """
+        (Re)starts the timeout countdown. Called with _lock held, or before the thread is started.
+        """
+        if self.timer:
+            self.timer.cancel()
+        self.timer = Timer(midiTimeout if timeout is None else timeout, self.expire)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def cancel (self):
+        """
+        Abandons the warm-up. Called with _lock held.
+        """
+        self.cancelled = True
+        if self.timer:
+            self.timer.cancel()
+
+    def run (self):
+        global player, generator, midiStatus, midiError
+        try:
+            p = _openMIDI(self.instrument)
+        except Exception as e:
+            with _lock:
+                if self.cancelled:
+                    return
+                self.cancel()
+                midiStatus = "failed"
+                midiError  = repr(e)
+            self.notify("failed")
+            return
+        with _lock:
+            if not self.cancelled:
+                self.timer.cancel()
+                if self.instrument is not None and self.instrument!=p.get_instrument():
+                    # Instrument was changed while warming up
+                    p.set_instrument(self.instrument)
+                player     = p
+                generator  = note
+                midiStatus = "ready"
+                midiError  = None
+                p = None
+        if p is None:
+            self.notify("ready")
+            return
+        # Abandoned while warming up, nobody will use the device
+        try:
+            _closePlayer(p)
+        except Exception:
+            pass
+
+    def expire (self):
+        global midiStatus, midiError
+        with _lock:
+            if self.cancelled or warmUp is not self:
+                return
+            self.cancelled = True
+            midiStatus = "timeout"
+            midiError  = "MIDI device did not become ready in time"
+        self.notify("timeout")
+
+    def notify (self, status):
+        callback = self.callback
+        if callback:
+            wx.CallAfter(callback, status)
+
+def startMIDI (instrument=None, callback=None, timeout=None, synth=None):
+    """
+    Switches tone generation to MIDI without blocking the caller.
+    NVDA's beeps are used until the MIDI device is ready.
+    If instrument is given, it is set before the first MIDI note is played.
+    If synth is given, it replaces midiSynth, i.e. selects the synthesizer to use.
+    callback, if given, is called in the main thread with the outcome:
+    "ready", "failed" or "timeout". The current state is always in midiStatus and midiError.
+    If an earlier warm-up is still running (even one that timed out or was abandoned),
+    it is taken over instead of initializing the device twice at the same time.
+    """
+    global warmUp, midiStatus, midiError, midiSynth
+    if synth is not None:
+        midiSynth = synth
+    with _lock:
+        w = warmUp
+        if w and w.is_alive():
+            p = _stopPlayer()
+            w.instrument = instrument
+            w.callback   = callback
+            w.cancelled  = False
+            w.arm(timeout)
+            midiStatus = "starting"
+            midiError  = None
+        else:
+            w = None
+    if w:
+        if p:
+            # The PortMidi itself stays, the warm-up may be using it
+            _releasePlayer(p)
+        return w
+    setGenerator("NVDA")
+    with _lock:
+        warmUp = w = WarmUp(instrument, callback, timeout)
+        midiStatus = "starting"
+        w.start()
+    return w
+
+def _stopPlayer ():
+    """
+    Returns to beeps and detaches the current player. Called with _lock held.
+    Returns the detached player, which the caller needs to close outside of the lock.
+    """
     global generator, player
-    if player:
-        player.quit()
-        if isinstance(player, midi.Player):
-            midi.quit()
-        player = None
+    generator = beep
+    p, player = player, None
+    return p
+
+def setInstrument (instrument):
+    """
+    Sets the MIDI instrument on the player, or, if MIDI is still warming up, as soon as it is ready.
+    """
+    with _lock:
+        if player:
+            player.set_instrument(instrument)
+        elif warmUp and not warmUp.cancelled:
+            warmUp.instrument = instrument
+
+def setGenerator (name="NVDA"):
+    """
+    Switches the tone generator synchronously.
+    name is one of "NVDA" (tones.beep()), "MIDI" or "None" (silence).
+    Any running MIDI warm-up is abandoned.
+    """
+    global generator, player, midiStatus, midiError
+    with _lock:
+        if warmUp:
+            warmUp.cancel()
+        p = _stopPlayer()
+        midiStatus = "off"
+        midiError  = None
+    if p:
+        _closePlayer(p)
     if name=="NVDA":
         generator = beep
     elif name=="MIDI":
-        midi.init()
-        output = midi.Output(midi.get_default_output_id())
-        player = midi.Player(output)
-        generator = note
+        p = _openMIDI()
+        with _lock:
+            player     = p
+            generator  = note
+            midiStatus = "ready"
     elif name=="None":
         generator = none
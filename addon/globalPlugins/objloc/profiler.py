@@ -0,0 +1,95 @@
+# Part of Object Location Tones
+# Startup instrumentation
+# Records wall time of each phase of the add-on start (imports, Settable()s construction,
+# settings loading, dependency checks, MIDI initialization...) and reports it as one structured log record
+# The instrumentation is off unless the OBJLOC_PROFILE_STARTUP environment variable is set:
+#   OBJLOC_PROFILE_STARTUP=1             --> The record goes to the NVDA log only
+#   OBJLOC_PROFILE_STARTUP=<file path>   --> The record is also appended as a JSON line to the given file
+
+from time       import perf_counter as clock
+from logHandler import log
+
+import json
+import os
+
+__all__ = ["StartupProfile", "startup"]
+
+class StartupProfile (object):
+    """
+    Collects consecutive, named phases of the startup and their durations.
+    Starting a phase stops the currently running one, so the instrumented code
+    just marks where each phase begins, without nesting or extra indentation.
+    When disabled, all methods return immediately.
+    """
+    def __init__ (self, enabled=False, target=None):
+        self.enabled = enabled
+        self.target  = target # A file to append JSON records to, None for logging only
+        self.phases  = []     # Finished phases as [name, seconds] pairs
+        self.current = None   # Name of the running phase
+        self.started = 0.0
+
+    def start (self, name):
+        """
+        Stops the running phase, if any, and starts measuring the one given by name.
+        If a phase with the same name was already measured, the time is added to it.
+        """
+        if not self.enabled:
+            return
+        t = clock()
+        if self.current is not None:
+            self._add(self.current, t-self.started)
+        self.current = name
+        self.started = t
+
+    def stop (self):
+        """
+        Stops the running phase without starting a new one.
+        Time until the next start() is not attributed to anything.
+        """
+        if not self.enabled or self.current is None:
+            return
+        self._add(self.current, clock()-self.started)
+        self.current = None
+
+    def _add (self, name, duration):
+        for phase in self.phases:
+            if phase[0]==name:
+                phase[1] += duration
+                return
+        self.phases.append([name, duration])
+
+    def record (self):
+        """
+        Returns the collected phases as a dict ready for JSON serialization.
+        Times are in milliseconds.
+        """
+        phases = [{"phase": name, "ms": round(duration*1000, 3)} for name, duration in self.phases]
+        return {"event": "objloc.startup", "total_ms": round(sum(p["ms"] for p in phases), 3), "phases": phases}
+
+    def finish (self):
+        """
+        Stops the running phase, reports the record and resets the profile.
+        Returns the record, or None when the profile is disabled.
+        """
+        if not self.enabled:
+            return
+        self.stop()
+        record = self.record()
+        line = json.dumps(record)
+        log.info("Object Location Tones startup profile: "+line)
+        if self.target:
+            try:
+                with open(self.target, "a", encoding="utf-8") as f:
+                    f.write(line+"\n")
+            except OSError as e:
+                log.warning("Unable to write the startup profile to %r because of %s" % (self.target, repr(e)))
+        self.phases = []
+        return record
+
+def _fromEnvironment ():
+    value = os.environ.get("OBJLOC_PROFILE_STARTUP", "")
+    if not value or value=="0":
+        return StartupProfile()
+    return StartupProfile(True, None if value=="1" else value)
+
+startup = _fromEnvironment()
@@ -8,18 +8,40 @@ from .objects       import *
 from .exceptions    import *
 from .serialization import *
 from .factory       import *
+from .persistence   import Writer
+from .profiles      import Profiles
 from .panel         import SetPanel, RemovePanel, Panel, setValue, getValue
 
-__all__ = ["SettingsError", "Attribute", "Holder", "Settable", "Activator", "Settings", "SetPanel", "RemovePanel"]
+__all__ = ["SettingsError", "Attribute", "Holder", "Settable", "Activator", "Settings", "Profiles", "SetPanel", "RemovePanel"]
 
 class Settings:
     path     = None # A settings file
     version  = 1    # Version of the settings protocol
     lversion = None # Version from the loaded file
-    def __init__ (self, path=None, safe=True):
-        self.path       = path or os.path.join(os.path.abspath(os.path.dirname(__file__)), "settings.json")
-        self.attributes = set()
-        self.safe       = safe
+    delay    = 2.0  # Quiet period in seconds after which deferred saves are written
+    format   = "json" # Name of the format the file is written in (see serialization.formats), any is loaded
+    timeout  = 5.0  # Seconds to wait for the settings file locked by another thread or process
+    fsync    = "full" # How durable a save is before it returns, see commit.FSYNC
+    def __init__ (self, path=None, safe=True, format=None):
+        self.path        = path or os.path.join(os.path.abspath(os.path.dirname(__file__)), "settings.json")
+        self.attributes  = set()
+        self.safe        = safe
+        if format is not None:
+            get_format(format) # Fail early on an unknown one
+            self.format  = format
+        # Indexes of the attributes, kept by map_attrs() so that lookups and refreshes do not scan all of them
+        self.by_name     = {} # Name --> Attribute()
+        self.by_nickname = {} # Nickname --> Attribute()
+        self.by_ctrl     = {} # GUI control id --> Attribute(), kept current by Attribute().set_ctrl_id()
+        self.by_instance = {} # id() of the owning instance --> {name: Attribute()}
+        self.writer      = Writer(self.write, self.delay)
+        # Incremental saving
+        self.mapped      = {}    # id() of a mapped instance --> registry.version when it was mapped
+        self.dirty       = set() # Attribute()s assigned to since they were last taken for saving
+        self.untracked   = set() # Attribute()s whose assignments cannot be tracked, taken on each save
+        self.unsaved     = set() # Attribute()s taken with a value that is not the original, i.e. not yet written
+        self.doc         = None  # The SDict() that is written to the file, patched by each save, or None to build it anew
+        self.profiles    = Profiles(self) # Per application overrides, saved under "profiles"
 
     def map_attrs (self, instance):
         """
@@ -30,29 +52,78 @@ class Settings:
         defined new Settable()s afterwards, or you wish to call
         the update() method without loading data from the file.
         """
-        for attr in dir(instance):
-            obj = getattr(instance, attr)
+        names = registry.attributes_of(instance)
+        self.mapped[id(instance)] = registry.version
+        for attr in sorted(names):
+            obj = getattr(instance, attr, None)
             if isinstance(obj, Attribute):
                 if obj.is_class_attr():
                     obj = obj.copy()
                     obj.flip_allegiance(instance)
-                self.attributes.add(obj)
+                self.index(obj)
+                if not track(instance, obj.name, self._touched):
+                    self.untracked.add(obj)
                 obj.set()
 
+    def index (self, attr):
+        """
+        Adds the attribute to the attributes set() and to the indexes.
+        """
+        self.attributes.add(attr)
+        self.by_name[attr.name] = attr
+        self.by_nickname[attr.nickname] = attr
+        self.by_instance.setdefault(id(attr.instance), {})[attr.name] = attr
+        if attr.ctrlId is not None:
+            self.by_ctrl[attr.ctrlId] = attr
+        attr.watch(self._ctrl_changed)
+        self.doc = None
+
+    def _touched (self, instance, name):
+        attr = self.by_instance.get(id(instance), {}).get(name)
+        if attr is not None:
+            self.dirty.add(attr)
+
+    def _ctrl_changed (self, attr, old, new):
+        if old is not None and self.by_ctrl.get(old) is attr:
+            del self.by_ctrl[old]
+        if new is not None:
+            self.by_ctrl[new] = attr
+
+    def owned (self, instance):
+        """
+        Returns the {name: Attribute()} dict of attributes belonging to the instance.
+        """
+        return self.by_instance.get(id(instance), {})
+
+    def find (self, instance, *specific):
+        """
+        Returns a list of the instance's attributes given by
+        Attribute() objects, names, GUI control ids or nicknames.
+        """
+        owned = self.owned(instance)
+        found = []
+        for i in specific:
+            if isinstance(i, Attribute):
+                attr = i if owned.get(i.name) is i else None
+            elif isinstance(i, int):
+                attr = self.by_ctrl.get(i)
+            else:
+                attr = owned.get(i) or self.by_nickname.get(i)
+            if attr is not None and attr.belongs_to(instance) and attr not in found:
+                found.append(attr)
+        return found
+
     def set_all (self, instance):
-        for attr in self.attributes:
-            if attr.belongs_to(instance):
-                attr.set()
+        for attr in self.owned(instance).values():
+            attr.set()
 
     def set_defaults (self, instance):
-        for attr in self.attributes:
-            if attr.belongs_to(instance):
-                setattr(instance, attr.name, attr.default)
+        for attr in self.owned(instance).values():
+            setattr(instance, attr.name, attr.default)
 
     def set_originals (self, instance):
-        for attr in self.attributes:
-            if attr.belongs_to(instance):
-                setattr(instance, attr.name, attr.original)
+        for attr in self.owned(instance).values():
+            setattr(instance, attr.name, attr.original)
 
     def load (self, instance):
         """
@@ -63,6 +134,8 @@ class Settings:
         If an attribute has a wrong type, the warning will be posted to the log, and loading continued with other attributes.
         The value will be set to the default one.
         """
+        # Write out a deferred save first, so that it is not overwritten later by older settings
+        self.writer.flush()
         if not os.path.isfile(self.path):
             # If there is no settings file,
             # make the attribute map and save defaults to file immediately
@@ -72,9 +145,9 @@ class Settings:
             return
         try:
             if self.safe:
-                f = SafeFile(self.path, fail_on_lock=True)
+                f = SafeFile(self.path, "rb", timeout=self.timeout)
             else:
-                f = open(self.path)
+                f = open(self.path, "rb")
         except Exception as e:
             raise SettingsError("Opening settings file failed because of "+repr(e))
         try:
@@ -88,10 +161,10 @@ class Settings:
                 pass
         # Update the set() attributes
         self.map_attrs(instance)
-        for attr in self.attributes:
-            if not attr.belongs_to(instance):
-                # If settings is shared between multiple instances, skip attributes which do not belong to this one
-                continue
+        # Leaves the active profile, so the base values are loaded into the instance
+        self.profiles.load(d.get("profiles"))
+        # If settings is shared between multiple instances, attributes which do not belong to this one are skipped
+        for attr in self.owned(instance).values():
             if attr.skip:
                 continue
             try:
@@ -110,52 +183,136 @@ class Settings:
             except Exception as e:
                 raise SettingsError("Unable to set the attribute '%s' to value %s because of %s" % (attr.name, repr(value), repr(e)))
         self.lversion = d.get("version", self.version)
+        # The next save builds the document anew
+        self.doc = None
 
-    def save (self, instance, force=False):
+    def save (self, instance, force=False, defer=False):
         """
         Saves settings to the file from attributes of the given instance.
         The save will not occur if there were no changes in the settings. The save can the forced though using the force=True.
         Inaccessible instance attributes will be skipped.
         If there is a type mismatch, a worning will be posted to the log, the attribute skipped and the process continued.
+        With defer=True, the settings are taken from the instance immediately, but written to the file
+        on a background thread after the quiet period given by the delay attribute, together with any
+        deferred saves made meanwhile. Errors of deferred writes are logged instead of raised.
+        A save without defer supersedes deferred ones that are still pending, and flush() writes them immediately.
+        Only the attributes assigned to since the previous save are taken from the instance, and patched into
+        the document kept from the previous save, so a save without changes does next to nothing.
+        force=True takes all of them.
         """
-        # Update the attributes set() in case new attributes were registered for saving
-        self.map_attrs(instance)
-        # Build the JSON dict
+        if self.mapped.get(id(instance))!=registry.version:
+            # Update the attributes set() in case new attributes were registered for saving
+            self.map_attrs(instance)
+        d = self.doc
+        if force or d is None:
+            d = self.doc = self.document(instance)
+        else:
+            for attr in [attr for attr in self.dirty if attr.belongs_to(instance)]:
+                self.dirty.discard(attr)
+                self.take(d, attr)
+            for attr in self.untracked:
+                if attr.belongs_to(instance):
+                    self.take(d, attr)
+        profiles = self.profiles
+        # A write in progress cannot be cancelled, and seals the values it writes as the originals once done,
+        # so those are the ones to compare with, e.g. when a value is changed back while its change is being written
+        job = self.writer.writing()
+        written = dict((attr, value) for attr, value in job[1] if attr is not profiles) if job else {}
+        # Values changed back to the original ones need no saving, but are kept unsaved until the write in progress succeeds
+        self.unsaved = set(attr for attr in self.unsaved.union(written) if attr.has_changed() or attr._value!=written.get(attr, attr._value))
+        unsaved = set(attr for attr in self.unsaved if attr._value!=written.get(attr, attr.original))
+        if profiles.pending():
+            d["profiles"] = profiles.dump()
+        if not force:
+            if not unsaved and not profiles.pending():
+                # The file holds, or is about to hold, these values, so whatever was deferred is stale
+                self.writer.cancel()
+                return
+        # The writer gets a copy, as the document may be patched while it is being written in the background
+        d = SDict(d)
+        changed = [(attr, attr._value) for attr in unsaved]
+        # Profiles() are sealed like attributes, with the version of the overrides written
+        changed.append((profiles, profiles.version))
+        if defer:
+            self.writer.submit(d, changed)
+            return
+        self.writer.run(d, changed)
+
+    def document (self, instance):
+        """
+        Builds the SDict() to be saved from all attributes, taking those of the given instance from it.
+        """
+        self.dirty = set(attr for attr in self.dirty if not attr.belongs_to(instance))
         d = SDict({"version": self.version}) # Save the protocol version, so we may adapt to older settings if it changes in the future
-        changed = []
         for attr in self.attributes:
             if not attr.save:
                 continue
             if not attr.belongs_to(instance):
                 # Do not change settings from other instances
-                # but make sure they are written to file
-                d[attr.nickname] = attr.original
-                continue
-            try:
-                value = attr.get()
-            except SettingsError as e:
-                log.warning(str(e))
+                # but make sure they are written to file, as last taken by their save
+                d[attr.nickname] = attr._value if attr in self.unsaved else attr.original
                 continue
-            d[attr.nickname] = value
+            self.take(d, attr)
+        if self.profiles.overrides:
+            d["profiles"] = self.profiles.dump()
+        return d
+
+    def take (self, d, attr):
+        """
+        Puts the attribute's current value from its instance into the SDict() d
+        and remembers the attribute as unsaved if the value is not the original.
+        Inaccessible instance attributes and type mismatches are logged and skipped.
+        """
+        if not attr.save:
+            d.pop(attr.nickname, None)
+            return
+        if attr in self.profiles.overlay:
+            # Overridden by the active profile, so the instance holds the profile's value, and the Attribute() the base one
+            self.profiles.take(attr)
+            d[attr.nickname] = attr._value
             if attr.has_changed():
-                changed.append(attr)
-        if not force:
-            if not changed:
-                return
+                self.unsaved.add(attr)
+            return
+        try:
+            value = attr.get()
+        except SettingsError as e:
+            log.warning(str(e))
+            return
+        d[attr.nickname] = value
+        if attr.has_changed():
+            self.unsaved.add(attr)
+
+    def write (self, d, changed):
+        """
+        Writes the SDict() d to the file and seals the changed (attribute, value) pairs that it holds.
+        The Profiles() are among them, with the version of the overrides in d.
+        """
         try:
             if self.safe:
-                f = SafeFile(self.path, "w", fail_on_lock=True)
+                f = SafeFile(self.path, "wb", timeout=self.timeout, fsync=self.fsync)
             else:
-                f = open(self.path, "w")
-            d.dump(f)
+                f = open(self.path, "wb")
+            d.dump(f, self.format)
             f.close()
             # If writing to file is successful, make sure new original values
             # now are the ones saved, just like when the file is just loaded
-            for attr in changed:
-                attr.seal()
+            for attr, value in changed:
+                attr.seal(value)
         except Exception as e:
             raise SettingsError("Unable to save settings because of "+repr(e))
 
+    def flush (self):
+        """
+        Writes the pending deferred save, if any, immediately.
+        """
+        self.writer.flush()
+
+    def close (self):
+        """
+        Writes the pending deferred save, if any, and stops the background writer.
+        """
+        self.writer.close()
+
     def restore_defaults (self, set=True):
         for attr in self.attributes:
             attr.value = attr.default
@@ -169,13 +326,13 @@ class Settings:
                 attr.set()
 
     def __getitem__ (self, i):
-        for attr in self.attributes:
-            if attr.name==i:
-                return attr
-        raise KeyError("'%s' not found" % i)
+        try:
+            return self.by_name[i]
+        except KeyError:
+            raise KeyError("'%s' not found" % i)
 
     def __contains__ (self, i):
-        return (i in (attr.name for attr in self.attributes))
+        return i in self.by_name
 
     def __iter__ (self):
         return iter(sorted(self.attributes, key=(lambda x: x.args.get("ordinal", x.id))))
@@ -183,34 +340,14 @@ class Settings:
     def refresh_panel (self, instance, *specific):
         if not Panel.opened:
             return
-        if specific:
-            for attr in self.attributes:
-                if not attr.belongs_to(instance):
-                    continue
-                if (attr.value!=Ellipsis and attr.has_gui_control()) and (attr.name in specific or attr in specific or attr.ctrlId in specific or attr.nickname in specific):
-                    setValue(attr, attr.get_gui_control(), getattr(instance, attr.name))
-                    break
-            return
-        for attr in self.attributes:
-            if not attr.belongs_to(instance):
-                continue
+        for attr in (self.find(instance, *specific) if specific else self.owned(instance).values()):
             if attr.value!=Ellipsis and attr.has_gui_control():
                 setValue(attr, attr.get_gui_control(), getattr(instance, attr.name))
 
     def refresh_instance (self, instance, *specific):
         if not Panel.opened:
             return
-        if specific:
-            for attr in self.attributes:
-                if not attr.belongs_to(instance):
-                    continue
-                if (attr.value!=Ellipsis and attr.has_gui_control()) and (attr.name in specific or attr in specific or attr.ctrlId in specific or attr.nickname in specific):
-                    setattr(instance, attr.name, getValue(attr, attr.get_gui_control()))
-                    break
-            return
-        for attr in self.attributes:
-            if not attr.belongs_to(instance):
-                continue
+        for attr in (self.find(instance, *specific) if specific else self.owned(instance).values()):
             if attr.value!=Ellipsis and attr.has_gui_control():
                 setattr(instance, attr.name, getValue(attr, attr.get_gui_control()))
 
@@ -225,7 +362,7 @@ class Settings:
         if not os.path.isfile(self.path):
             raise SettingsError("No settings file at '%s'" % self.path)
         try:
-            f = open(self.path)
+            f = open(self.path, "rb")
         except Exception as e:
             raise SettingsError("Opening settings file failed because of "+str(e))
         try:
@@ -0,0 +1,129 @@
+# Part of the Object Location Tones settings package
+# Strategies with which SafeFile() puts a fully written temporary file in place of its target
+# A committer syncs the temporary file to disk, as much as its fsync policy asks for, and atomically replaces the target with it.
+# The Windows one uses MoveFileEx, the POSIX one os.replace() followed by syncing the directory holding the entry.
+# Nothing from NVDA is imported until a Windows replacement actually happens,
+# so the package can be imported, and SafeFile() used, outside of NVDA and on other systems.
+# fsync policies:
+#   "full" - the file and the directory entry reach the disk before the commit returns (the default)
+#   "data" - the file contents reach the disk, not necessarily its metadata nor the new directory entry
+#   "none" - the operating system writes everything when it likes, for tests and benchmarks
+
+from .exceptions import SettingsError
+from abc         import ABC, abstractmethod
+from logHandler  import log
+
+import os
+
+__all__ = ["Committer", "WindowsCommitter", "PosixCommitter", "FSYNC", "register_committer", "get_committer", "default_committer"]
+
+FSYNC = ("full", "data", "none")
+
+class Committer (ABC):
+    """
+    Base of commit strategies. Instances are stateless apart from the fsync policy, so they are shared.
+    Subclasses must implement replace(), or they cannot be instantiated.
+    """
+    name = None
+    def __init__ (self, fsync="full"):
+        if fsync not in FSYNC:
+            raise SettingsError("Unknown fsync policy %r, use one of %s" % (fsync, ", ".join(FSYNC)))
+        self.fsync = fsync
+
+    def sync (self, fd):
+        """
+        Makes the contents of the file with the descriptor fd durable as the policy asks for.
+        Called with Python's buffers already flushed.
+        """
+        if self.fsync=="full":
+            os.fsync(fd)
+        elif self.fsync=="data":
+            # fdatasync() skips metadata like the modification time, where there is one
+            getattr(os, "fdatasync", os.fsync)(fd)
+
+    @abstractmethod
+    def replace (self, temp, target):
+        """
+        Atomically puts the closed file temp in place of target.
+        """
+
+    def __repr__ (self):
+        return "<%s(fsync=%r)>" % (self.__class__.__name__, self.fsync)
+
+class WindowsCommitter (Committer):
+    """
+    Replaces with MoveFileExW. Under the full policy MOVEFILE_WRITE_THROUGH makes it return only once the move is on disk.
+    """
+    name = "windows"
+
+    def replace (self, temp, target):
+        import winKernel
+        flags = winKernel.MOVEFILE_REPLACE_EXISTING
+        if self.fsync=="full":
+            flags |= winKernel.MOVEFILE_WRITE_THROUGH
+        winKernel.moveFileEx(temp, target, flags)
+
+class PosixCommitter (Committer):
+    """
+    Replaces with os.replace(), which is a rename(), and under the full policy syncs the directory afterwards,
+    as a rename reaches the disk only with its directory.
+    """
+    name = "posix"
+
+    def replace (self, temp, target):
+        os.replace(temp, target)
+        if self.fsync=="full":
+            self.sync_directory(os.path.dirname(target))
+
+    def sync_directory (self, path):
+        # The target is already replaced, so a failure here must not undo anything, it is just reported
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        except OSError as e:
+            log.debug("Unable to open %r for syncing because of %r" % (path, e))
+            return
+        try:
+            os.fsync(fd)
+        except OSError as e:
+            # Some file systems do not support syncing directories
+            log.debug("Unable to sync %r because of %r" % (path, e))
+        finally:
+            os.close(fd)
+
+committers = {} # Name --> Committer subclass
+instances  = {} # (name, fsync) --> shared Committer() instance
+
+def register_committer (cls):
+    """
+    Adds a Committer subclass to the registry, replacing one of the same name. Returns cls, so it can decorate.
+    """
+    committers[cls.name] = cls
+    for key in [k for k in instances if k[0]==cls.name]:
+        del instances[key]
+    return cls
+
+def default_committer ():
+    """
+    Returns the name of the strategy for this system.
+    """
+    return "windows" if os.name=="nt" else "posix"
+
+def get_committer (name=None, fsync="full"):
+    """
+    Returns the Committer() registered as name, or the one of this system if None, with the given fsync policy.
+    """
+    if name is None:
+        name = default_committer()
+    try:
+        return instances[(name, fsync)]
+    except KeyError:
+        pass
+    try:
+        cls = committers[name]
+    except KeyError:
+        raise SettingsError("Unknown commit strategy %r" % name)
+    c = instances[(name, fsync)] = cls(fsync)
+    return c
+
+register_committer(WindowsCommitter)
+register_committer(PosixCommitter)
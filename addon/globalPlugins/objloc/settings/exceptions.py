@@ -3,3 +3,6 @@
 
 class SettingsError (Exception):
     """Raised when anything goes wrong with settings management."""
+
+class FileLockTimeout (RuntimeError):
+    """Raised when a file stays locked by another thread or process for longer than the given timeout."""
@@ -1,5 +1,5 @@
 from .exceptions import SettingsError
-from .objects import Attribute
+from .objects import Attribute, registry
 from inspect  import currentframe as getframe
 
 def Settable (value, nickname=None, *args, **kwargs):
@@ -28,6 +28,7 @@ def Settable (value, nickname=None, *args, **kwargs):
     show:    bool() --> If False the GUI control will not be created and shown in settings panel. Defaults to True
     label:    str() --> Label in settings panel. If not provided the GUI control will not be created and presented in settings panel
     ordinal:  int() --> An ordinal number that will be used to manage order of controls in the settings panel. If not present an order of creation will be followed.
+    profile: bool() --> If False, per application profiles (see Profiles()) cannot override the value. Defaults to True
 
     What kind of control is created in the settings panel depends on type of the value.
 
@@ -76,7 +77,10 @@ def Settable (value, nickname=None, *args, **kwargs):
     args = dict(enumerate(args))
     args.update(kwargs)
     if obj is not None:
-        return Attribute(obj, Ellipsis, type(value), value, nickname, args)
+        attr = Attribute(obj, Ellipsis, type(value), value, nickname, args)
+        if obj is not Ellipsis:
+            registry.register(attr)
+        return attr
     raise SettingsError("Settable() must be called from within a class or a method")
 
 def Activator (label, callback, *args, **kwargs):
@@ -107,6 +111,9 @@ def Activator (label, callback, *args, **kwargs):
     args = dict(enumerate(args))
     args.update(kwargs)
     if obj is not None:
-        return Attribute(obj, Ellipsis, type(Ellipsis), Ellipsis, None, args)
+        attr = Attribute(obj, Ellipsis, type(Ellipsis), Ellipsis, None, args)
+        if obj is not Ellipsis:
+            registry.register(attr)
+        return attr
     raise SettingsError("Activator() must be called from within a class or a method")
     
\ No newline at end of file
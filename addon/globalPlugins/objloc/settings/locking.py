@@ -0,0 +1,318 @@
+# Part of the Object Location Tones settings package
+# Advisory cross-process locking of files with lock files, and the in-process locks per path that SafeFile() serializes threads with
+# A lock on <target> is the file <target>.lock, created exclusively, holding the PID of the owner and a random token.
+# A lock whose owner process is gone, or which was not refreshed for FileLock.stale_after seconds, is broken.
+# Lock files are moved aside before they are checked and removed, and put back if they turn out to be someone else's,
+# so neither breaking a lock nor releasing it ever removes a lock that was taken meanwhile.
+# Waiting for a lock polls with exponential backoff until a timeout.
+# Processes that do not use FileLock are not stopped from touching the target, hence advisory.
+# Works the same on Windows and on other systems, except for checking whether the owner is alive.
+
+from time        import monotonic, sleep, time
+from random      import random
+from threading   import Lock
+from collections import OrderedDict
+from logHandler  import log
+from .exceptions import FileLockTimeout
+
+import binascii
+import os
+
+__all__ = ["FileLock", "LockRegistry", "RecentPaths", "pid_alive"]
+
+if os.name=="nt":
+    def pid_alive (pid):
+        """
+        Tells whether the process with the given PID is running.
+        """
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            # Access denied means it exists, but runs as someone else
+            return ctypes.GetLastError()==5
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value==259 # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+else:
+    def pid_alive (pid):
+        """
+        Tells whether the process with the given PID is running.
+        """
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        except OSError:
+            return False
+        return True
+
+class FileLock (object):
+    """
+    An advisory lock on the path, held by this process between acquire() and release().
+    Not reentrant, and not meant to be shared between threads, SafeFile() serializes those with its own in-process lock.
+    A holder must refresh() the lock at least every stale_after seconds, or it may be broken by others.
+    """
+    stale_after = 30.0  # Seconds without a refresh() after which a lock is broken even if its owner seems alive, as writing settings takes milliseconds
+    first_delay = 0.001 # Backoff: the first wait in seconds, doubled after each try
+    max_delay   = 0.1   # up to this many seconds
+    tokens      = set() # Class attr: Tokens of the locks held by this process, to tell them from those left over by it
+    def __init__ (self, path):
+        self.path  = path+".lock"
+        self.token = None # The token written into the lock file while it is held
+
+    @property
+    def held (self):
+        return self.token is not None
+
+    def _read (self, path):
+        """
+        Returns (pid, token) from the lock file, or None if it is missing.
+        A lock file that cannot be parsed gives (0, ""), so it is broken if it is old enough.
+        """
+        try:
+            with open(path, "r", encoding="ascii", errors="replace") as f:
+                content = f.read(64).split()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            return (0, "")
+        try:
+            return (int(content[0]), content[1])
+        except (IndexError, ValueError):
+            return (0, "")
+
+    def _try (self):
+        token = binascii.hexlify(os.urandom(8)).decode("ascii")
+        # Known before the lock file is written, so that other threads never take it for a leftover
+        self.tokens.add(token)
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            self.tokens.discard(token)
+            return False
+        except:
+            self.tokens.discard(token)
+            raise
+        try:
+            os.write(fd, ("%i %s\n" % (os.getpid(), token)).encode("ascii"))
+        finally:
+            os.close(fd)
+        self.token = token
+        return True
+
+    def _aside (self, why):
+        return "%s.%s.%s" % (self.path, binascii.hexlify(os.urandom(4)).decode("ascii"), why)
+
+    def _restore (self, aside):
+        """
+        Puts the lock file moved aside back in place, unless a lock was taken meanwhile, and tells whether it did.
+        """
+        try:
+            if os.name=="nt":
+                # Does not replace an existing file there
+                os.rename(aside, self.path)
+            else:
+                os.link(aside, self.path)
+                os.unlink(aside)
+            return True
+        except OSError as e:
+            # Two locks cannot be in place at once, so this one stays aside, and its owner learns it lost the lock when releasing
+            log.warning("Unable to put the lock %r back because of %r, left it as %r" % (self.path, e, aside))
+            return False
+
+    def refresh (self):
+        """
+        Renews the modification time of the lock file while it is held, so that it does not become stale.
+        Should it have been broken and taken by someone else, theirs is renewed, which does no harm.
+        """
+        if self.token is None:
+            return
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def is_stale (self, owner):
+        """
+        Tells whether the lock file with the owner (pid, token), as read from it, may be broken.
+        """
+        try:
+            age = time()-os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if age>self.stale_after:
+            return True
+        pid = owner[0]
+        if pid==os.getpid():
+            # Held by another FileLock() of this process, or left over, e.g. by an earlier add-on instance that failed in mid write
+            return owner[1] not in self.tokens
+        if pid<=0:
+            # Unreadable, or still being written by its owner, let it age
+            return False
+        return not pid_alive(pid)
+
+    def _break (self, owner):
+        # Renaming is atomic, so of all the processes breaking the same lock only one succeeds
+        grave = self._aside("stale")
+        try:
+            os.rename(self.path, grave)
+        except OSError:
+            return
+        if self._read(grave)!=owner:
+            # The lock was broken and taken by someone else since we looked at it, so it is not ours to break
+            log.debug("Lock %r was retaken while being broken, putting it back" % self.path)
+            self._restore(grave)
+            return
+        log.debug("Broke the stale lock %r of PID %i" % (self.path, owner[0]))
+        try:
+            os.unlink(grave)
+        except OSError:
+            pass
+
+    def acquire (self, timeout=None):
+        """
+        Takes the lock, waiting at most timeout seconds (forever if None, not at all if 0).
+        Raises FileLockTimeout if it is still held by someone else by then.
+        Returns True.
+        """
+        if self.token is not None:
+            raise RuntimeError("Lock %r is already held" % self.path)
+        deadline = None if timeout is None else monotonic()+timeout
+        delay = self.first_delay
+        while True:
+            if self._try():
+                return True
+            owner = self._read(self.path)
+            if owner is not None and self.is_stale(owner):
+                self._break(owner)
+                continue
+            if deadline is not None:
+                left = deadline-monotonic()
+                if left<=0:
+                    pid = owner[0] if owner else 0
+                    raise FileLockTimeout("%r is locked by process %i" % (self.path[:-5], pid))
+            else:
+                left = delay
+            # Jitter keeps processes that wait for the same lock from retrying in lockstep
+            sleep(min(delay*(0.5+random()), left))
+            delay = min(delay*2, self.max_delay)
+
+    def release (self):
+        """
+        Removes the lock file if it is still ours.
+        It is moved aside first, so the one checked is the one removed, and put back if someone else took the lock meanwhile.
+        """
+        token, self.token = self.token, None
+        if token is None:
+            return
+        try:
+            aside = self._aside("released")
+            delay = self.first_delay
+            while True:
+                try:
+                    os.rename(self.path, aside)
+                    break
+                except FileNotFoundError:
+                    log.warning("Lock %r was broken while held" % self.path)
+                    return
+                except OSError:
+                    # On Windows, e.g. while someone reads it
+                    if delay>self.max_delay:
+                        raise
+                    sleep(delay)
+                    delay *= 2
+            owner = self._read(aside)
+            if owner is None or owner[1]!=token:
+                log.warning("Lock %r was broken while held" % self.path)
+                self._restore(aside)
+                return
+            os.unlink(aside)
+        except OSError as e:
+            log.warning("Unable to release the lock %r because of %r" % (self.path, e))
+        finally:
+            self.tokens.discard(token)
+
+class LockRegistry (object):
+    """
+    In-process Lock()s per path, counted by their users.
+    get() hands out the lock of a path and counts a user, put() uncounts one,
+    and the entry is dropped when its last user is gone, so paths opened once do not keep their lock forever.
+    A user waiting for the lock is counted too, so that a lock is never replaced while someone waits for it.
+    """
+    def __init__ (self):
+        self.guard   = Lock()
+        self.entries = {} # Path --> [Lock(), users]
+        self.peak    = 0  # Most entries alive at once
+        self.created = 0  # Entries created so far
+        self.removed = 0  # Entries dropped so far
+
+    def get (self, path):
+        with self.guard:
+            entry = self.entries.get(path)
+            if entry is None:
+                entry = self.entries[path] = [Lock(), 0]
+                self.created += 1
+                if len(self.entries)>self.peak:
+                    self.peak = len(self.entries)
+            entry[1] += 1
+            return entry[0]
+
+    def put (self, path):
+        with self.guard:
+            entry = self.entries.get(path)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1]<=0:
+                del self.entries[path]
+                self.removed += 1
+
+    def __len__ (self):
+        return len(self.entries)
+
+    def __contains__ (self, path):
+        return path in self.entries
+
+    def stats (self):
+        """
+        Returns a dict with the number of live entries, their users, the peak of live entries and the totals created and dropped.
+        """
+        with self.guard:
+            return {"live": len(self.entries), "users": sum(e[1] for e in self.entries.values()),
+                    "peak": self.peak, "created": self.created, "removed": self.removed}
+
+class RecentPaths (object):
+    """
+    A set of at most maxsize paths, which forgets the least recently added ones.
+    """
+    def __init__ (self, maxsize=64):
+        self.maxsize = maxsize
+        self.guard   = Lock()
+        self.paths   = OrderedDict()
+
+    def add (self, path):
+        """
+        Remembers path as the most recent one and tells whether it was new.
+        """
+        with self.guard:
+            paths = self.paths
+            if path in paths:
+                paths.move_to_end(path)
+                return False
+            paths[path] = None
+            while len(paths)>self.maxsize:
+                paths.popitem(last=False)
+            return True
+
+    def __len__ (self):
+        return len(self.paths)
+
+    def __contains__ (self, path):
+        return path in self.paths
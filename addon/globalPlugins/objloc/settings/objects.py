@@ -3,6 +3,8 @@
 
 from logHandler    import log
 from inspect       import isclass
+from operator      import attrgetter
+from weakref       import ref, WeakMethod
 from .controls     import IntCtrl, FloatCtrl, SliderCtrl
 from .exceptions   import *
 from gui.guiHelper import associateElements
@@ -56,6 +58,163 @@ class IdGenerator (object):
 
 GenerateId = IdGenerator()
 
+TRACKED = "_tracked_" # Prefix of keys under which the values of tracked attributes are kept (see Tracker())
+
+def untracked_name (name):
+    return name[len(TRACKED):] if name.startswith(TRACKED) else name
+
+class SettableRegistry (object):
+    """
+    Remembers where Settable()s live, so that Settings().map_attrs() and name resolution
+    visit only those attributes instead of reflecting over the whole instance with dir().
+    Class level Settable()s are recorded by name from __set_name__(). Settable()s created within methods
+    are pending until the instance is mapped, when their names are found in one pass over vars(instance)
+    and recorded for the instance's class, so the later mapping (on each load() and save()) need not look again.
+    """
+    __slots__ = ("names", "pending", "version")
+    def __init__ (self):
+        self.names   = {} # Class --> set() of names of its attributes that hold, or held Attribute()s
+        self.pending = {} # id() of an instance --> list of its Attribute()s with names not yet recorded
+        self.version = 0  # Grows with every change, so mappers know when there may be something new to map
+
+    def add (self, owner, name):
+        cls = owner if isclass(owner) else owner.__class__
+        names = self.names.setdefault(cls, set())
+        if name not in names:
+            names.add(name)
+            self.version += 1
+
+    def register (self, attr):
+        """
+        Records an Attribute() created for an instance (or a class within a classmethod), which is yet to be assigned to it.
+        """
+        self.pending.setdefault(id(attr.instance), []).append(attr)
+        self.version += 1
+
+    def find_name (self, attr):
+        """
+        Returns the name under which the attr is found in its instance, or None.
+        """
+        inst = attr.instance
+        try:
+            members = vars(inst)
+        except TypeError:
+            # No __dict__, e.g. __slots__ only
+            members = None
+        if members is not None:
+            for name, value in members.items():
+                if value is attr:
+                    return untracked_name(name)
+        for name in dir(inst):
+            if getattr(inst, name, None) is attr:
+                return name
+        return None
+
+    def attributes_of (self, instance):
+        """
+        Returns the names of the instance's attributes that hold, or held Attribute()s.
+        """
+        pending = self.pending.pop(id(instance), None)
+        if pending:
+            try:
+                members = dict((id(value), untracked_name(name)) for name, value in vars(instance).items())
+            except TypeError:
+                members = {}
+            left = []
+            for attr in pending:
+                if attr.instance is not instance:
+                    # The instance died without being mapped, and its id() was reused
+                    continue
+                try:
+                    name = object.__getattribute__(attr, "name")
+                except AttributeError:
+                    name = members.get(id(attr)) or self.find_name(attr)
+                    if name is None:
+                        # Not assigned yet
+                        left.append(attr)
+                        continue
+                    object.__setattr__(attr, "name", name)
+                self.add(instance, name)
+            if left:
+                self.pending[id(instance)] = left
+        names = set()
+        for cls in (instance if isclass(instance) else instance.__class__).__mro__:
+            names.update(self.names.get(cls, ()))
+        return names
+
+registry = SettableRegistry()
+
+class Tracker (property):
+    """
+    A property that Settings() puts on the class in place of a settable instance attribute,
+    so that assigning to the attribute tells the Settings() which attribute may have changed,
+    and saving need not check the others.
+    The value is kept in the instance's __dict__ under another key, and read by a C attrgetter(),
+    so reading the attribute costs only a little more than before.
+    Instances that were not mapped by a Settings() work as usual, only no one is told about their assignments.
+    """
+    def __init__ (self, name):
+        key = TRACKED+name
+        notify = {} # id() of an instance --> weak references to it and to callback(instance, name), dropped when it is collected
+        def fset (instance, value):
+            instance.__dict__[key] = value
+            entry = notify.get(id(instance))
+            if entry is not None:
+                callback = entry[1]()
+                if callback is not None:
+                    callback(instance, name)
+        def fdel (instance):
+            try:
+                del instance.__dict__[key]
+            except KeyError:
+                raise AttributeError(name)
+        property.__init__(self, attrgetter(key), fset, fdel)
+        self.name   = name
+        self.key    = key
+        self.notify = notify
+
+def track (instance, name, callback):
+    """
+    Makes the assignments to the given attribute of the instance call callback(instance, name).
+    Returns False for attributes that cannot be tracked:
+    class level ones, those of instances without a __dict__ or with their own __setattr__(), like Holder(),
+    and of instances that cannot be weakly referenced, as their callbacks could not be dropped when they are collected.
+    A bound method callback is weakly referenced too, as its object, e.g. a Settings(), usually holds the instance.
+    """
+    cls = instance.__class__
+    if getattr(instance, "__dict__", None) is None or cls.__setattr__ is not object.__setattr__:
+        return False
+    try:
+        ref(instance)
+    except TypeError:
+        return False
+    tracker = None
+    for c in cls.__mro__:
+        if name in c.__dict__:
+            tracker = c.__dict__[name]
+            break
+    if not isinstance(tracker, Tracker):
+        if tracker is not None or name not in instance.__dict__:
+            # A class level attribute, or not assigned yet
+            return False
+        tracker = Tracker(name)
+        setattr(cls, name, tracker)
+    if name in instance.__dict__:
+        instance.__dict__[tracker.key] = instance.__dict__.pop(name)
+    try:
+        callback = WeakMethod(callback)
+    except TypeError:
+        # A plain function, which keeps no instance alive
+        callback = (lambda f: lambda: f)(callback)
+    notify = tracker.notify
+    i = id(instance)
+    def forget (r):
+        # Called when the instance is collected, before its id() can be reused by another one
+        if notify.get(i, (None,))[0] is r:
+            del notify[i]
+    notify[i] = (ref(instance, forget), callback)
+    return True
+
 class Attribute (object):
     """
     Attribute holder for settings purposes.
@@ -66,7 +225,7 @@ class Attribute (object):
     To define an Attribute() within your instance, use the Settable() factory function.
     """
     __slots__ = ("instance", "name", "type", "_value", "nickname", "default", "original", "args", "_firstset", "id",
-                 "skip", "save", "show", "ctrlId", "feedback",
+                 "skip", "save", "show", "ctrlId", "feedback", "watchers",
                  "__getitem__", "__setitem__", "__delitem__", "__contains__")
     def __init__ (self, instance, name, type, value, nickname, args):
         if instance is not Ellipsis:
@@ -93,6 +252,7 @@ class Attribute (object):
         object.__setattr__(self, "__delitem__", self.args.__delitem__)
         object.__setattr__(self, "__contains__", self.args.__contains__)
         object.__setattr__(self, "ctrlId", None)
+        object.__setattr__(self, "watchers", [])
         object.__setattr__(self, "feedback", args.get("feedback", None))
         object.__setattr__(self, "_firstset", True)
         object.__setattr__(self, "skip", args.get("skip", False))
@@ -124,14 +284,7 @@ class Attribute (object):
 
     def __getattr__ (self, a):
         if a=="name":
-            this = id(self)
-            name = None
-            inst = self.instance
-            for attr in dir(inst):
-                value = getattr(inst, attr)
-                if id(value)==this:
-                    name = attr
-                    break
+            name = registry.find_name(self)
             if name is None:
                 raise SettingsError("Cannot find the attribute name")
             object.__setattr__(self, "name", name)
@@ -213,6 +366,7 @@ class Attribute (object):
         object.__setattr__(self, "name", name)
         object.__setattr__(self, "instance", owner)
         object.__setattr__(self, "id", GenerateId(owner))
+        registry.add(owner, name)
 
     def getargs (self):
         args   = [value for arg, value in sorted((item for item in self.args.items() if isinstance(item[0], int)), key=lambda x: x[0])]
@@ -239,8 +393,11 @@ class Attribute (object):
             return False
         return self._value!=value
 
-    def seal (self):
-        object.__setattr__(self, "original", self._value)
+    def seal (self, value=Ellipsis):
+        """
+        Makes the current value, or the given one (e.g. the one that was saved meanwhile), the original.
+        """
+        object.__setattr__(self, "original", self._value if value is Ellipsis else value)
 
     def belongs_to (self, instance):
         return isinstance(instance, self.instance) if isclass(self.instance) else id(instance)==id(self.instance)
@@ -251,6 +408,21 @@ class Attribute (object):
     def flip_allegiance (self, instance):
         object.__setattr__(self, "instance", instance)
 
+    def watch (self, callback):
+        """
+        Registers callback(attr, old, new) to be called whenever the ctrlId of the Attribute() changes,
+        so that Settings() can keep its index of GUI controls current.
+        """
+        if callback not in self.watchers:
+            self.watchers.append(callback)
+
+    def set_ctrl_id (self, ctrlId):
+        old = self.ctrlId
+        object.__setattr__(self, "ctrlId", ctrlId)
+        if old!=ctrlId:
+            for callback in self.watchers:
+                callback(self, old, ctrlId)
+
     def create_gui_control (self, parent):
         if self.type==bool:
             ctrl = wx.CheckBox(parent, label=self.args["label"])
@@ -259,8 +431,8 @@ class Attribute (object):
                 ctrl.Enable(self.args["enabled"])
             if "reactor" in self.args:
                 parent.Bind(wx.EVT_CHECKBOX, self.args["reactor"], ctrl)
-            object.__setattr__(self, "ctrlId", ctrl.GetId())
-            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), ctrl)
+            self.set_ctrl_id(ctrl.GetId())
+            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), ctrl)
             return ctrl
         if "choices" in self.args:
             label = wx.StaticText(parent, wx.ID_ANY, label=self.args["label"])
@@ -280,8 +452,8 @@ class Attribute (object):
                 ctrl.Enable(self.args["enabled"])
             if "reactor" in self.args:
                 parent.Bind((wx.EVT_CHOICE if self.type==tuple else wx.EVT_LISTBOX), self.args["reactor"], ctrl)
-            object.__setattr__(self, "ctrlId", ctrl.GetId())
-            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), ctrl)
+            self.set_ctrl_id(ctrl.GetId())
+            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), ctrl)
             return associateElements(label, ctrl)
         if self.type==str:
             ctrl = wx.TextCtrl(parent, value=self.get())
@@ -289,8 +461,8 @@ class Attribute (object):
                 ctrl.Enable(self.args["enabled"])
             if "editable" in self.args:
                 ctrl.SetEditable(self.args["editable"])
-            object.__setattr__(self, "ctrlId", ctrl.GetId())
-            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), ctrl)
+            self.set_ctrl_id(ctrl.GetId())
+            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), ctrl)
             if "label" in self.args:
                 label = wx.StaticText(parent, wx.ID_ANY, label=self.args["label"])
                 return associateElements(label, ctrl)
@@ -299,8 +471,8 @@ class Attribute (object):
             label = wx.StaticText(parent, wx.ID_ANY, label=self.args["label"])
             if "min" not in self.args and "max" not in self.args:
                 ctrl = IntCtrl(parent, value=str(self.get()))
-                object.__setattr__(self, "ctrlId", ctrl.GetId())
-                parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), ctrl)
+                self.set_ctrl_id(ctrl.GetId())
+                parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), ctrl)
                 if "enabled" in self.args:
                     ctrl.Enable(self.args["enabled"])
                 return associateElements(label, ctrl)
@@ -309,10 +481,10 @@ class Attribute (object):
             slider = SliderCtrl(parent, wx.ID_ANY, minValue=minval, maxValue=maxval, value=self.get())
             if "reactor" in self.args:
                 parent.Bind(wx.EVT_SLIDER, self.args["reactor"], slider)
-            object.__setattr__(self, "ctrlId", slider.GetId())
+            self.set_ctrl_id(slider.GetId())
             if "enabled" in self.args:
                 slider.Enable(self.args["enabled"])
-            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), slider)
+            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), slider)
             return associateElements(label, slider)
         if self.type==float:
             label = wx.StaticText(parent, wx.ID_ANY, label=self.args["label"])
@@ -320,8 +492,8 @@ class Attribute (object):
                 ctrl = FloatCtrl(parent, value=str(self.get()))
                 if "enabled" in self.args:
                     ctrl.Enable(self.args["enabled"])
-                object.__setattr__(self, "ctrlId", ctrl.GetId())
-                parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), ctrl)
+                self.set_ctrl_id(ctrl.GetId())
+                parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), ctrl)
                 return associateElements(label, ctrl)
             minval = self.args.get("min", 0)
             maxval = self.args.get("max", minval+100)
@@ -330,16 +502,16 @@ class Attribute (object):
                 parent.Bind(wx.EVT_SLIDER, self.args["reactor"], slider)
             if "enabled" in self.args:
                 slider.Enable(self.args["enabled"])
-            object.__setattr__(self, "ctrlId", slider.GetId())
-            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), slider)
+            self.set_ctrl_id(slider.GetId())
+            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), slider)
             return associateElements(label, slider)
         if self.type==type(Ellipsis):
             ctrl = wx.Button(parent, label=self.args["label"])
             parent.Bind(wx.EVT_BUTTON, self.args["reactor"], ctrl)
-            object.__setattr__(self, "ctrlId", ctrl.GetId())
+            self.set_ctrl_id(ctrl.GetId())
             if "enabled" in self.args:
                 ctrl.Enable(self.args["enabled"])
-            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: object.__setattr__(self, "ctrlId", None)), ctrl)
+            parent.Bind(wx.EVT_WINDOW_DESTROY, (lambda e: self.set_ctrl_id(None)), ctrl)
             return ctrl
 
     def get_gui_control (self, parent=None):
@@ -383,6 +555,7 @@ class Holder (object):
                 attr = Attribute(self, key, type(value), value, key, {})
             try:
                 object.__setattr__(self, key, attr)
+                registry.add(self, key)
             except:
                 log.warning("Invalid name: %s, skipping...." % repr(key))
 
@@ -392,6 +565,7 @@ class Holder (object):
             attr.name = name
             attr.flip_allegiance(self)
             object.__setattr__(self, name, attr)
+            registry.add(self, name)
             return
         attr = getattr(self, name, None)
         if isinstance(attr, Attribute):
@@ -399,12 +573,14 @@ class Holder (object):
             return
         attr = Attribute(self, name, type(value), value, name, {})
         object.__setattr__(self, name, attr)
+        registry.add(self, name)
 
     def NewAttr (self, name, value, nickname=None, args={}):
         nickname = nickname if nickname else name
         args = args if args else {}
         attr = Attribute(self, name, type(value), value, nickname, args)
         object.__setattr__(self, name, attr)
+        registry.add(self, name)
 
     @property
     def attributes (self):
@@ -92,6 +92,8 @@ class Panel (SettingsPanel):
         self.controls = ctrls = {}
         settings = self.currentset()
         inst = self.currentinst()
+        # The panel edits the base settings, not the overrides of an application's profile
+        settings.profiles.switch(None)
         helper = BoxSizerHelper(self, sizer=settingsSizer)
         groups = {}
         for attr in sorted(settings.attributes, key=(lambda x: x.args.get("ordinal", x.id))):
@@ -139,7 +141,8 @@ class Panel (SettingsPanel):
                     log.warning(attr.name)
                     raise
                 attr.set()
-            settings.save(inst)
+            # Written in the background, so the dialog closes without waiting for the disk
+            settings.save(inst, defer=True)
         except Exception as e:
             log.warning(str(e))
 
@@ -0,0 +1,143 @@
+# Part of the Object Location Tones settings package
+# Write-behind persistence of the settings
+# Settings().save(instance, defer=True) takes a snapshot of the settings on the calling thread
+# and hands it over to a background writer, which writes only the latest snapshot after a quiet period.
+# That way, a burst of changes, e.g. a gesture pressed several times in a row, results in one write,
+# and neither the GUI thread nor NVDA's main thread waits for the disk.
+# A synchronous save supersedes a pending snapshot, and flush() writes it immediately, e.g. when terminating.
+# A snapshot already being written cannot be taken back, so a save made meanwhile compares against the values it writes.
+
+from threading  import Thread, Condition
+from time       import monotonic
+from logHandler import log
+
+__all__ = ["Writer"]
+
+class Writer (object):
+    """
+    Calls write(*job) on a background thread for the last job given to submit(),
+    once delay seconds passed without another submit().
+    Only one job runs at a time, whether on the background thread or synchronously via run() or flush().
+    The thread is started by the first submit() and stopped by close().
+    """
+    def __init__ (self, write, delay=2.0):
+        self.write   = write
+        self.delay   = delay
+        self.job     = None  # The pending job, a tuple of arguments to write()
+        self.current = None  # The job being written at the moment, if any
+        self.due     = 0.0   # monotonic() time after which the pending job is written
+        self.busy    = False # Is a job being written at the moment
+        self.thread  = None
+        self.running = False
+        self.waiter  = Condition()
+
+    def submit (self, *job):
+        """
+        Makes job the pending one, replacing any previous, and restarts the quiet period.
+        """
+        with self.waiter:
+            self.job = job
+            self.due = monotonic()+self.delay
+            if self.thread is None:
+                self.running = True
+                self.thread  = Thread(target=self._run, name="objloc settings writer", daemon=True)
+                self.thread.start()
+            self.waiter.notify()
+
+    def pending (self):
+        return self.job is not None
+
+    def writing (self):
+        """
+        Returns the job being written at the moment, None if there is none.
+        It stays the current one until write() returned, i.e. until whatever write() does with it is done.
+        """
+        with self.waiter:
+            return self.current
+
+    def _acquire (self, job):
+        # Called with the waiter held: waits for the job being written and marks the writer busy with job
+        while self.busy:
+            self.waiter.wait()
+        self.busy    = True
+        self.current = job
+
+    def _release (self):
+        with self.waiter:
+            self.busy    = False
+            self.current = None
+            self.waiter.notify_all()
+
+    def _run (self):
+        waiter = self.waiter
+        with waiter:
+            while self.running:
+                if self.job is None or self.busy:
+                    waiter.wait()
+                    continue
+                left = self.due-monotonic()
+                if left>0:
+                    waiter.wait(left)
+                    continue
+                job, self.job = self.job, None
+                self.busy    = True
+                self.current = job
+                waiter.release()
+                try:
+                    self.write(*job)
+                except Exception as e:
+                    log.warning("Saving the settings in the background failed because of "+repr(e))
+                finally:
+                    waiter.acquire()
+                    self.busy    = False
+                    self.current = None
+                    waiter.notify_all()
+
+    def run (self, *job):
+        """
+        Writes job on the calling thread, dropping the pending job, which it supersedes.
+        Waits for a write in progress first, so the two never overlap.
+        Exceptions from write() are propagated.
+        """
+        with self.waiter:
+            self._acquire(job)
+            self.job = None
+        try:
+            return self.write(*job)
+        finally:
+            self._release()
+
+    def cancel (self):
+        """
+        Drops the pending job. The one being written, if any, is not stopped, see writing().
+        """
+        with self.waiter:
+            self.job = None
+
+    def flush (self):
+        """
+        Writes the pending job, if any, on the calling thread right away.
+        Exceptions from write() are propagated.
+        """
+        with self.waiter:
+            self._acquire(self.job)
+            job, self.job = self.job, None
+        try:
+            if job is not None:
+                self.write(*job)
+        finally:
+            self._release()
+
+    def close (self):
+        """
+        Flushes the pending job and stops the thread.
+        """
+        try:
+            self.flush()
+        finally:
+            with self.waiter:
+                self.running = False
+                self.waiter.notify_all()
+            thread, self.thread = self.thread, None
+            if thread is not None:
+                thread.join()
@@ -0,0 +1,190 @@
+# Part of the Object Location Tones settings package
+# Per application profiles: sparse overrides of the settings, laid over them while an application is in the foreground
+# A profile is a dict of {nickname: value} for the settings it overrides, kept in the settings file under "profiles",
+# keyed by the profile name, e.g. the application's name.
+# Switching profiles is a dict lookup and assigns only the values that differ, the settings file and the panel are not touched.
+# While a profile is active, the Attribute()s keep the base values, so saving writes those,
+# and a value assigned meanwhile to an overridden setting goes into the profile instead.
+# The panel always edits the base settings, so opening it switches back to them.
+
+from .objects   import Holder
+from logHandler import log
+
+__all__ = ["Profiles"]
+
+class Profiles (object):
+    """
+    The profiles of a Settings(), and the overlay of the active one.
+    Settables created with profile=False are never overridden,
+    e.g. those whose change needs more than an assignment, like rebinding event handlers.
+    Neither are those of Holder()s, whose Attribute()s are their values, so they could not keep the base ones.
+    """
+    def __init__ (self, settings):
+        self.settings  = settings
+        self.overrides = {}   # Profile name --> {nickname: value}
+        self.active    = None # Name of the profile switched to, None for the base settings
+        self.overlay   = {}   # Attribute() --> value of the active profile bound to its instance
+        self.version   = 0    # Changes of the overrides so far
+        self.saved     = 0    # self.version last written to the file
+        self.listeners = []   # Callbacks called with the list of Attribute()s whose values a switch changed
+
+    def listen (self, callback):
+        """
+        Registers callback(changed) to be called after each switch that changed values,
+        e.g. to apply those that take effect elsewhere than in the instance.
+        """
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def load (self, d):
+        """
+        Replaces the overrides by the dict d, as found in the settings file. Malformed profiles are logged and skipped.
+        The active profile is left, as its values may be gone.
+        """
+        self.switch(None)
+        overrides = {}
+        if isinstance(d, dict):
+            for name, profile in d.items():
+                if isinstance(profile, dict):
+                    overrides[name] = dict(profile)
+                else:
+                    log.warning("Settings profile %r is not a dict, skipping..." % name)
+        elif d is not None:
+            log.warning("Settings profiles are not a dict, skipping...")
+        self.overrides = overrides
+        self.version = self.saved = 0
+
+    def dump (self):
+        """
+        Returns a copy of the overrides to be saved, without empty profiles.
+        """
+        return dict((name, dict(profile)) for name, profile in self.overrides.items() if profile)
+
+    def pending (self):
+        """
+        Tells whether the overrides changed since they were last written.
+        """
+        return self.version!=self.saved
+
+    def seal (self, version):
+        """
+        Called by Settings().write() once the overrides of the given version are in the file.
+        """
+        if version>self.saved:
+            self.saved = version
+
+    def get (self, name):
+        """
+        Returns the {nickname: value} overrides of the profile, an empty dict if there is none.
+        """
+        return dict(self.overrides.get(name, {}))
+
+    def set (self, name, nickname, value):
+        """
+        Overrides the setting with the nickname by value in the profile, and binds it if the profile is active.
+        """
+        attr = self.settings.by_nickname.get(nickname)
+        if attr is None or not self.overridable(attr):
+            raise KeyError("'%s' cannot be overridden" % nickname)
+        if not isinstance(value, attr.type):
+            raise TypeError("Wrong type for attribute %s. '%s' given, '%s' expected." % (attr.name, value.__class__.__name__, attr.type.__name__))
+        profile = self.overrides.setdefault(name, {})
+        if nickname in profile and profile[nickname]==value:
+            return
+        profile[nickname] = value
+        self.version += 1
+        if name==self.active:
+            self.rebind(name)
+
+    def remove (self, name, nickname=None):
+        """
+        Drops the override of the setting with the nickname from the profile, or the whole profile if nickname is None.
+        """
+        if nickname is None:
+            dropped = self.overrides.pop(name, None) is not None
+        else:
+            dropped = self.overrides.get(name, {}).pop(nickname, Ellipsis) is not Ellipsis
+        if not dropped:
+            return
+        self.version += 1
+        if name==self.active:
+            self.rebind(name)
+
+    def overridable (self, attr):
+        return attr.args.get("profile", True) and not isinstance(attr.instance, Holder) and not attr.is_class_attr()
+
+    def take (self, attr):
+        """
+        Moves a value assigned to the overridden attribute's instance attribute since it was bound into the active profile.
+        """
+        value = self.overlay[attr]
+        try:
+            current = getattr(attr.instance, attr.name)
+        except AttributeError:
+            return
+        if current==value or not isinstance(current, attr.type):
+            return
+        self.overlay[attr] = current
+        self.overrides.setdefault(self.active, {})[attr.nickname] = current
+        self.version += 1
+
+    def switch (self, name):
+        """
+        Lays the profile name over the settings, None meaning none, and returns the list of Attribute()s whose values changed.
+        Settings without an override in the profile are left at their base values.
+        Nothing is saved and the panel is not refreshed.
+        """
+        if name==self.active:
+            return []
+        if not self.overlay and name not in self.overrides:
+            # The most common case, from one application without a profile to another
+            self.active = name
+            return []
+        return self.rebind(name)
+
+    def rebind (self, name):
+        for attr in list(self.overlay):
+            self.take(attr)
+        self.active = name
+        overlay = {}
+        by_nickname = self.settings.by_nickname
+        for nickname, value in self.overrides.get(name, {}).items():
+            attr = by_nickname.get(nickname)
+            if attr is None or not self.overridable(attr) or not isinstance(value, attr.type):
+                continue
+            overlay[attr] = value
+        changed = []
+        for attr in self.overlay:
+            if attr not in overlay:
+                # Back to the base value, which the Attribute() kept meanwhile
+                if self.bind(attr, attr._value):
+                    changed.append(attr)
+        for attr, value in overlay.items():
+            if attr not in self.overlay:
+                # Before its instance attribute is overridden, the Attribute() takes the base value from it
+                try:
+                    attr.get()
+                except Exception as e:
+                    log.warning(str(e))
+                    continue
+                if attr.has_changed():
+                    self.settings.unsaved.add(attr)
+            if self.bind(attr, value):
+                changed.append(attr)
+        self.overlay = overlay
+        if changed:
+            for callback in self.listeners:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    log.warning("Applying the settings profile %r failed because of %r" % (name, e))
+        return changed
+
+    def bind (self, attr, value):
+        try:
+            if getattr(attr.instance, attr.name)==value:
+                return False
+        except AttributeError:
+            pass
+        setattr(attr.instance, attr.name, value)
+        return True
@@ -3,46 +3,201 @@
 # and even, possibly, loads from remote URLs
 # Also, in the future, perhaps reflect the order of attribute creation within the settings file
 # Provides also a safe way to save the serialized data in an atomic way
+# Formats are kept in a registry. JSON, human editable, is the default,
+# and a compact binary one is available for large settings. Loading recognizes the format by itself.
 
 from .objects import Holder
+from abc import ABC, abstractmethod
 from tempfile import mkstemp
 from stat import S_ISREG
 from glob import glob
 from shutil import copyfileobj
-from threading import Lock
-import winKernel
+from .exceptions import SettingsError, FileLockTimeout
+from .locking    import FileLock, LockRegistry, RecentPaths
+from .commit     import Committer, get_committer
+from time       import monotonic
+import marshal
+import codecs
+import mmap
+import io
+import struct
 import os
 import json
 
-__all__ = ["SDict", "SafeFile"]
+__all__ = ["SDict", "SafeFile", "Format", "JSONFormat", "BinaryFormat", "register_format", "get_format", "detect_format"]
+
+class Format (ABC):
+    """
+    Base of settings file formats.
+    A format turns a dict into bytes and back. Formats with a magic are recognized by the start of the data,
+    and the one without it, JSON, is the fallback.
+    Subclasses must implement dumps() and loads(), or they cannot be instantiated.
+    """
+    name  = None
+    magic = None
+
+    @abstractmethod
+    def dumps (self, d):
+        """
+        Returns the dict d as bytes.
+        """
+
+    @abstractmethod
+    def loads (self, data):
+        """
+        Returns the dict from data, bytes or another buffer, e.g. an mmap of the file.
+        """
+
+    def detect (self, data):
+        """
+        Tells whether the bytes data, the start of a file, is in this format.
+        """
+        return self.magic is not None and data.startswith(self.magic)
+
+class JSONFormat (Format):
+    """
+    Indented, human editable JSON in UTF-8.
+    """
+    name = "json"
+
+    def dumps (self, d):
+        return json.dumps(d, indent=4).encode("utf-8")
+
+    def loads (self, data):
+        if isinstance(data, (bytes, bytearray, str)):
+            return json.loads(data)
+        # json takes no buffers like mmap, but the decoder does, so the text is decoded straight from the file's pages
+        # instead of being copied into bytes first. A BOM, which editors may add, is skipped like json.loads() does.
+        return json.loads(codecs.decode(data, "utf-8-sig"))
+
+    def detect (self, data):
+        return data.lstrip()[:1] in (b"{", b"")
+
+class BinaryFormat (Format):
+    """
+    Compact binary format: the magic, a version of the layout and the marshal version used,
+    followed by the marshal dump of the dict. Only the types JSON has are allowed in,
+    with tuples written as lists, just like the JSON format does.
+    marshal is implemented in C, so both ways are faster than JSON, and the output smaller.
+    The marshal version is fixed, so files do not depend on the Python version that wrote them.
+    As with JSON, only local files written by the add-on itself are meant to be loaded.
+    """
+    name    = "binary"
+    magic   = b"OLSB"
+    version = 1
+    marshal_version = 4
+    header  = struct.Struct("<4sBB")
+    types   = (str, int, float, bool, type(None))
+
+    def _plain (self, value):
+        if isinstance(value, self.types):
+            return value
+        if isinstance(value, (list, tuple)):
+            return [self._plain(v) for v in value]
+        if isinstance(value, dict):
+            plain = {}
+            for k, v in value.items():
+                if not isinstance(k, str):
+                    raise TypeError("Keys must be str, not %s" % type(k).__name__)
+                plain[k] = self._plain(v)
+            return plain
+        raise TypeError("Object of type %s cannot be saved" % type(value).__name__)
+
+    def dumps (self, d):
+        return self.header.pack(self.magic, self.version, self.marshal_version)+marshal.dumps(self._plain(d), self.marshal_version)
+
+    def loads (self, data):
+        if len(data)<self.header.size:
+            raise ValueError("Truncated binary settings")
+        magic, version, mversion = self.header.unpack_from(data)
+        if magic!=self.magic or version>self.version or mversion>marshal.version:
+            raise ValueError("Unsupported binary settings version %i.%i" % (version, mversion))
+        with memoryview(data) as view, view[self.header.size:] as body:
+            # Parsed straight from the buffer, an mmap of the file included, without copying it first
+            d = marshal.loads(body)
+        if not isinstance(d, dict):
+            raise ValueError("Binary settings do not hold a dict")
+        return d
+
+formats = {} # Name --> Format() instance
+
+def register_format (fmt):
+    """
+    Adds a Format() instance to the registry, replacing a format of the same name. Returns fmt.
+    """
+    formats[fmt.name] = fmt
+    return fmt
+
+def get_format (name):
+    try:
+        return formats[name]
+    except KeyError:
+        raise SettingsError("Unknown settings format %r" % name)
+
+def detect_format (data):
+    """
+    Returns the format that wrote the data, bytes or another buffer, those with a magic tried first, JSON being the fallback.
+    """
+    head = bytes(data[:64])
+    for fmt in sorted(formats.values(), key=(lambda f: f.magic is None)):
+        if fmt.detect(head):
+            return fmt
+    return formats["json"]
+
+register_format(JSONFormat())
+register_format(BinaryFormat())
 
 class SDict (dict):
-    def dump (self, f):
+    def dumps (self, format="json"):
+        """
+        Returns the content of the SDict() serialized as bytes in the format given by its name.
+        """
+        return get_format(format).dumps(self)
+
+    def loads (self, data):
+        """
+        Updates the SDict() from bytes, another buffer like an mmap, or str, of any registered format and returns self.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.update(detect_format(data).loads(data))
+        return self
+
+    def dump (self, f, format="json"):
         """
         Dumps the content of the SDict() into a settings file given by f.
         f --> A file-like object opened for writing.
+        format --> Name of a registered format, JSON by default.
+        Files opened in text mode can only take JSON.
         """
-        json.dump(self, f, indent=4)
+        if hasattr(f, "encoding"):
+            if format!="json":
+                raise SettingsError("The %r format needs a file opened in binary mode" % format)
+            json.dump(self, f, indent=4)
+            return
+        f.write(self.dumps(format))
 
     def load (self, f):
         """
         Loads a settings file given by f into a SDict() instance.
-        f --> A file-like object opened for reading
+        f --> A file-like object opened for reading, preferably in binary mode, which allows any registered format.
+        The format is recognized from the content.
+        A SafeFile() is read through its mmap view(), so the content is not copied before parsing.
         It is a regular method instead of a class method so that existing
         SDict() can be edited before, but still updated from the file if necessary.
         Possible usage for this scenario is settings changes when updating.
         Returns self so that the load can be chained e.g.:
         d = SDict().load(f)
         """
-        self.update(json.load(f))
-        return self
+        view = getattr(f, "view", None)
+        return self.loads(view() if view is not None else f.read())
 
     def to_instance (self):
         return Holder(self)
 
 class SafeFile:
     """
-    Windows-only atomic file writer with read/write/append support.
+    Atomic file writer with read/write/append support.
     Inspired by NVDA's fileUtils.FaultTolerantFile() function.
     This class allows for more flexibility though, and fixes bugs that are present there.
     It implements a file-like object, not only a context manager.
@@ -74,8 +229,13 @@ class SafeFile:
       variants) always write to a temporary file and, on successful close or
       context exit, replace the target file with that temporary file.
     * For modes that conceptually start from existing content ('r+', 'a',
-      'a+'), SafeFile first copies the current contents of the target into
-      the temporary file before exposing the file object to the caller.
+      'a+'), SafeFile copies on write: until the first write() or truncate(),
+      the target itself is read, and only then are its current contents copied
+      into the temporary file, which takes over at the same position.
+      If nothing was written by the time of closing, the target is left as it is,
+      without being copied nor replaced.
+    * In read-only modes, view() returns a read-only mmap of the whole target,
+      which the settings formats parse without copying the file into memory first.
 
     Atomicity and durability
     ------------------------
@@ -83,9 +243,14 @@ class SafeFile:
       given a unique name.
     * On successful commit, SafeFile:
         1. flushes Python-level buffers,
-        2. calls fsync() on the temporary file descriptor, and
-        3. calls MoveFileExW with MOVEFILE_REPLACE_EXISTING and
-           MOVEFILE_WRITE_THROUGH to replace the target with the temporary.
+        2. syncs the temporary file to disk as its committer's fsync policy asks for, and
+        3. has the committer (see the commit module) atomically replace the target
+           with the temporary: MoveFileExW with MOVEFILE_REPLACE_EXISTING and
+           MOVEFILE_WRITE_THROUGH on Windows, os.replace() followed by syncing
+           the directory elsewhere.
+    * The fsync policies are "full" (the default, as above), "data" (only the
+      file contents are synced and the replacement is not waited for) and
+      "none" (nothing is synced, for tests and benchmarks).
     * If any of these steps fail, the replacement is not performed and the
       original target file is left unchanged. The temporary file and any
       placeholder file are removed according to the deletion flags.
@@ -103,11 +268,24 @@ class SafeFile:
     * SafeFile uses an in-process lock keyed by target path so that, within a
       single Python process, multiple SafeFile instances referring to the same
       path are serialized while the instance remains open.
-    * This locking is per-process only. Other processes are not coordinated
-      and may open or modify the target file concurrently using normal OS
-      APIs.
-    * The lock is held from successful construction until close() or
-      __exit__() releases it. If construction fails, the lock is released
+      The locks are kept in SafeFile.locks, a LockRegistry() counting the
+      instances that hold or wait for each one, and a path's lock is dropped
+      with its last user, so memory does not grow with the paths ever opened.
+      SafeFile.stats() reports the live entries.
+    * Writable modes also take an advisory cross-process lock, the lock file
+      <target>.lock (see the locking module), so that e.g. NVDA and an
+      add-on installation do not write the same file at once. Lock files of
+      dead processes, or not refreshed for FileLock.stale_after seconds, are
+      broken. The lock is refreshed when committing, so a writable SafeFile
+      should not be kept open longer than that.
+      Read-only modes do not take it, as the atomic replacement never shows
+      them a partially written file. Processes that do not use SafeFile are
+      not coordinated and may open or modify the target file concurrently
+      using normal OS APIs.
+    * Locks are waited for at most timeout seconds, the cross-process one
+      polled with exponential backoff; FileLockTimeout is raised after that.
+    * The locks are held from successful construction until close() or
+      __exit__() releases them. If construction fails, the locks are released
       before the exception is propagated
     * Thread-safety applies both to write and to read-only modes
 
@@ -127,7 +305,7 @@ class SafeFile:
 
     Attributes and ACLs
     -------------------
-    * Replacement is performed using MoveFileExW, which replaces the target
+    * Replacement is performed using MoveFileExW or os.replace(), which replace the target
       entry with the temporary file. File attributes, ACLs, and other
       metadata on the original target are not preserved; after a successful
       replacement, they match those of the temporary file.
@@ -173,15 +351,34 @@ class SafeFile:
         that placeholder during cleanup. If create_empty=False, this option
         has no effect.
 
+    * timeout (float or None, default None)
+        Seconds to wait for the locks before raising FileLockTimeout,
+        None waits forever.
+
+    * fail_on_lock (bool, default False)
+        Older spelling of timeout=0, i.e. do not wait at all.
+
+    * process_lock (bool, default True)
+        If False, writable modes do not take the cross-process lock.
+
+    * fsync (str, default "full")
+        The fsync policy of the commit, "full", "data" or "none".
+
+    * committer (str, Committer or None, default None)
+        Name of the commit strategy in the commit module's registry, or a Committer() instance,
+        which brings its own fsync policy. None picks the one of this system.
+
     * clean_directory (bool, default True)
         If True, SafeFile attempts to remove matching leftover temporary files
         that were opened before when managing the target file.
-        Cleanup is performed before opening a new temporary file and works only once per process for the target file in question.
+        Cleanup is performed before opening a new temporary file and works only once per process for the target file in question,
+        as long as it is among the SafeFile.cleaned.maxsize targets cleaned most recently.
+        It runs under the cross-process lock, so it never removes the temporary file of another writer in progress.
         This cleanup is best-effort and ignores ordinary exceptions.
 
     Limitations
     -----------
-    * Locking is per-process only; it does not coordinate with other processes.
+    * Cross-process locking is advisory; it coordinates only with other SafeFile()s.
     * Attributes, ACLs, and other metadata of an existing target are not
       preserved when the file is replaced.
     * This class aims to be file-like and proxies most common file methods,
@@ -216,11 +413,12 @@ class SafeFile:
     -----
     - Add a resize for a created temp file using mmap.mmap() so that disk space can be also reserved in advance, not only the target name.
       Good practice for large downloads. Need to know whether data will fit in advance and, also, prevent other processes from using the needed space in mid write of our file.
-    - Remove locks of closed files to preserve memory (not a priority since we do not expect bursts of SafeFile()s per process)
     """
-    locks   = {} # Class attr: Keeps locks of safely opened files making the thing thread-safe per file
-    cleaned = {} # Allows temp files leftover cleanup per target but only once in same process
+    locks   = LockRegistry()   # Class attr: Keeps locks of safely opened files making the thing thread-safe per file
+    cleaned = RecentPaths(64) # Allows temp files leftover cleanup per target but only once in same process
     def __init__ (self, name, mode="r", *args, **kwargs):
+        self._cow  = False # Copy on write pending, self._file reads the target until then
+        self._view = None
         self.mode = mode = mode.lower()
         self.name = name = os.path.abspath(name)
         self.create_empty      = create_empty = kwargs.pop("create_empty", True)
@@ -228,19 +426,41 @@ class SafeFile:
         self.delete_target     = kwargs.pop("delete_target", True)
         self.clean_directory   = kwargs.pop("clean_directory", True)
         self.fail_on_lock      = kwargs.pop("fail_on_lock", False)
+        self.timeout           = timeout = kwargs.pop("timeout", 0 if self.fail_on_lock else None)
+        self.process_lock      = kwargs.pop("process_lock", True)
+        fsync                  = kwargs.pop("fsync", "full")
+        committer              = kwargs.pop("committer", None)
+        self.committer         = committer if isinstance(committer, Committer) else get_committer(committer, fsync)
         self.created = created = False
         self._temp   = None
-        self.lock = lock = self.locks.setdefault(name, Lock())
-        if self.fail_on_lock and lock.locked():
-            raise RuntimeError(f"Target {name!r} already opened")
-        lock.acquire()
+        self._flock  = None
+        self._locked = False # Holds self.lock, and counts as a user of it in self.locks
+        deadline = None if timeout is None else monotonic()+timeout
+        self.lock = lock = self.locks.get(name)
+        try:
+            acquired = lock.acquire(timeout=-1 if timeout is None else timeout)
+        except:
+            self.locks.put(name)
+            raise
+        if not acquired:
+            self.locks.put(name)
+            raise FileLockTimeout(f"Target {name!r} already opened")
+        self._locked = True
         writable = self.iswritable()
+        if writable and self.process_lock:
+            flock = FileLock(name)
+            try:
+                flock.acquire(None if deadline is None else max(deadline-monotonic(), 0))
+            except:
+                self._unlock()
+                raise
+            self._flock = flock
         if not writable:
             # Just open the target file directly since we will not be making any changes
             try:
                 self._file = f = open(name, mode, *args, **kwargs)
             except:
-                lock.release()
+                self._unlock()
                 raise
             return
         # Avoid possible Windows weirdness surrounding exclusive file creation
@@ -258,17 +478,17 @@ class SafeFile:
         try:
             st = os.stat(name) # If file exists
             if "x" in mode:
-                lock.release()
+                self._unlock()
                 raise FileExistsError(f"File {name!r} already exists for mode {mode!r}")
             if not S_ISREG(st.st_mode):
                 # We deal with files only, best stop immediately if target is wrong
-                lock.release()
+                self._unlock()
                 raise OSError(f"Target {name!r} is not a regular file")
             # No point copying an empty file, so revide the decision
             must_copy = st.st_size!=0 if must_copy else False
         except FileNotFoundError:
             if must_exist:
-                lock.release()
+                self._unlock()
                 raise FileNotFoundError(f"File {name!r} does not exist for mode {mode!r}")
             if create_empty:
                 try:
@@ -280,26 +500,26 @@ class SafeFile:
                     try:
                         st = os.stat(name)
                     except FileNotFoundError:
-                        lock.release()
+                        self._unlock()
                         raise RuntimeError(f"Target {name!r} appeared and disappeared during open()")
                     if "x" in mode:
-                        lock.release()
+                        self._unlock()
                         raise FileExistsError(f"File {name!r} already exists for mode {mode!r}")
                     if not S_ISREG(st.st_mode):
-                        lock.release()
+                        self._unlock()
                         raise OSError(f"Target {name!r} is not a regular file")
                     # No point copying if new file is empty
                     must_copy = st.st_size!=0 if must_copy else False
                 except:
                     # PermissionError or something else
-                    lock.release()
+                    self._unlock()
                     raise
         except:
             # PermissionError or something else
-            lock.release()
+            self._unlock()
             raise
         dirpath, filename = os.path.split(name)
-        if self.clean_directory and not self.cleaned.get(name, False):
+        if self.clean_directory and self.cleaned.add(name):
             # Remove leftovers
             try:
                 for tfp in glob(filename+".*.tmp", root_dir=dirpath):
@@ -310,40 +530,38 @@ class SafeFile:
             except Exception:
                 pass
             except:
-                lock.release()
+                self._unlock()
                 raise
-            finally:
-                self.cleaned[name] = True
         # Lets first create a temporary file on disk in the same dir as the target
         try:
             fd, tempfile = mkstemp(dir=dirpath, prefix=filename+".", suffix=".tmp")
         except:
-            lock.release()
+            self._unlock()
             raise
         self._temp = tempfile
         try:
             if must_copy:
-                # Copy original if needed, that is, for "r+" and "a*" modes
+                # Original content is needed for "r+" and "a*" modes, but it is copied on the first write only (see _materialize())
                 try:
                     os.close(fd)
                 except OSError:
                     pass
+                self._openargs = (tempmode, args, kwargs)
                 try:
-                    with open(name, "rb", buffering=0) as rf, open(tempfile, "wb", buffering=0) as wf:
-                        copyfileobj(rf, wf, length=1024**2)
+                    f = open(name, "rb" if "b" in mode else "r", *args, **kwargs)
+                    if "a" in mode:
+                        f.seek(0, os.SEEK_END)
+                    self._cow = True
                 except FileNotFoundError:
-                    # This covers source file didn't exist when expected,
-                    # or it was removed between placeholder create and copy.
-                    # Missing original is fatal for r+, but acceptable for append modes though
+                    # Removed meanwhile, which is fatal for r+, but acceptable for append modes
                     if must_exist:
                         self._cleanup()
                         raise FileNotFoundError(f"File {name!r} does not exist for mode {mode!r}")
-                except Exception:
-                    self._cleanup()
-                    raise
-                try:
-                    # Now open the temp file in requested mode
-                    f = open(tempfile, tempmode, *args, **kwargs)
+                    try:
+                        f = open(tempfile, tempmode, *args, **kwargs)
+                    except Exception:
+                        self._cleanup()
+                        raise
                 except Exception:
                     self._cleanup()
                     raise
@@ -372,7 +590,7 @@ class SafeFile:
                     raise
             self._file = f
         except:
-            lock.release()
+            self._unlock()
             raise
 
     iswritable = lambda self: any((flag in self.mode) for flag in ("w", "a", "x", "+"))
@@ -389,6 +607,13 @@ class SafeFile:
         if a=="buffer" or a=="detach" or a=="reconfigure":
             # This is something you do not mess with in SafeFile()s so just report it as not here
             raise AttributeError(f"'SafeFile' object has no attribute '{a}'")
+        if self._cow:
+            if a=="write" or a=="writelines" or a=="truncate":
+                self._materialize()
+            elif a=="writable":
+                return lambda: True
+            elif "r" not in self.mode and "+" not in self.mode and (a.startswith("read") or a=="__next__"):
+                raise io.UnsupportedOperation("not readable")
         f = self._file
         if f is None:
             if a=="tell" or a=="truncate" or a=="flush" or a=="isatty" or a.startswith("read") or a.startswith("write") or a.startswith("seek") or a=="__next__":
@@ -407,11 +632,89 @@ class SafeFile:
             raise ValueError("I/O operation on closed file.")
         return iter(f)
 
+    def _materialize (self):
+        """
+        Copies the target into the temporary file and continues there at the same position.
+        Called on the first write, or truncate, in modes that start from the existing content.
+        """
+        f = self._file
+        self._cow = False
+        self._file = None
+        tempmode, args, kwargs = self._openargs
+        try:
+            pos = f.tell()
+            f.close()
+            try:
+                with open(self.name, "rb", buffering=0) as rf, open(self._temp, "wb", buffering=0) as wf:
+                    copyfileobj(rf, wf, length=1024**2)
+            except FileNotFoundError:
+                # Removed since the opening, fatal for r+ only
+                if "a" not in self.mode:
+                    raise FileNotFoundError(f"File {self.name!r} does not exist for mode {self.mode!r}")
+            f = open(self._temp, tempmode, *args, **kwargs)
+            if "a" not in self.mode:
+                f.seek(pos)
+        except:
+            self._cleanup()
+            self._unlock()
+            raise
+        self._file = f
+
+    def view (self):
+        """
+        Returns a read-only mmap of the whole file, for parsing it without reading it into memory first.
+        An empty file gives b"". The map is closed together with the SafeFile().
+        Available in read-only modes only.
+        """
+        if self.iswritable():
+            raise io.UnsupportedOperation("view() is available in read-only modes only")
+        f = self._file
+        if f is None or f.closed:
+            raise ValueError("I/O operation on closed file.")
+        if self._view is None:
+            try:
+                self._view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                return b""
+        return self._view
+
+    def _close_view (self):
+        v, self._view = self._view, None
+        if v is not None:
+            try:
+                v.close()
+            except BufferError:
+                # Still exported by a memoryview someone keeps, it is closed when collected
+                pass
+
     @property
     def closed (self):
         f = self._file
         return f is None or f.closed
 
+    def _unlock (self):
+        flock, self._flock = self._flock, None
+        if flock is not None:
+            flock.release()
+        # Only once, as the lock may be held by another SafeFile() by the next call
+        if self._locked:
+            self._locked = False
+            try:
+                self.lock.release()
+            except RuntimeError:
+                pass
+            self.locks.put(self.name)
+
+    @classmethod
+    def stats (cls):
+        """
+        Returns the stats() of the lock registry, with the number of targets remembered as cleaned added as "cleaned".
+        """
+        d = cls.locks.stats()
+        d["cleaned"] = len(cls.cleaned)
+        return d
+
     def _cleanup (self):
         if self.delete_temporary and self._temp:
             try:
@@ -428,12 +731,25 @@ class SafeFile:
 
     def _commit (self):
         f = self._file
+        if self._cow:
+            # Nothing was written, so the target stays as it is
+            self._cow = False
+            self._file = None
+            try:
+                f.close()
+            except OSError:
+                pass
+            self._cleanup()
+            return
         try:
+            if self._flock is not None:
+                # Syncing may take long, and the lock must not become stale before the target is replaced
+                self._flock.refresh()
             f.flush()
-            os.fsync(f.fileno())
+            self.committer.sync(f.fileno())
             f.close()
             self._file = None
-            winKernel.moveFileEx(self._temp, self.name, winKernel.MOVEFILE_REPLACE_EXISTING | winKernel.MOVEFILE_WRITE_THROUGH)
+            self.committer.replace(self._temp, self.name)
             self.created = False
             self._temp = None
         except Exception:
@@ -448,16 +764,14 @@ class SafeFile:
             if self.iswritable():
                 self._commit()
                 return
+            self._close_view()
             try:
                 f.close()
             except OSError:
                 pass
             self._file = None
         finally:
-            try:
-                self.lock.release()
-            except RuntimeError:
-                pass
+            self._unlock()
 
     # The underlying __enter__ method returns the wrong object
     # (self._file) so override it to return the wrapper
@@ -472,6 +786,7 @@ class SafeFile:
             return
         try:
             if not self.iswritable():
+                self._close_view()
                 try:
                     f.close()
                 except OSError:
@@ -510,10 +825,7 @@ class SafeFile:
             self._file = None
             self._cleanup()
         finally:
-            try:
-                self.lock.release()
-            except RuntimeError:
-                pass
+            self._unlock()
 
     def __repr__ (self):
         where = self._temp if self._temp else self.name
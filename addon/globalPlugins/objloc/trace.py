@@ -0,0 +1,282 @@
+# Part of Object Location Tones
+# Event and tone trace recorder
+# Records the NVDA events the add-on handles (when they came, how long their handler took, location, role
+# name and window of the object, caret point, mouse position or key name) and the positional tones it plays,
+# into a compact binary file, so that problems that happen only in the field can be replayed and profiled offline
+# (see bench.replay in the add-on's repository)
+# The recorder is off unless the OBJLOC_TRACE environment variable is set to the path of the file to record to
+# When the file grows over OBJLOC_TRACE_SIZE kilobytes (4096 by default) it is rotated,
+# and the last few files are kept as <path>.1, <path>.2... Each NVDA session starts a new file.
+
+from time       import perf_counter as clock, time as wallclock
+from functools  import wraps
+from logHandler import log
+from .utils     import getCaretPos, getKeyName
+
+import struct
+import os
+
+__all__ = ["TraceRecorder", "recorder", "traced", "readTrace", "HEADER", "NO_POINT",
+           "EVENT_FOREGROUND", "EVENT_NAVIGATOR", "EVENT_CARET", "EVENT_MOUSE", "EVENT_KEY", "TONE", "TONE_STALE"]
+
+MAGIC   = b"OLTR"
+VERSION = 1
+
+# Record kinds, the first byte of each record
+EVENT_FOREGROUND = 1
+EVENT_NAVIGATOR  = 2
+EVENT_CARET      = 3
+EVENT_MOUSE      = 4
+EVENT_KEY        = 5
+TONE             = 16
+TONE_STALE       = 17
+NAME             = 32
+HEADER           = MAGIC[0] # A header starts every file, and each reopening of it
+
+NO_POINT = -2**31 # Caret point that was not available
+
+# All records start with the kind and microseconds since the previous record,
+# events continue with the duration of their handler in microseconds
+_header = struct.Struct("<4sBd")       # magic, version, wall clock time of the start
+_object = struct.Struct("<BIIiiiiHI")  # location (left, top, width, height), index of the role name, window handle
+_caret  = struct.Struct("<BIIiiiiHIii") # as _object and the caret point
+_mouse  = struct.Struct("<BIIii")      # mouse position
+_key    = struct.Struct("<BIIH")       # index of the key name given by a preceding NAME record
+_tone   = struct.Struct("<BIBfhHBB")   # 1 for a MIDI note and 0 for Hz, pitch, pitch bend, duration in ms, left and right volume
+_stale  = struct.Struct("<BI")
+_name   = struct.Struct("<BHB")        # index and length of the UTF-8 encoded key or role name that follows
+
+_records = {EVENT_FOREGROUND: _object, EVENT_NAVIGATOR: _object, EVENT_CARET: _caret, EVENT_MOUSE: _mouse,
+            EVENT_KEY: _key, TONE: _tone, TONE_STALE: _stale}
+
+class TraceRecorder (object):
+    """
+    Writes trace records to a file that is rotated after it grows over maxSize bytes.
+    The file is opened by the first record, and again by the first one after rotation or close().
+    Writing is buffered, the buffer is written out on rotation and by close().
+    When disabled, all methods return immediately.
+    If the file cannot be written, the recorder logs a warning and disables itself.
+    """
+    def __init__ (self, path=None, maxSize=4096*1024, backups=3):
+        self.enabled = bool(path)
+        self.path    = path
+        self.maxSize = maxSize
+        self.backups = backups
+        self.file    = None
+        self.size    = 0
+        self.last    = 0.0 # When was the last record written
+        self.names   = {}  # Key or role name --> its index in the current file
+        self.rotated = False
+
+    def _open (self):
+        if not self.rotated:
+            # A new session starts a new file, so the previous one is kept whole
+            self.rotated = True
+            if os.path.exists(self.path):
+                self._rotate()
+        self.file = open(self.path, "ab")
+        self.size = self.file.tell()
+        self.names.clear()
+        self.last = clock()
+        self.file.write(_header.pack(MAGIC, VERSION, wallclock()))
+        self.size += _header.size
+
+    def _rotate (self):
+        path = self.path
+        for i in range(self.backups-1, 0, -1):
+            if os.path.exists("%s.%i" % (path, i)):
+                os.replace("%s.%i" % (path, i), "%s.%i" % (path, i+1))
+        if self.backups>0:
+            os.replace(path, path+".1")
+        else:
+            os.unlink(path)
+
+    def _failed (self, e):
+        log.warning("Unable to write the trace to %r because of %s, tracing stopped" % (self.path, repr(e)))
+        self.enabled = False
+        self.close()
+
+    def _ready (self):
+        """
+        Opens the file if needed, rotating it first if it grew too big. Returns False if that failed.
+        """
+        if self.file is not None and self.size<self.maxSize:
+            return True
+        try:
+            if self.file is not None:
+                self.close()
+                self._rotate()
+            self._open()
+        except OSError as e:
+            self._failed(e)
+            return False
+        return True
+
+    def _write (self, data):
+        try:
+            self.file.write(data)
+            self.size += len(data)
+        except OSError as e:
+            self._failed(e)
+
+    def _delta (self):
+        t = clock()
+        d = int((t-self.last)*1000000)
+        self.last = t
+        return min(max(d, 0), 0xFFFFFFFF)
+
+    def _name (self, name):
+        """
+        Returns the index of name in the current file, writing a NAME record that defines it the first time.
+        """
+        index = self.names.get(name)
+        if index is None:
+            index = self.names[name] = len(self.names)
+            encoded = name.encode("utf-8")[:255]
+            self._write(_name.pack(NAME, index, len(encoded))+encoded)
+        return index
+
+    def event (self, kind, started, args, kwargs=None):
+        """
+        Records an event of the given kind, whose handler started at the clock() time started and was called with args and kwargs.
+        NVDA passes the object and nextHandler by position, the mouse position as x and y by name,
+        deciders, like the one of keyDown, pass everything by name.
+        """
+        if not self.enabled:
+            return
+        duration = min(int((clock()-started)*1000000), 0xFFFFFFFF)
+        if not self._ready():
+            return
+        try:
+            kwargs = kwargs or {}
+            if kind==EVENT_MOUSE:
+                x, y = args[2:4] if len(args)>=4 else (kwargs.get("x"), kwargs.get("y"))
+                data = _mouse.pack(kind, self._delta(), duration, x, y)
+            elif kind==EVENT_KEY:
+                gesture = args[0] if args else kwargs.get("gesture")
+                data = _key.pack(kind, self._delta(), duration, self._name(getKeyName(gesture)))
+            else:
+                obj = args[0] if args else kwargs.get("obj")
+                l, t, w, h = obj.location or (0, 0, 0, 0)
+                role = obj.role
+                role, window = self._name(getattr(role, "name", str(role))), obj.windowHandle or 0
+                if kind==EVENT_CARET:
+                    try:
+                        x, y = getCaretPos(obj)
+                    except Exception:
+                        x = y = NO_POINT
+                    data = _caret.pack(kind, self._delta(), duration, l, t, w, h, role, window, int(x), int(y))
+                else:
+                    data = _object.pack(kind, self._delta(), duration, l, t, w, h, role, window)
+        except Exception:
+            # Not a keyboard gesture, an object that died meanwhile...
+            return
+        self._write(data)
+
+    def tone (self, tone, duration, left, right):
+        """
+        Records a played tone, tone being Hz or a (note, bend) pair of the MIDI generator.
+        """
+        if not self.enabled or not self._ready():
+            return
+        duration = min(max(int(duration), 0), 0xFFFF)
+        left, right = min(max(int(left), 0), 255), min(max(int(right), 0), 255)
+        if isinstance(tone, tuple):
+            data = _tone.pack(TONE, self._delta(), 1, tone[0], tone[1], duration, left, right)
+        else:
+            data = _tone.pack(TONE, self._delta(), 0, tone, 0, duration, left, right)
+        self._write(data)
+
+    def stale (self):
+        """
+        Records a tone dropped as stale.
+        """
+        if not self.enabled or not self._ready():
+            return
+        self._write(_stale.pack(TONE_STALE, self._delta()))
+
+    def close (self):
+        """
+        Writes out and closes the file. The next record opens it again.
+        """
+        f, self.file = self.file, None
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+def traced (kind):
+    """
+    Decorates an event handler of the GlobalPlugin to record its events of the given kind.
+    When tracing is off, the handler itself is returned, so it costs nothing.
+    """
+    def decorator (handler):
+        if not recorder.enabled:
+            return handler
+        record = recorder.event
+        @wraps(handler)
+        def wrapper (self, *args, **kwargs):
+            started = clock()
+            try:
+                return handler(self, *args, **kwargs)
+            finally:
+                record(kind, started, args, kwargs)
+        return wrapper
+    return decorator
+
+def readTrace (path):
+    """
+    Yields the records of a trace file as (kind, time, fields) tuples.
+    time is the wall clock time of the record in seconds, fields are the record's values after the time delta,
+    with names instead of their indexes for key names and roles, and (version, time) for the HEADER.
+    Records of unknown kinds end the reading, as their length is not known.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    pos, end = 0, len(data)
+    t, names = 0.0, {}
+    while pos<end:
+        kind = data[pos]
+        if kind==HEADER:
+            if pos+_header.size>end:
+                return
+            magic, version, t = _header.unpack_from(data, pos)
+            if magic!=MAGIC:
+                return
+            pos += _header.size
+            names.clear()
+            yield (HEADER, t, (version, t))
+            continue
+        if kind==NAME:
+            if pos+_name.size>end:
+                return
+            _, index, length = _name.unpack_from(data, pos)
+            pos += _name.size
+            names[index] = data[pos:pos+length].decode("utf-8", "replace")
+            pos += length
+            continue
+        record = _records.get(kind)
+        if record is None or pos+record.size>end:
+            return
+        fields = record.unpack_from(data, pos)
+        pos += record.size
+        t += fields[1]/1000000.0
+        fields = fields[2:]
+        if kind==EVENT_KEY:
+            fields = (fields[0], names.get(fields[1], ""))
+        elif kind<=EVENT_CARET:
+            fields = fields[:5]+(names.get(fields[5], ""),)+fields[6:]
+        yield (kind, t, fields)
+
+def _fromEnvironment ():
+    path = os.environ.get("OBJLOC_TRACE", "")
+    if not path or path=="0":
+        return TraceRecorder()
+    try:
+        size = int(os.environ.get("OBJLOC_TRACE_SIZE", "4096"))*1024
+    except ValueError:
+        size = 4096*1024
+    return TraceRecorder(os.path.abspath(path), size)
+
+recorder = _fromEnvironment()
@@ -2,8 +2,9 @@ from api                    import getDesktopObject, getNavigatorObject, getFocu
 from winUser                import getCursorPos
 from textInfos              import POSITION_CARET, POSITION_FIRST, UNIT_CHARACTER, UNIT_LINE
 from speech                 import getObjectSpeech
-from controlTypes           import ROLE_TERMINAL, ROLE_EDITABLETEXT, ROLE_RICHEDIT, ROLE_PASSWORDEDIT, ROLE_DOCUMENT, ROLE_TABLE, ROLE_TABLECELL, ROLE_TABLEROW, ROLE_TABLECOLUMN, STATE_MULTILINE, OutputReason
+from controlTypes           import ROLE_TERMINAL, ROLE_EDITABLETEXT, ROLE_RICHEDIT, ROLE_PASSWORDEDIT, ROLE_DOCUMENT, ROLE_TABLE, ROLE_TABLECELL, ROLE_TABLEROW, ROLE_TABLECOLUMN, ROLE_LIST, STATE_MULTILINE, OutputReason
 from treeInterceptorHandler import DocumentTreeInterceptor
+from .metrics               import timed
 
 class LocationError (LookupError):
     """
@@ -25,6 +26,147 @@ def isMultiline (obj):
     """
     return STATE_MULTILINE in obj.states
 
+class TextMetrics (object):
+    """
+    Geometry of the text in an editable, in pixels:
+    line height, average character width, where the first character is relative to the editable's location,
+    and the DPI scale of its window and the editable's location when measured.
+    Unmeasured metrics (measured=False) are the defaults that positional tones always used, scaled to the DPI.
+    """
+    __slots__ = ("lineHeight", "charWidth", "originX", "originY", "scale", "measured", "location")
+    def __init__ (self, lineHeight=32, charWidth=16, originX=7, originY=43, scale=1.0, measured=False):
+        self.lineHeight = lineHeight
+        self.charWidth  = charWidth
+        self.originX    = originX
+        self.originY    = originY
+        self.scale      = scale
+        self.measured   = measured
+        self.location   = None
+
+    @classmethod
+    def default (cls, scale=1.0):
+        m = cls()
+        m.lineHeight, m.charWidth = int(m.lineHeight*scale), int(m.charWidth*scale)
+        m.originX, m.originY = int(m.originX*scale), int(m.originY*scale)
+        m.scale = scale
+        return m
+
+    def __repr__ (self):
+        return "TextMetrics(lineHeight=%i, charWidth=%i, originX=%i, originY=%i, scale=%s, measured=%s)" % (
+            self.lineHeight, self.charWidth, self.originX, self.originY, self.scale, self.measured)
+
+_textMetrics = {} # getEditableKey() of an editable --> its TextMetrics()
+
+def getDpiScale (obj):
+    """
+    Returns the DPI scale of the obj's window, 1.0 meaning 96 DPI.
+    """
+    try:
+        from ctypes import windll
+        dpi = windll.user32.GetDpiForWindow(obj.windowHandle)
+        return dpi/96.0 if dpi>0 else 1.0
+    except:
+        return 1.0
+
+def measureTextMetrics (obj, scale=1.0):
+    """
+    Measures TextMetrics() of the editable obj from its TextInfo.
+    Bounding rectangles of the first line are used when available,
+    otherwise positions of the first two characters and lines.
+    If the editable is empty, or the measurement fails, default metrics are returned.
+    """
+    try:
+        l = obj.location
+        ti = obj.makeTextInfo(POSITION_FIRST)
+        ti.expand(UNIT_CHARACTER)
+        x0, y0 = ti.pointAtStart
+    except:
+        return TextMetrics.default(scale)
+    m = TextMetrics.default(scale)
+    m.originX, m.originY = x0-l[0], y0-l[1]
+    m.measured = True
+    try:
+        line = obj.makeTextInfo(POSITION_FIRST)
+        line.expand(UNIT_LINE)
+        text = line.text.rstrip("\r\n")
+        rects = line.boundingRects
+        if text and rects:
+            m.lineHeight = max(r.height for r in rects) or m.lineHeight
+            m.charWidth  = int(round(sum(r.width for r in rects)/float(len(text)))) or m.charWidth
+            return m
+    except:
+        pass
+    try:
+        ti.collapse(end=True)
+        ti.expand(UNIT_CHARACTER)
+        x1, y1 = ti.pointAtStart
+        if y1==y0 and x1>x0:
+            m.charWidth = x1-x0
+    except:
+        pass
+    try:
+        line.collapse(end=True)
+        line.expand(UNIT_LINE)
+        x1, y1 = line.pointAtStart
+        if y1>y0:
+            m.lineHeight = y1-y0
+    except:
+        pass
+    return m
+
+def getEditableKey (obj):
+    """
+    Returns a key telling the editable obj apart from the others in its window, as e.g. all editables
+    of a browser document or of a UIA window share one window handle.
+    It is the window handle with the IAccessible2 unique ID or the UIA runtime ID of the obj, where there is one.
+    NVDA creates new objects for the same editable, so their id() would not do.
+    """
+    try:
+        window = obj.windowHandle
+    except:
+        window = None
+    try:
+        return (window, obj.IA2UniqueID)
+    except:
+        pass
+    try:
+        return (window, tuple(obj.UIAElement.GetRuntimeId()))
+    except:
+        return (window, None)
+
+def getTextMetrics (obj, empty=False):
+    """
+    Returns TextMetrics() of the editable obj, measuring them only the first time the editable is seen,
+    or again after its DPI scale, location or size changed, e.g. with its font, or invalidateTextMetrics() was called.
+    Editables without their own key, see getEditableKey(), are told apart by their location only.
+    Unmeasured metrics of an empty editable are kept as long as the caller says it is still empty.
+    """
+    key = getEditableKey(obj)
+    scale = getDpiScale(obj)
+    try:
+        location = tuple(obj.location)
+    except:
+        location = None
+    m = _textMetrics.get(key)
+    if m is None or m.scale!=scale or m.location!=location or not (m.measured or empty):
+        m = measureTextMetrics(obj, scale)
+        m.location = location
+        if len(_textMetrics)>=64:
+            _textMetrics.clear()
+        _textMetrics[key] = m
+    return m
+
+def invalidateTextMetrics (obj=None):
+    """
+    Forgets the TextMetrics() of the editable obj, or of all editables if obj is None,
+    e.g. after the font size or zoom may have changed.
+    """
+    if obj is None:
+        _textMetrics.clear()
+        return
+    _textMetrics.pop(getEditableKey(obj), None)
+
+@timed("getCaretPos")
 def getCaretPos (obj=None):
     try:
         obj = obj or getFocusObject()
@@ -48,22 +190,25 @@ def getCaretPos (obj=None):
                 tei.move(UNIT_CHARACTER, -1)
                 endOfLine, prevLine = tei.pointAtStart
             except:
-                # Empty document
-                return (obj.location[0]+7, obj.location[1]+43)
+                # Empty document, the caret is where the first character would be
+                m = getTextMetrics(obj, empty=True)
+                return (obj.location[0]+m.originX, obj.location[1]+m.originY)
+            m = getTextMetrics(obj)
             tei.expand(UNIT_LINE)
             startOfLine, line = tei.pointAtStart
             text = tei.text
             if text[-2:-1] in "\r\n":
                 # There is an empty line at the end of document
                 # on which we tried the caret position extraction
-                return startOfLine, prevLine+32
+                return startOfLine, prevLine+m.lineHeight
             # Otherwise, the last line is really the last line
-            return endOfLine+16, prevLine
+            return endOfLine+m.charWidth, prevLine
     except LocationError:
         raise
     except:
         raise LocationError("Location unavailable")
 
+@timed("getObjectPos")
 def getObjectPos (obj=None, location=True, caret=False):
     """
     Returns x and y coordinates of the obj.
@@ -92,6 +237,23 @@ def getObjectPos (obj=None, location=True, caret=False):
     except:
         raise LocationError("Location unavailable")
 
+def getContainer (obj=None, roles=(ROLE_TABLE, ROLE_LIST), depth=12):
+    """
+    Returns the obj itself or its nearest ancestor whose role is one of roles, e.g. the table of a cell.
+    If obj is not given, api.getNavigatorObject() is used.
+    At most depth ancestors are examined, None is returned if there is no such container.
+    """
+    try:
+        obj = obj or getNavigatorObject()
+        while obj and depth>=0:
+            if obj.role in roles:
+                return obj
+            obj = obj.parent
+            depth -= 1
+    except:
+        pass
+    return None
+
 def getObjectDescription (obj):
     return " ".join(x for x in getObjectSpeech(obj, OutputReason.FOCUSENTERED) if isinstance(x, str))
 
@@ -0,0 +1,10 @@
+# Headless benchmarks and harnesses for Object Location Tones
+# Nothing here is shipped with the add-on
+# The modules run the add-on outside of NVDA, against stand-ins of NVDA modules from bench.nvda
+# Run them from the repository root, e.g.:
+#   python -m bench.startup --budget 50
+#   python -m bench.pipeline --check
+#   python -m bench.replay trace.bin
+#   python -m bench.settings --sizes 200 800
+#   python -m bench.serialization --profiles 20
+#   python -m bench.commit --dir . --saves 100
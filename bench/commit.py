@@ -0,0 +1,71 @@
+# Part of Object Location Tones benchmarks
+# SafeFile() save throughput under each fsync policy
+# Saves settings documents of growing size through SafeFile() with the committer of this system,
+# once per fsync policy, and reports the time of a save and saves per second.
+# The temporary directory is on the file system of --dir, as durability costs depend on it.
+# Usage:
+#   python -m bench.commit [--sizes N [N...]] [--saves N] [--format NAME] [--dir PATH] [--json]
+
+from tempfile import TemporaryDirectory
+from time     import perf_counter_ns
+
+import argparse
+import json
+import sys
+import os
+
+from .nvda import install
+from .serialization import document
+
+SIZES = (25, 250, 2500)
+SAVES = 50
+
+def measure (d, path, saves=SAVES, format="json"):
+    """
+    Returns {policy: {"bytes", "mean_us", "max_us", "per_s"}} of saving d to path saves times.
+    """
+    from globalPlugins.objloc.settings.serialization import SDict, SafeFile
+    from globalPlugins.objloc.settings.commit import FSYNC
+    sd = SDict(d)
+    size = len(sd.dumps(format))
+    results = {}
+    for policy in FSYNC:
+        times = []
+        for i in range(saves):
+            t = perf_counter_ns()
+            with SafeFile(path, "wb", fsync=policy) as f:
+                sd.dump(f, format)
+            times.append(perf_counter_ns()-t)
+        total = sum(times)
+        results[policy] = {"bytes": size,
+                           "mean_us": total/saves/1000.0,
+                           "max_us": max(times)/1000.0,
+                           "per_s": saves/(total/1e9)}
+    return results
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.commit", description="Settings save throughput by fsync policy")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="numbers of settings (default %(default)s)")
+    parser.add_argument("--saves", type=int, default=SAVES, help="saves per measurement (default %(default)s)")
+    parser.add_argument("--format", default="json", help="settings file format (default %(default)s)")
+    parser.add_argument("--dir", default=None, help="directory to create the temporary files in (default the system's)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    install()
+    from globalPlugins.objloc.settings.commit import get_committer
+    results = {}
+    with TemporaryDirectory(dir=args.dir) as tmp:
+        for count in args.sizes:
+            results[count] = measure(document(count), os.path.join(tmp, "settings%i" % count), args.saves, args.format)
+    if args.json:
+        print(json.dumps(results))
+        return 0
+    print("Committer: %s" % get_committer().name)
+    print("%8s %-6s %10s %10s %10s %10s" % ("settings", "fsync", "bytes", "mean us", "max us", "saves/s"))
+    for count, r in results.items():
+        for policy, m in r.items():
+            print("%8i %-6s %10i %10.1f %10.1f %10.0f" % (count, policy, m["bytes"], m["mean_us"], m["max_us"], m["per_s"]))
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
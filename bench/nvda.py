@@ -0,0 +1,452 @@
+# Part of Object Location Tones benchmarks
+# Stand-ins for NVDA modules that the add-on imports
+# They implement just enough of NVDA's API for the add-on to load, start and terminate headlessly
+# Call install() before importing globalPlugins.objloc
+
+import builtins
+import enum
+import logging
+import heapq
+import types
+import sys
+import os
+
+ROOT  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON = os.path.join(ROOT, "addon")
+
+log = logging.getLogger("nvda")
+
+class ExtensionPoint (object):
+    """
+    Stand-in for NVDA's extensionPoints.Action() and Decider().
+    """
+    def __init__ (self):
+        self.handlers = []
+
+    def register (self, handler):
+        self.handlers.append(handler)
+
+    def unregister (self, handler):
+        try:
+            self.handlers.remove(handler)
+        except ValueError:
+            pass
+
+    def notify (self, **kwargs):
+        for handler in list(self.handlers):
+            handler(**kwargs)
+
+class Scheduler (object):
+    """
+    A virtual clock driving wx.CallAfter(), wx.CallLater() and wx.Timer().
+    Nothing runs by itself; call run() or advance() to execute due callbacks.
+    Time is in milliseconds.
+    """
+    def __init__ (self):
+        self.now   = 0.0
+        self.queue = []
+        self.seq   = 0
+        self.ran   = 0 # How many callbacks were run
+
+    def schedule (self, delay, func, args, kwargs):
+        self.seq += 1
+        entry = [self.now+max(delay, 0), self.seq, func, args, kwargs]
+        heapq.heappush(self.queue, entry)
+        return entry
+
+    def cancel (self, entry):
+        entry[2] = None
+
+    def advance (self, ms):
+        """
+        Moves the clock by ms milliseconds, running everything that becomes due.
+        """
+        self.run(self.now+ms)
+
+    def run (self, until=None):
+        """
+        Runs due callbacks in order. Without until, runs until the queue is empty.
+        """
+        queue = self.queue
+        while queue and (until is None or queue[0][0]<=until):
+            when, _, func, args, kwargs = heapq.heappop(queue)
+            self.now = max(self.now, when)
+            if func is not None:
+                self.ran += 1
+                func(*args, **kwargs)
+        if until is not None:
+            self.now = max(self.now, until)
+
+    def clear (self):
+        self.queue.clear()
+        self.now = 0.0
+        self.ran = 0
+
+scheduler = Scheduler()
+
+class Window (object):
+    """
+    Catch-all stand-in for wx windows, sizers and GUI helpers.
+    Any method call is accepted and does nothing.
+    """
+    def __init__ (self, *args, **kwargs):
+        pass
+
+    def __getattr__ (self, a):
+        return lambda *args, **kwargs: None
+
+class CallLater (object):
+    def __init__ (self, delay, func, *args, **kwargs):
+        self.entry = scheduler.schedule(delay, func, args, kwargs)
+
+    def Stop (self):
+        scheduler.cancel(self.entry)
+
+def CallAfter (func, *args, **kwargs):
+    scheduler.schedule(0, func, args, kwargs)
+
+class Timer (object):
+    def __init__ (self, owner=None, id=-1):
+        self.owner   = owner
+        self.entry   = None
+        self.handler = None
+
+    def Start (self, interval):
+        self.Stop()
+        self.interval = interval
+        self._arm()
+
+    def _arm (self):
+        self.entry = scheduler.schedule(self.interval, self._fire, (), {})
+
+    def _fire (self):
+        self._arm()
+        if self.handler:
+            self.handler(None)
+
+    def Stop (self):
+        if self.entry:
+            scheduler.cancel(self.entry)
+            self.entry = None
+
+    def IsRunning (self):
+        return self.entry is not None
+
+class MainFrame (Window):
+    def Bind (self, event, handler, source=None, *args, **kwargs):
+        if isinstance(source, Timer):
+            source.handler = handler
+
+    def Unbind (self, event, handler=None, source=None, *args, **kwargs):
+        if isinstance(source, Timer):
+            source.handler = None
+
+def _module (name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, mod)
+    return mod
+
+class Config (dict):
+    pass
+
+conf = Config(mouse={"audioCoordinates_minPitch": 220, "audioCoordinates_maxPitch": 880, "audioCoordinates_maxVolume": 1.0})
+
+class Addon (object):
+    def __init__ (self, name, version="0.0.0"):
+        self.name    = name
+        self.version = version
+        self.isPendingInstall = self.isPendingRemove = self.isDisabled = self.isBlocked = False
+        self.isRunning = True
+
+addons = [] # Add Addon()s here to make them available to the add-on
+
+roles = ("UNKNOWN", "WINDOW", "BUTTON", "LISTITEM", "TERMINAL", "EDITABLETEXT", "RICHEDIT", "PASSWORDEDIT",
+         "DOCUMENT", "TABLE", "TABLECELL", "TABLEROW", "TABLECOLUMN", "LIST")
+
+class ToneRecorder (object):
+    """
+    Stand-in tone backend of tones.beep().
+    Every beep is recorded in self.tones as a (virtual time in ms, hz, length, left, right) tuple,
+    unless recording is switched off.
+    """
+    def __init__ (self):
+        self.tones     = []
+        self.recording = True
+
+    def __call__ (self, hz, length, left=50, right=50, isSpeechBeepCommand=False):
+        if self.recording:
+            self.tones.append((scheduler.now, hz, length, left, right))
+
+    def clear (self):
+        self.tones.clear()
+
+recorder = ToneRecorder()
+
+def beep (hz, length, left=50, right=50, isSpeechBeepCommand=False):
+    recorder(hz, length, left, right)
+
+class Rect (tuple):
+    """
+    Stand-in for NVDA's locationHelper.RectLTWH().
+    """
+    def __new__ (cls, left, top, width, height):
+        return tuple.__new__(cls, (left, top, width, height))
+
+    left   = property(lambda self: self[0])
+    top    = property(lambda self: self[1])
+    width  = property(lambda self: self[2])
+    height = property(lambda self: self[3])
+    center = property(lambda self: (self[0]+self[2]//2, self[1]+self[3]//2))
+
+class TextInfo (object):
+    """
+    Stand-in for NVDA's TextInfo over the text of an NVDAObject() stand-in.
+    Characters are laid out on a fixed grid given by the object's charWidth and lineHeight.
+    Like in NVDA, pointAtStart raises LookupError past the end of the text.
+    """
+    def __init__ (self, obj, start, end=None):
+        self.obj   = obj
+        self.start = start
+        self.end   = start if end is None else end
+
+    def expand (self, unit):
+        text = self.obj.text
+        if unit=="line":
+            self.start = text.rfind("\n", 0, self.start)+1
+            end = text.find("\n", self.start)
+            self.end = len(text) if end<0 else end+1
+        else:
+            self.end = min(self.start+1, len(text))
+
+    def collapse (self, end=False):
+        if end:
+            self.start = self.end
+        else:
+            self.end = self.start
+
+    def move (self, unit, direction):
+        self.start = self.end = min(max(self.start+direction, 0), len(self.obj.text))
+        return direction
+
+    @property
+    def text (self):
+        return self.obj.text[self.start:self.end]
+
+    def _point (self, offset):
+        obj  = self.obj
+        text = obj.text
+        if offset>=len(text):
+            raise LookupError("Past the end of the text")
+        lineStart = text.rfind("\n", 0, offset)+1
+        l = obj.location
+        return (l[0]+obj.charWidth*(offset-lineStart), l[1]+obj.lineHeight*text.count("\n", 0, lineStart))
+
+    @property
+    def pointAtStart (self):
+        return self._point(self.start)
+
+    @property
+    def boundingRects (self):
+        if self.start>=self.end:
+            return []
+        x, y = self._point(self.start)
+        return [Rect(x, y, self.obj.charWidth*len(self.text.rstrip("\r\n")), self.obj.lineHeight)]
+
+class AppModule (object):
+    """
+    Stand-in for NVDA's app modules, of which the add-on uses just the name.
+    """
+    def __init__ (self, appName):
+        self.appName = appName
+
+class NVDAObject (object):
+    """
+    Stand-in for NVDA objects, with a fixed location and, for editables, a text with a caret offset.
+    Without an appName, objects belong to the application of their parent.
+    """
+    def __init__ (self, name="", role=0, location=(0, 0, 0, 0), parent=None, text="", states=(),
+                  windowHandle=0, charWidth=7, lineHeight=16, appName=None):
+        self.name           = name
+        self.role           = role
+        self.location       = Rect(*location)
+        self.parent         = parent
+        self.text           = text
+        self.caret          = 0
+        self.states         = set(states)
+        self.windowHandle   = windowHandle
+        self.charWidth      = charWidth
+        self.lineHeight     = lineHeight
+        self.treeInterceptor = None
+        if appName is not None:
+            self.appModule = AppModule(appName)
+        else:
+            self.appModule = getattr(parent, "appModule", None) or AppModule("explorer")
+
+    def makeTextInfo (self, position):
+        return TextInfo(self, self.caret if position=="caret" else 0)
+
+class KeyboardInputGesture (object):
+    """
+    Stand-in for keyboardHandler.KeyboardInputGesture().
+    """
+    def __init__ (self, mainKeyName="", modifierNames=()):
+        self.mainKeyName   = mainKeyName
+        self.modifierNames = list(modifierNames)
+
+class State (object):
+    """
+    What the api and winUser stand-ins return: the focus, navigator and foreground objects and the mouse position.
+    Set the attributes to move NVDA's focus around, call reset() to start over.
+    """
+    def __init__ (self):
+        self.reset()
+
+    def reset (self):
+        self.desktop    = NVDAObject("Desktop", location=(0, 0, 1920, 1080))
+        self.focus      = None
+        self.navigator  = None
+        self.foreground = None
+        self.mouse      = (0, 0)
+        self.pending    = set() # Names of events eventHandler.isPendingEvents() reports as queued
+
+state = State()
+
+def install (path=ADDON):
+    """
+    Registers all stand-in modules in sys.modules and puts the add-on's root directory given by path on sys.path.
+    Safe to call more than once.
+    """
+    if "globalPluginHandler" in sys.modules and getattr(sys.modules["globalPluginHandler"], "__standin__", False):
+        return
+    builtins._ = lambda s: s
+    builtins.ngettext = lambda s, p, n: s if n==1 else p
+    _module("globalPluginHandler", __standin__=True, GlobalPlugin=type("GlobalPlugin", (object,), {"__init__": lambda self: None}))
+    _module("inputCore", decide_executeGesture=ExtensionPoint())
+    _module("speech", cancelSpeech=lambda: None, getObjectSpeech=lambda obj, reason=None: [getattr(obj, "name", "")])
+    _module("ui", message=lambda text: None, browseableMessage=lambda text, title=None, isHtml=False: None)
+    _module("logHandler", log=log)
+    _module("tones", beep=beep)
+    _module("config", conf=conf)
+    _module("wx", CallAfter=CallAfter, CallLater=CallLater, Timer=Timer, Event=type("Event", (object,), {}),
+            TextCtrl=Window, CheckBox=Window, Choice=Window, ListBox=Window, StaticText=Window, StaticBox=Window,
+            StaticBoxSizer=Window, Button=Window, FindWindowById=lambda id, parent=None: Window(), Bell=lambda: None,
+            EVT_TIMER=1, EVT_CHECKBOX=2, EVT_CHOICE=3, EVT_LISTBOX=4, EVT_SLIDER=5, EVT_BUTTON=6, EVT_CHAR=7,
+            EVT_WINDOW_DESTROY=8, ID_ANY=-1, VERTICAL=8, LB_SINGLE=32, ICON_WARNING=256, YES_NO=10, YES=2, NO=8,
+            WXK_LEFT=314, WXK_RIGHT=316, WXK_UP=315, WXK_DOWN=317, WXK_HOME=313, WXK_END=312, WXK_DELETE=127, WXK_BACK=8)
+    _module("gui", mainFrame=MainFrame(), messageBox=lambda *args, **kwargs: 2)
+    _module("gui.settingsDialogs", SettingsPanel=Window, NVDASettingsDialog=type("NVDASettingsDialog", (object,), {"categoryClasses": []}))
+    _module("gui.guiHelper", BoxSizerHelper=Window, associateElements=lambda label, ctrl: ctrl)
+    _module("gui.nvdaControls", EnhancedInputSlider=Window)
+    _module("scriptHandler", script=lambda *args, **kwargs: (lambda func: func), getLastScriptRepeatCount=lambda: 0)
+    _module("keyboardHandler", KeyboardInputGesture=KeyboardInputGesture)
+    _module("api", getDesktopObject=lambda: state.desktop, getNavigatorObject=lambda: state.navigator,
+            getFocusObject=lambda: state.focus, getForegroundObject=lambda: state.foreground)
+    _module("winUser", getCursorPos=lambda: state.mouse)
+    _module("textInfos", POSITION_CARET="caret", POSITION_FIRST="first", UNIT_CHARACTER="character", UNIT_LINE="line")
+    ct = _module("controlTypes", STATE_MULTILINE=1, OutputReason=type("OutputReason", (object,), {"FOCUSENTERED": 1}),
+                 Role=enum.IntEnum("Role", roles, start=0))
+    for role in ct.Role:
+        setattr(ct, "ROLE_"+role.name, role)
+    _module("treeInterceptorHandler", DocumentTreeInterceptor=type("DocumentTreeInterceptor", (object,), {}))
+    _module("addonHandler", AddonError=type("AddonError", (Exception,), {}), initTranslation=lambda: None,
+            getAvailableAddons=lambda filterFunc=(lambda a: True): (a for a in addons if filterFunc(a)))
+    _module("eventHandler", isPendingEvents=lambda eventName=None, obj=None: (eventName in state.pending) if eventName else bool(state.pending))
+    _module("core", postNvdaStartup=ExtensionPoint())
+    _module("NVDAState", _TrackNVDAInitialization=type("_TrackNVDAInitialization", (object,),
+            {"isInitializationComplete": staticmethod(lambda: True)}))
+    _module("winKernel", MOVEFILE_REPLACE_EXISTING=1, MOVEFILE_WRITE_THROUGH=8,
+            moveFileEx=lambda src, dst, flags: os.replace(src, dst))
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+class PortMidi (types.ModuleType):
+    """
+    Stand-in for the native pypm module of the add-on's midi package.
+    Records all written messages in self.written as (device id, status, data1, data2) tuples.
+    Set self.broken to True to make writes fail, as a synthesizer does after the computer wakes from sleep.
+    self.devices is a list of (interface, name, input, output, opened) tuples, as returned by GetDeviceInfo().
+    self.delay is how long Initialize() blocks, in seconds.
+    """
+    TRUE  = 1
+    FALSE = 0
+
+    def __init__ (self, devices=None, delay=0.0):
+        types.ModuleType.__init__(self, "pypm")
+        self.devices = devices or [(b"MMSystem", b"Microsoft MIDI Mapper", 0, 1, 0), (b"MMSystem", b"Microsoft GS Wavetable Synth", 0, 1, 0)]
+        self.delay   = delay
+        self.broken  = False
+        self.written = []
+        self.initializations = 0
+        self.enumerations    = 0
+        pm = self
+
+        class Output (object):
+            def __init__ (self, device_id, latency=0, buffer_size=256):
+                if pm.broken:
+                    raise RuntimeError("Host error")
+                self.device_id = device_id
+
+            def WriteShort (self, status, data1, data2):
+                if pm.broken:
+                    raise RuntimeError("Host error")
+                pm.written.append((self.device_id, status, data1, data2))
+
+            def Write (self, data):
+                for (msg, when) in data:
+                    self.WriteShort(*(list(msg)+[0, 0])[:3])
+
+            def WriteSysEx (self, when, msg):
+                pass
+
+            def Abort (self):
+                pass
+
+            def Close (self):
+                pass
+
+        self.Output = Output
+
+    def Initialize (self):
+        import time
+        time.sleep(self.delay)
+        self.initializations += 1
+
+    def Terminate (self):
+        pass
+
+    def CountDevices (self):
+        return len(self.devices)
+
+    def GetDeviceInfo (self, device_id):
+        self.enumerations += 1
+        return self.devices[device_id] if 0<=device_id<len(self.devices) else None
+
+    def GetDefaultOutputDeviceID (self):
+        return next((i for i, d in enumerate(self.devices) if d[3]), -1)
+
+    def GetDefaultInputDeviceID (self):
+        return next((i for i, d in enumerate(self.devices) if d[2]), -1)
+
+    def Time (self):
+        import time
+        return int(time.monotonic()*1000)
+
+    def GetErrorText (self, err):
+        return "error %s" % err
+
+def install_pypm (devices=None, delay=0.0):
+    """
+    Makes the add-on's midi package use a PortMidi() stand-in instead of the native pypm binary and returns it.
+    Call after install().
+    """
+    import struct
+    package = "globalPlugins.objloc.midi.pypm64" if struct.calcsize("P")==8 else "globalPlugins.objloc.midi.pypm32"
+    __import__(package)
+    pm = PortMidi(devices, delay)
+    sys.modules[package+".pypm"] = pm
+    sys.modules[package].pypm = pm
+    return pm
@@ -0,0 +1,421 @@
+# Part of Object Location Tones benchmarks
+# Headless tone pipeline benchmark
+# Replays synthetic navigation, caret and mouse event traces through the GlobalPlugin's event handlers,
+# against NVDA stand-ins from bench.nvda, on their virtual clock, with tones going to the recording tone backend.
+# Reports per-event handler time, time of the work deferred through wx.CallLater() and the mouse monitor's timer,
+# tones emitted and dropped as stale, and memory allocated while replaying (tracemalloc).
+# The results can be stored as a baseline and later runs checked against it:
+# tone counts must match exactly (the traces are seeded, so they change only when the behaviour does),
+# handler times and memory must stay within the tolerance.
+# Timings depend on the machine, so save the baseline on the machine that runs the checks.
+# Usage:
+#   python -m bench.pipeline [--trace NAME] [--events N] [--seed N] [--repeat N] [--json]
+#                            [--save | --check] [--baseline PATH] [--tolerance F]
+# Exit status is 1 when --check finds a regression.
+
+from tempfile   import TemporaryDirectory
+from time       import perf_counter_ns
+from random     import Random
+
+import tracemalloc
+import argparse
+import logging
+import shutil
+import json
+import sys
+import os
+
+from . import nvda
+from .nvda import ADDON, install, scheduler, recorder, state, NVDAObject, KeyboardInputGesture
+
+EVENTS    = 2000
+SEED      = 7
+REPEAT    = 5
+TOLERANCE = 0.5 # Allowed relative growth of times and memory over the baseline
+BASELINE  = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "pipeline.json")
+
+def nextHandler ():
+    pass
+
+class World (object):
+    """
+    A few foreground windows, each with a list, a table and a multiline editable, laid out over the stand-in desktop.
+    """
+    def __init__ (self, rng):
+        import controlTypes as ct
+        desktop = state.desktop
+        self.windows = []
+        for i in range(3):
+            x, y = rng.randrange(0, 600), rng.randrange(0, 300)
+            fg = NVDAObject("Window %i" % i, ct.ROLE_WINDOW, (x, y, 1200, 700), desktop, windowHandle=100+i, appName="app%i" % i)
+            lst = NVDAObject("List", ct.ROLE_LIST, (x+10, y+40, 300, 600), fg)
+            fg.items = [NVDAObject("Item %i" % j, ct.ROLE_LISTITEM, (x+10, y+40+20*j, 300, 20), lst) for j in range(30)]
+            table = NVDAObject("Table", ct.ROLE_TABLE, (x+320, y+40, 800, 300), fg)
+            fg.cols = 8
+            fg.cells = [NVDAObject("Cell %i" % j, ct.ROLE_TABLECELL, (x+320+100*(j%8), y+40+30*(j//8), 100, 30), table)
+                        for j in range(80)]
+            text = "\n".join("Line %i of the text" % j + " word"*rng.randrange(0, 12) for j in range(40))
+            fg.edit = NVDAObject("Edit", ct.ROLE_EDITABLETEXT, (x+320, y+360, 800, 320), fg, text=text,
+                                 states=(ct.STATE_MULTILINE,), windowHandle=200+i)
+            self.windows.append(fg)
+
+# Traces are lists of (delay in ms, event name, arguments) tuples, the delay being the time since the previous event
+
+def navigationTrace (world, rng, events):
+    """
+    Arrowing through lists and tables, with key repeat bursts and occasional switches of the foreground window,
+    some of which are followed by navigation before their outline finished playing.
+    Some navigation happens while another focus change is already queued.
+    """
+    trace = []
+    fg = world.windows[0]
+    trace.append((0, "foreground", (fg,)))
+    objects, i = fg.items, 0
+    while len(trace)<events:
+        r = rng.random()
+        if r<0.05:
+            fg = rng.choice(world.windows)
+            trace.append((rng.randrange(100, 800), "foreground", (fg,)))
+            objects, i = rng.choice((fg.items, fg.cells)), 0
+            trace.append((rng.randrange(50, 1200), "navigator", (objects[0], False)))
+            continue
+        step = 1 if objects is fg.items else rng.choice((1, fg.cols))
+        i = (i+rng.choice((-step, step, step)))%len(objects)
+        delay = rng.randrange(30, 60) if r<0.6 else rng.randrange(150, 900)
+        trace.append((delay, "navigator", (objects[i], rng.random()<0.1)))
+    return trace[:events]
+
+CARET_KEYS = (("upArrow", 20), ("downArrow", 20), ("leftArrow", 14), ("rightArrow", 14), ("home", 4), ("end", 4),
+              ("control+home", 1), ("control+end", 1), ("pageDown", 2), ("a", 15), ("space", 3), ("backspace", 3),
+              ("control+plus", 0.5))
+
+def caretTrace (world, rng, events):
+    """
+    Moving the caret around a multiline editable and typing into it, each key followed by its caret event.
+    """
+    keys, weights = zip(*CARET_KEYS)
+    trace = []
+    fg = world.windows[0]
+    trace.append((0, "foreground", (fg,)))
+    trace.append((300, "navigator", (fg.edit, False)))
+    while len(trace)<events:
+        name = rng.choices(keys, weights)[0]
+        trace.append((rng.randrange(40, 400), "key", (name,)))
+        trace.append((rng.randrange(1, 10), "caret", (fg.edit, name)))
+    return trace[:events]
+
+def mouseTrace (world, rng, events):
+    """
+    Mouse monitoring sessions: from a random point the mouse moves towards the focused object,
+    mostly until it is reached, sometimes stopping on the way until the monitoring times out.
+    """
+    trace = []
+    while len(trace)<events:
+        fg = rng.choice(world.windows)
+        target = rng.choice(fg.items+fg.cells)
+        trace.append((rng.randrange(100, 500), "foreground", (fg,)))
+        trace.append((400, "navigator", (target, False)))
+        x, y = rng.randrange(0, 1920), rng.randrange(0, 1080)
+        trace.append((100, "mouse", (x, y)))
+        trace.append((50, "monitor", ()))
+        tx, ty = target.location.center
+        giveUp = rng.random()<0.2
+        for step in range(rng.randrange(10, 60)):
+            x += (tx-x)//4+rng.randrange(-15, 16)
+            y += (ty-y)//4+rng.randrange(-15, 16)
+            trace.append((rng.randrange(15, 40), "mouse", (x, y)))
+            if giveUp and step>5:
+                break
+            if abs(tx-x)+abs(ty-y)<10:
+                break
+        trace.append((rng.randrange(500, 3000), "stop", ()))
+    return trace[:events]
+
+TRACES = {"navigation": navigationTrace, "caret": caretTrace, "mouse": mouseTrace}
+
+def moveCaret (obj, name):
+    """
+    Applies the key name to the text and the caret of the editable obj, as the application would.
+    """
+    text, c = obj.text, obj.caret
+    start = text.rfind("\n", 0, c)+1
+    end = text.find("\n", c)
+    end = len(text) if end<0 else end
+    if name=="leftArrow":
+        c = max(c-1, 0)
+    elif name=="rightArrow":
+        c = min(c+1, len(text))
+    elif name=="home":
+        c = start
+    elif name=="end":
+        c = end
+    elif name=="control+home":
+        c = 0
+    elif name=="control+end":
+        c = len(text)
+    elif name in ("upArrow", "downArrow", "pageDown"):
+        lines = text.split("\n")
+        row = text.count("\n", 0, c)
+        col = c-start
+        row = max(row-1, 0) if name=="upArrow" else min(row+(1 if name=="downArrow" else 10), len(lines)-1)
+        c = sum(len(l)+1 for l in lines[:row])+min(col, len(lines[row]))
+    elif name=="backspace":
+        if c:
+            obj.text = text[:c-1]+text[c:]
+            c -= 1
+    elif name=="control+plus":
+        obj.charWidth += 1
+        obj.lineHeight += 2
+    else:
+        char = " " if name=="space" else name
+        obj.text = text[:c]+char+text[c:]
+        c += 1
+    obj.caret = c
+
+def gesture (name):
+    mods = name.split("+")
+    return KeyboardInputGesture(mods[-1], mods[:-1])
+
+class Replay (object):
+    """
+    Feeds a trace to a plugin, timing each event handler.
+    Only the handler call itself is timed, changes of the stand-in state that NVDA or the application would do are not.
+    """
+    def __init__ (self, plugin):
+        self.plugin   = plugin
+        self.times    = {} # Event name --> list of handler times in ns
+        self.deferred = 0  # Time spent in scheduled callbacks in ns
+
+    def advance (self, delay):
+        t = perf_counter_ns()
+        scheduler.advance(delay)
+        self.deferred += perf_counter_ns()-t
+
+    def run (self, trace):
+        import inputCore
+        plugin = self.plugin
+        decider = inputCore.decide_executeGesture
+        for delay, name, args in trace:
+            self.advance(delay)
+            if name=="foreground":
+                fg, = args
+                state.foreground = state.focus = state.navigator = fg
+                t = perf_counter_ns()
+                plugin.event_foreground(fg, nextHandler)
+            elif name=="navigator":
+                obj, pending = args
+                state.focus = state.navigator = obj
+                if pending:
+                    state.pending.add("gainFocus")
+                t = perf_counter_ns()
+                plugin.event_becomeNavigatorObject(obj, nextHandler)
+            elif name=="key":
+                g = gesture(args[0])
+                t = perf_counter_ns()
+                decider.notify(gesture=g)
+            elif name=="caret":
+                obj, key = args
+                state.focus = obj
+                if key:
+                    moveCaret(obj, key)
+                t = perf_counter_ns()
+                plugin.event_caret(obj, nextHandler)
+            elif name=="mouse":
+                x, y = state.mouse = args
+                t = perf_counter_ns()
+                plugin.event_mouseMove(state.desktop, nextHandler, x=x, y=y)
+            elif name=="monitor":
+                t = perf_counter_ns()
+                if not plugin.timer.IsRunning():
+                    plugin.script_toggleMouseMonitor(None)
+            else: # stop
+                t = perf_counter_ns()
+                if plugin.timer.IsRunning():
+                    plugin.DeactivateMouseMonitor()
+            t = perf_counter_ns()-t
+            state.pending.clear()
+            self.times.setdefault(name, []).append(t)
+        plugin.DeactivateMouseMonitor()
+        self.advance(5000)
+
+def start ():
+    """
+    Starts a fresh plugin on a clean virtual clock and stand-in state, with foreground outlines on.
+    """
+    import globalPlugins.objloc as objloc
+    posTones = objloc.posTones
+    scheduler.clear()
+    recorder.clear()
+    state.reset()
+    posTones.lastCoords  = (-1, -1, 0.0)
+    posTones.lastPlayed  = 0.0
+    posTones.lastMonitor = -1
+    posTones.staleTones  = 0
+    objloc.utils.invalidateTextMetrics()
+    plugin = objloc.GlobalPlugin()
+    if not plugin.reportOutline:
+        plugin.ToggleForegroundOutline()
+    return plugin
+
+def replay (name, events=EVENTS, seed=SEED, memory=False):
+    """
+    Replays the named trace once with a new plugin and returns its raw results.
+    With memory, tracemalloc traces the replay, which makes it slower, so the times are not worth anything then.
+    """
+    import globalPlugins.objloc as objloc
+    plugin = start()
+    rng = Random(seed)
+    trace = TRACES[name](World(rng), rng, events)
+    r = Replay(plugin)
+    if memory:
+        # Tones requested, whether played, dropped as stale or skipped as doubles, are counted here too
+        requests = [0]
+        play = objloc.posTones.playCoordinates
+        def counted (*args, **kwargs):
+            requests[0] += 1
+            return play(*args, **kwargs)
+        objloc.posTones.playCoordinates = objloc.playCoordinates = counted
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+    try:
+        r.run(trace)
+    finally:
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            objloc.posTones.playCoordinates = objloc.playCoordinates = play
+    result = {"tones": len(recorder.tones), "dropped": objloc.posTones.staleTones, "callbacks": scheduler.ran}
+    if memory:
+        result["requested"] = requests[0]
+        result["peak_kib"] = (peak-before)/1024.0
+        result["retained_kib"] = (current-before)/1024.0
+    plugin.terminate()
+    result["times"], result["deferred"] = r.times, r.deferred
+    return result
+
+def percentile (samples, p):
+    return samples[min(len(samples)-1, int(len(samples)*p/100.0))]
+
+def measure (name, events=EVENTS, seed=SEED, repeat=REPEAT):
+    """
+    Returns the summary of the named trace: the best timings out of repeat replays,
+    as they are the least disturbed by the rest of the machine, and tones and memory from a separate, traced replay.
+    """
+    runs = [replay(name, events, seed) for _ in range(repeat)]
+    traced = replay(name, events, seed, memory=True)
+    handlers = {}
+    for event in runs[0]["times"]:
+        stats = []
+        for run in runs:
+            samples = sorted(run["times"][event])
+            stats.append((percentile(samples, 50), percentile(samples, 95), samples[-1], sum(samples)/len(samples)))
+        handlers[event] = {"count": len(runs[0]["times"][event]),
+                           "p50_us": min(s[0] for s in stats)/1000.0, "p95_us": min(s[1] for s in stats)/1000.0,
+                           "max_us": min(s[2] for s in stats)/1000.0, "mean_us": min(s[3] for s in stats)/1000.0}
+    allTimes = [sorted(t for times in run["times"].values() for t in times) for run in runs]
+    return {"events": events, "handlers": handlers,
+            "p50_us": min(percentile(s, 50) for s in allTimes)/1000.0,
+            "p95_us": min(percentile(s, 95) for s in allTimes)/1000.0,
+            "deferred_ms": min(run["deferred"] for run in runs)/1e6,
+            "callbacks": traced["callbacks"], "requested": traced["requested"], "tones": traced["tones"], "dropped": traced["dropped"],
+            "peak_kib": traced["peak_kib"], "retained_kib": traced["retained_kib"]}
+
+def compare (results, baseline, tolerance=TOLERANCE):
+    """
+    Returns a list of regressions of results against the baseline, as human readable strings.
+    """
+    problems = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            continue
+        if b["events"]!=r["events"]:
+            problems.append("%s: baseline has %i events, not %i, save a new one" % (name, b["events"], r["events"]))
+            continue
+        for key in ("requested", "tones", "dropped"):
+            if r[key]!=b[key]:
+                problems.append("%s: %s changed from %i to %i" % (name, key, b[key], r[key]))
+        for key in ("p50_us", "p95_us", "deferred_ms", "peak_kib", "retained_kib"):
+            limit = b[key]*(1+tolerance)
+            if r[key]>limit and r[key]-b[key]>0.01:
+                problems.append("%s: %s went from %.3f to %.3f (limit %.3f)" % (name, key, b[key], r[key], limit))
+    return problems
+
+def setup (tmp, settings=None):
+    """
+    Installs the stand-ins with a copy of the add-on in the directory tmp, so that settings do not land in the source tree,
+    and puts the add-on on the virtual clock. settings is a settings file to start the plugin with instead of the defaults.
+    """
+    addon = os.path.join(tmp, "addon")
+    shutil.copytree(os.path.join(ADDON, "globalPlugins"), os.path.join(addon, "globalPlugins"),
+                    ignore=shutil.ignore_patterns("__pycache__", "settings.json", "*.tmp"))
+    if settings:
+        shutil.copy(settings, os.path.join(addon, "globalPlugins", "objloc", "settings", "settings.json"))
+    install(addon)
+    nvda.log.setLevel(logging.ERROR) # Settings of the fresh copy warn about attributes missing in the file
+    import globalPlugins.objloc as objloc
+    # Tone doubles and the mouse monitor's timeout are judged by the virtual clock as well
+    objloc.posTones.time = objloc.time = lambda: scheduler.now/1000.0
+
+def run (names, events=EVENTS, seed=SEED, repeat=REPEAT):
+    """
+    Measures the named traces.
+    """
+    with TemporaryDirectory() as tmp:
+        setup(tmp)
+        return {name: measure(name, events, seed, repeat) for name in names}
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.pipeline", description="Object Location Tones tone pipeline benchmark")
+    parser.add_argument("--trace", action="append", choices=sorted(TRACES), help="trace to replay, may be repeated (default all)")
+    parser.add_argument("--events", type=int, default=EVENTS, help="number of events per trace (default %(default)s)")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the synthetic traces (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed replays per trace (default %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file (default %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative growth of times and memory (default %(default)s)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--save", action="store_true", help="store the results as the baseline")
+    group.add_argument("--check", action="store_true", help="compare the results with the baseline")
+    args = parser.parse_args(argv)
+    names = args.trace or sorted(TRACES)
+    results = run(names, args.events, args.seed, args.repeat)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print("%-11s %7s %9s %7s %7s %9s %9s %9s %8s %8s" % ("trace", "events", "requested", "tones", "dropped",
+              "p50 us", "p95 us", "defer ms", "peak KiB", "kept KiB"))
+        for name, r in results.items():
+            print("%-11s %7i %9i %7i %7i %9.3f %9.3f %9.3f %8.1f %8.1f" % (name, r["events"], r["requested"], r["tones"], r["dropped"],
+                  r["p50_us"], r["p95_us"], r["deferred_ms"], r["peak_kib"], r["retained_kib"]))
+            for event, h in sorted(r["handlers"].items()):
+                print("  %-9s %7i %34.3f %9.3f" % (event, h["count"], h["p50_us"], h["p95_us"]))
+    if args.save:
+        baseline = {}
+        if os.path.isfile(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        if args.seed!=SEED:
+            print("Not saving a baseline of a non-default seed")
+            return 1
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+            f.write("\n")
+        return 0
+    if args.check:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print("No baseline in %s, create one with --save" % args.baseline)
+            return 1
+        problems = compare(results, baseline, args.tolerance)
+        for p in problems:
+            print(p)
+        return 1 if problems else 0
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
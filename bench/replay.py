@@ -0,0 +1,197 @@
+# Part of Object Location Tones benchmarks
+# Replays event traces recorded in the field by objloc.trace (NVDA started with OBJLOC_TRACE=<file>)
+# through the GlobalPlugin's event handlers, against NVDA stand-ins from bench.nvda, keeping the recorded timing on the virtual clock.
+# Reports handler times and tones of the recording next to those of the replay, the slowest recorded events
+# and tone pile-ups, i.e. tones that started before the previous one ended.
+# With --profile, the replay runs under cProfile, so slow handlers can be taken apart offline.
+# What the trace does not hold is approximated: objects have no names nor parents,
+# a caret event's object answers with the recorded caret point, and the mouse monitor
+# is started for mouse events, as they are only recorded while it or its auto start is on.
+# Usage:
+#   python -m bench.replay TRACE [TRACE...] [--settings FILE] [--slowest N] [--profile] [--json]
+# Give rotated trace files oldest first, e.g. trace.bin.2 trace.bin.1 trace.bin
+
+from tempfile import TemporaryDirectory
+
+import argparse
+import cProfile
+import pstats
+import json
+import sys
+import io
+
+from .nvda     import recorder, NVDAObject
+from .pipeline import Replay, setup, start, percentile
+
+MAX_GAP   = 60000 # Longer pauses between records, e.g. between sessions, are shortened to this many ms
+MOUSE_GAP = 2500 # A mouse event after a longer pause starts the mouse monitor again
+
+class CaretObject (NVDAObject):
+    """
+    An editable that puts the caret where the trace says it was.
+    """
+    def __init__ (self, point, *args, **kwargs):
+        NVDAObject.__init__(self, *args, **kwargs)
+        self.point = point
+
+    def makeTextInfo (self, position):
+        if self.point is None:
+            raise LookupError("Caret unavailable")
+        return CaretInfo(self.point)
+
+class CaretInfo (object):
+    def __init__ (self, point):
+        self.pointAtStart = point
+
+    def expand (self, unit):
+        pass
+
+def load (paths):
+    """
+    Reads the trace files and returns (trace, events, tones, stale):
+    a bench.pipeline trace, the recorded events as (time in s, event name, handler duration in us, detail) tuples,
+    the recorded tones as (time in ms, duration in ms) pairs and the number of tones recorded as dropped.
+    """
+    import controlTypes
+    from globalPlugins.objloc import trace as t
+    kinds = {t.EVENT_FOREGROUND: "foreground", t.EVENT_NAVIGATOR: "navigator", t.EVENT_CARET: "caret",
+             t.EVENT_MOUSE: "mouse", t.EVENT_KEY: "key"}
+    Role = controlTypes.Role
+    objects = {}
+    trace, events, tones = [], [], []
+    stale = 0
+    start = last = lastMouse = None
+    for path in paths:
+        for kind, when, fields in t.readTrace(path):
+            if kind==t.HEADER:
+                continue
+            if start is None:
+                start = last = when
+            if kind==t.TONE:
+                tones.append(((when-start)*1000, fields[3]))
+                continue
+            if kind==t.TONE_STALE:
+                stale += 1
+                continue
+            delay = min(max((when-last)*1000, 0), MAX_GAP)
+            last = when
+            name, duration = kinds[kind], fields[0]
+            if kind==t.EVENT_MOUSE:
+                x, y = fields[1:3]
+                detail = "%i, %i" % (x, y)
+                trace.append((delay, "mouse", (x, y)))
+                if lastMouse is None or (when-lastMouse)*1000>MOUSE_GAP:
+                    trace.append((0, "monitor", ()))
+                lastMouse = when
+            elif kind==t.EVENT_KEY:
+                detail = fields[1]
+                trace.append((delay, "key", (fields[1],)))
+            else:
+                l, t_, w, h, role, window = fields[1:7]
+                detail = "%s at %i, %i, %i, %i" % (role, l, t_, w, h)
+                role = Role[role] if role in Role.__members__ else Role.UNKNOWN
+                if kind==t.EVENT_CARET:
+                    x, y = fields[7:9]
+                    point = None if x==t.NO_POINT else (x, y)
+                    detail += " caret %s" % (point,)
+                    obj = CaretObject(point, role=role, location=(l, t_, w, h), windowHandle=window)
+                    trace.append((delay, "caret", (obj, None)))
+                else:
+                    key = (l, t_, w, h, role, window)
+                    obj = objects.get(key)
+                    if obj is None:
+                        obj = objects[key] = NVDAObject(role=role, location=(l, t_, w, h), windowHandle=window)
+                    trace.append((delay, name, (obj,) if kind==t.EVENT_FOREGROUND else (obj, False)))
+            events.append((when-start, name, duration, detail))
+    return trace, events, tones, stale
+
+def pileUps (tones):
+    """
+    Returns (overlapping, deepest) for tones given as (start, duration) pairs in ms:
+    the number of tones that started before the previous one ended and the most tones sounding at once.
+    """
+    overlapping = deepest = 0
+    ends = []
+    end = None
+    for when, duration in sorted(tones):
+        if end is not None and when<end:
+            overlapping += 1
+        end = max(end or 0, when+duration)
+        ends = [e for e in ends if e>when]
+        ends.append(when+duration)
+        deepest = max(deepest, len(ends))
+    return overlapping, deepest
+
+def handlerStats (times):
+    """
+    Returns {event name: {"count", "p50_us", "p95_us", "max_us"}} of lists of times in us.
+    """
+    stats = {}
+    for name, samples in times.items():
+        samples = sorted(samples)
+        stats[name] = {"count": len(samples), "p50_us": percentile(samples, 50), "p95_us": percentile(samples, 95), "max_us": samples[-1]}
+    return stats
+
+def replay (paths, settings=None, slowest=10, profile=False):
+    """
+    Replays the trace files and returns the report.
+    """
+    with TemporaryDirectory() as tmp:
+        setup(tmp, settings)
+        import globalPlugins.objloc as objloc
+        plugin = start()
+        trace, events, tones, stale = load(paths)
+        r = Replay(plugin)
+        profiler = cProfile.Profile() if profile else None
+        if profiler:
+            profiler.enable()
+        r.run(trace)
+        if profiler:
+            profiler.disable()
+        replayed = [(when, length) for when, hz, length, left, right in recorder.tones]
+        result = {"events": len(events),
+                  "recorded": {"handlers": handlerStats(_group(events)), "tones": len(tones), "dropped": stale,
+                               "pileups": pileUps(tones)},
+                  "replayed": {"handlers": handlerStats({name: [t/1000.0 for t in times] for name, times in r.times.items()}),
+                               "tones": len(replayed), "dropped": objloc.posTones.staleTones, "pileups": pileUps(replayed)},
+                  "slowest": sorted(events, key=lambda e: -e[2])[:slowest]}
+        plugin.terminate()
+    if profiler:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+        result["profile"] = out.getvalue()
+    return result
+
+def _group (events):
+    times = {}
+    for when, name, duration, detail in events:
+        times.setdefault(name, []).append(duration)
+    return times
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.replay", description="Replay of Object Location Tones event traces")
+    parser.add_argument("traces", nargs="+", help="trace files, oldest first")
+    parser.add_argument("--settings", help="settings.json of the add-on that recorded the trace (default settings otherwise)")
+    parser.add_argument("--slowest", type=int, default=10, help="number of the slowest recorded events to list (default %(default)s)")
+    parser.add_argument("--profile", action="store_true", help="profile the replay with cProfile")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    result = replay(args.traces, args.settings, args.slowest, args.profile)
+    if args.json:
+        print(json.dumps(result))
+        return 0
+    print("%i events" % result["events"])
+    for side in ("recorded", "replayed"):
+        r = result[side]
+        print("%s: %i tones, %i dropped as stale, %i overlapping, at most %i at once" % (side, r["tones"], r["dropped"], r["pileups"][0], r["pileups"][1]))
+        for name, h in sorted(r["handlers"].items()):
+            print("  %-10s %7i %10.1f %10.1f %10.1f us" % (name, h["count"], h["p50_us"], h["p95_us"], h["max_us"]))
+    print("Slowest recorded events:")
+    for when, name, duration, detail in result["slowest"]:
+        print("  %10.3f s %-10s %10i us  %s" % (when, name, duration, detail))
+    if args.profile:
+        print(result["profile"])
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
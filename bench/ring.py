@@ -0,0 +1,135 @@
+# Part of Object Location Tones benchmarks
+# Enqueue latency of MIDI player commands
+# Compares the lock-free midi.ring.Ring() path the Player uses now
+# with the Condition guarded deque it used before, both with a live consumer thread,
+# as seen by the producer, i.e. NVDA's main thread playing a tone.
+# Usage:
+#   python -m bench.ring [--ops N] [--burst N] [--json]
+
+from threading import Thread, Condition, Event
+from collections import deque
+from time import perf_counter_ns, sleep
+
+import argparse
+import json
+import sys
+
+from .nvda import install
+
+OPS   = 20000
+BURST = 4 # Commands per tone: pan, bend, expression and the note itself
+
+class ConditionQueue (object):
+    """
+    The previous Player's hand-off: every command takes the Condition and notifies the consumer.
+    """
+    def __init__ (self):
+        self.queue   = deque()
+        self.waiter  = Condition()
+        self.running = True
+        self.thread  = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put (self, item):
+        with self.waiter:
+            self.queue.append(item)
+            self.waiter.notify()
+
+    def run (self):
+        waiter = self.waiter
+        while self.running:
+            with waiter:
+                while self.queue:
+                    func, args = self.queue.popleft()
+                    func(*args)
+                waiter.wait()
+
+    def close (self):
+        self.running = False
+        with self.waiter:
+            self.waiter.notify_all()
+        self.thread.join()
+
+class RingQueue (object):
+    """
+    The current Player's hand-off: a push into the Ring() and a wake-up only if it was empty.
+    """
+    def __init__ (self, Ring):
+        self.ring    = Ring(256)
+        self.wake    = Event()
+        self.running = True
+        self.thread  = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put (self, item):
+        woke = self.ring.push(item)
+        if woke:
+            self.wake.set()
+
+    def run (self):
+        ring, wake = self.ring, self.wake
+        while self.running:
+            cmd = ring.pop()
+            if cmd is not None:
+                func, args = cmd
+                func(*args)
+                continue
+            wake.clear()
+            if ring or not self.running:
+                continue
+            wake.wait()
+
+    def close (self):
+        self.running = False
+        self.wake.set()
+        self.thread.join()
+
+def write_short (status, data1, data2):
+    pass
+
+def measure (queue, ops=OPS, burst=BURST):
+    """
+    Returns a sorted list of enqueue latencies in nanoseconds.
+    Commands are put in bursts, like one tone does, with a short pause between the tones.
+    """
+    samples = []
+    item = (write_short, (0xB0, 10, 64))
+    put = queue.put
+    for i in range(ops//burst):
+        for j in range(burst):
+            t = perf_counter_ns()
+            put(item)
+            samples.append(perf_counter_ns()-t)
+        if not i%64:
+            sleep(0.0005)
+    queue.close()
+    samples.sort()
+    return samples
+
+def percentile (samples, p):
+    return samples[min(len(samples)-1, int(len(samples)*p/100.0))]
+
+def summarize (samples):
+    return {"p50_us": percentile(samples, 50)/1000.0, "p99_us": percentile(samples, 99)/1000.0,
+            "max_us": samples[-1]/1000.0, "mean_us": sum(samples)/len(samples)/1000.0}
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.ring", description="MIDI player command enqueue latency")
+    parser.add_argument("--ops", type=int, default=OPS, help="number of commands to enqueue (default %(default)s)")
+    parser.add_argument("--burst", type=int, default=BURST, help="commands per tone (default %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    install()
+    from globalPlugins.objloc.midi.ring import Ring
+    results = {"condition": summarize(measure(ConditionQueue(), args.ops, args.burst)),
+               "ring": summarize(measure(RingQueue(Ring), args.ops, args.burst))}
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print("%-10s %10s %10s %10s %10s" % ("path", "p50 us", "p99 us", "max us", "mean us"))
+        for name, r in results.items():
+            print("%-10s %10.3f %10.3f %10.3f %10.3f" % (name, r["p50_us"], r["p99_us"], r["max_us"], r["mean_us"]))
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# Part of Object Location Tones benchmarks
+# Settings file formats: save and load time and size
+# Serializes settings documents of growing size, with and without per application profiles
+# (nested dicts of overrides), in every registered format of settings.serialization,
+# and writes and reads them through SafeFile and the format detection:
+# "load" parses the mmap view() of the file, "read" the file read into memory first, as it was before view() existed.
+# Usage:
+#   python -m bench.serialization [--sizes N [N...]] [--profiles N] [--repeat N] [--json]
+
+from tempfile import TemporaryDirectory
+from time     import perf_counter_ns
+
+import argparse
+import random
+import json
+import sys
+import os
+
+from .nvda import install
+
+SIZES    = (25, 250, 2500)
+PROFILES = 20
+REPEAT   = 20
+
+def document (count, profiles=0, seed=1):
+    """
+    Returns a dict like the one Settings() saves, with count settings of mixed types,
+    and if profiles is given, as many profiles overriding a tenth of the settings each.
+    """
+    rng = random.Random(seed)
+    d = {"version": 1}
+    for i in range(count):
+        kind = i%4
+        if kind==0:
+            d["setting%i" % i] = bool(rng.randrange(2))
+        elif kind==1:
+            d["setting%i" % i] = rng.randrange(200)
+        elif kind==2:
+            d["setting%i" % i] = round(rng.random(), 3)
+        else:
+            d["setting%i" % i] = "Synth %i" % rng.randrange(1000)
+    if profiles:
+        keys = [k for k in d if k!="version"]
+        d["profiles"] = dict(("app%i.exe" % p, dict((k, d[k]) for k in rng.sample(keys, max(1, count//10))))
+                             for p in range(profiles))
+    return d
+
+def best (func, repeat):
+    times = []
+    for i in range(repeat):
+        t = perf_counter_ns()
+        func()
+        times.append(perf_counter_ns()-t)
+    return min(times)/1000.0
+
+def measure (d, path, repeat=REPEAT):
+    from globalPlugins.objloc.settings.serialization import SDict, SafeFile, formats
+    results = {}
+    sd = SDict(d)
+    for name in formats:
+        data = sd.dumps(name)
+        target = path+"."+name
+        def save ():
+            with SafeFile(target, "wb") as f:
+                sd.dump(f, name)
+        def load ():
+            with SafeFile(target, "rb") as f:
+                SDict().load(f)
+        def read ():
+            with SafeFile(target, "rb") as f:
+                SDict().loads(f.read())
+        save()
+        if SDict().loads(data)!=json.loads(json.dumps(d)):
+            raise AssertionError("%s format does not round trip" % name)
+        results[name] = {"bytes": len(data),
+                         "dumps_us": best(lambda: sd.dumps(name), repeat),
+                         "loads_us": best(lambda: SDict().loads(data), repeat),
+                         "save_us": best(save, repeat),
+                         "load_us": best(load, repeat),
+                         "read_us": best(read, repeat)}
+    return results
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.serialization", description="Settings file formats")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="numbers of settings (default %(default)s)")
+    parser.add_argument("--profiles", type=int, default=PROFILES, help="number of profiles in the second document of each size (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs of each measurement, the best is taken (default %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    install()
+    results = {}
+    with TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            for profiles in (0, args.profiles):
+                label = "%i settings, %i profiles" % (count, profiles)
+                results[label] = measure(document(count, profiles), os.path.join(tmp, "settings%i_%i" % (count, profiles)), args.repeat)
+    if args.json:
+        print(json.dumps(results))
+        return 0
+    print("%-28s %-8s %10s %10s %10s %10s %10s %10s" % ("document", "format", "bytes", "dumps us", "loads us", "save us", "load us", "read us"))
+    for label, r in results.items():
+        for name, m in r.items():
+            print("%-28s %-8s %10i %10.1f %10.1f %10.1f %10.1f %10.1f" % (label, name, m["bytes"], m["dumps_us"], m["loads_us"], m["save_us"], m["load_us"], m["read_us"]))
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# Part of Object Location Tones benchmarks
+# Settings lookups and targeted refreshes with hundreds of settings
+# Compares the Settings() indexes by name, nickname, GUI control id and owning instance
+# with the scans over all attributes that Settings() did before it had them.
+# The panel is taken as opened and every setting as having a GUI control, so refreshes do the whole work.
+# Usage:
+#   python -m bench.settings [--sizes N [N...]] [--ops N] [--json]
+
+from tempfile import TemporaryDirectory
+from time     import perf_counter_ns
+
+import argparse
+import random
+import json
+import sys
+import os
+
+from .nvda import install
+
+SIZES = (50, 200, 800)
+OPS   = 20000
+
+def build (count, path):
+    """
+    Returns (settings, owner): a Settings() mapped from an owner with count settables,
+    every one with a (fake) GUI control id.
+    """
+    from globalPlugins.objloc.settings import Settings, Settable
+    class Owner (object):
+        def __init__ (self):
+            for i in range(count):
+                kind = i%3
+                if kind==0:
+                    value = Settable(bool(i%2), "nick%i" % i, label="Setting %i" % i)
+                elif kind==1:
+                    value = Settable(i, "nick%i" % i, label="Setting %i" % i, min=0, max=count)
+                else:
+                    value = Settable("value %i" % i, "nick%i" % i, label="Setting %i" % i)
+                setattr(self, "setting%i" % i, value)
+    owner = Owner()
+    settings = Settings(os.path.join(path, "settings%i.json" % count))
+    settings.map_attrs(owner)
+    for i, attr in enumerate(settings.attributes):
+        attr.set_ctrl_id(10000+i)
+    return settings, owner
+
+def linearGetitem (settings, i):
+    for attr in settings.attributes:
+        if attr.name==i:
+            return attr
+    raise KeyError("'%s' not found" % i)
+
+def linearRefresh (settings, instance, *specific):
+    from globalPlugins.objloc.settings.panel import setValue
+    for attr in settings.attributes:
+        if not attr.belongs_to(instance):
+            continue
+        if (attr.value!=Ellipsis and attr.has_gui_control()) and (attr.name in specific or attr in specific or attr.ctrlId in specific or attr.nickname in specific):
+            setValue(attr, attr.get_gui_control(), getattr(instance, attr.name))
+            break
+
+def time (func, args, ops):
+    """
+    Returns the mean time of func(*a) in microseconds, a cycling through args.
+    """
+    n = len(args)
+    t = perf_counter_ns()
+    for i in range(ops):
+        func(*args[i%n])
+    return (perf_counter_ns()-t)/ops/1000.0
+
+def measure (count, path, ops=OPS, seed=1):
+    settings, owner = build(count, path)
+    rng = random.Random(seed)
+    names = ["setting%i" % rng.randrange(count) for i in range(256)]
+    nicks = ["nick%i" % rng.randrange(count) for i in range(256)]
+    ctrls = [10000+rng.randrange(count) for i in range(256)]
+    results = {"getitem": (time(linearGetitem, [(settings, n) for n in names], ops),
+                           time(settings.__getitem__, [(n,) for n in names], ops)),
+               "refresh name": (time(linearRefresh, [(settings, owner, n) for n in names], ops),
+                                time(settings.refresh_panel, [(owner, n) for n in names], ops)),
+               "refresh nickname": (time(linearRefresh, [(settings, owner, n) for n in nicks], ops),
+                                    time(settings.refresh_panel, [(owner, n) for n in nicks], ops)),
+               "refresh ctrlId": (time(linearRefresh, [(settings, owner, c) for c in ctrls], ops),
+                                  time(settings.refresh_panel, [(owner, c) for c in ctrls], ops))}
+    return {name: {"scan_us": scan, "indexed_us": indexed} for name, (scan, indexed) in results.items()}
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.settings", description="Settings lookup and refresh cost")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="numbers of settings to measure with (default %(default)s)")
+    parser.add_argument("--ops", type=int, default=OPS, help="lookups per measurement (default %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+    install()
+    from globalPlugins.objloc.settings.panel import Panel
+    Panel.opened.set()
+    with TemporaryDirectory() as tmp:
+        results = {count: measure(count, tmp, args.ops) for count in args.sizes}
+    if args.json:
+        print(json.dumps(results))
+        return 0
+    print("%8s %-18s %10s %12s %8s" % ("settings", "operation", "scan us", "indexed us", "speedup"))
+    for count, r in results.items():
+        for name, m in r.items():
+            print("%8i %-18s %10.2f %12.2f %7.0fx" % (count, name, m["scan_us"], m["indexed_us"], m["scan_us"]/max(m["indexed_us"], 1e-6)))
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
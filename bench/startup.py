@@ -0,0 +1,99 @@
+# Part of Object Location Tones benchmarks
+# Headless startup harness with an import-cost budget
+# Starts the global plugin in fresh interpreters against NVDA stand-ins,
+# collects the records of the built-in startup profiler (objloc.profiler)
+# and fails when the median total startup time exceeds the budget.
+# Usage:
+#   python -m bench.startup [--runs N] [--budget MS]
+# Exit status is 1 when over the budget.
+
+from statistics import median
+from tempfile   import TemporaryDirectory
+
+import subprocess
+import argparse
+import compileall
+import shutil
+import json
+import sys
+import os
+
+from .nvda import ADDON, ROOT
+
+BUDGET = 50.0  # Default budget for the whole startup in milliseconds
+RUNS   = 7
+
+def child (addon):
+    """
+    Runs inside the spawned interpreter: starts and terminates the plugin once.
+    The profile record is written by the plugin itself to OBJLOC_PROFILE_STARTUP.
+    """
+    from .nvda import install
+    install(addon)
+    import globalPlugins.objloc as objloc
+    plugin = objloc.GlobalPlugin()
+    plugin.terminate()
+
+def run (addon, record):
+    env = dict(os.environ, OBJLOC_PROFILE_STARTUP=record)
+    try:
+        os.unlink(record)
+    except FileNotFoundError:
+        pass
+    subprocess.run([sys.executable, "-m", "bench.startup", "--child", addon], cwd=ROOT, env=env, check=True)
+    with open(record, encoding="utf-8") as f:
+        return json.loads(f.readline())
+
+def measure (runs=RUNS):
+    """
+    Returns a list of profile records, one per run.
+    The add-on is copied to a temporary directory first, so that the settings file
+    created by the plugin does not land in the source tree, and byte-compiled,
+    as NVDA would have it after the first start. One warm-up run that creates
+    the settings file is not counted.
+    """
+    with TemporaryDirectory() as tmp:
+        addon = os.path.join(tmp, "addon")
+        shutil.copytree(os.path.join(ADDON, "globalPlugins"), os.path.join(addon, "globalPlugins"),
+                        ignore=shutil.ignore_patterns("__pycache__", "settings.json", "*.tmp"))
+        compileall.compile_dir(addon, quiet=1)
+        record = os.path.join(tmp, "profile.json")
+        run(addon, record)
+        return [run(addon, record) for _ in range(runs)]
+
+def summarize (records):
+    """
+    Returns ([(phase, median ms), ...], median total ms) over the records.
+    """
+    names = []
+    for r in records:
+        for p in r["phases"]:
+            if p["phase"] not in names:
+                names.append(p["phase"])
+    phases = [(name, median(next((p["ms"] for p in r["phases"] if p["phase"]==name), 0.0) for r in records)) for name in names]
+    return phases, median(r["total_ms"] for r in records)
+
+def main (argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.startup", description="Object Location Tones startup-time budget check")
+    parser.add_argument("--runs", type=int, default=RUNS, help="number of measured starts (default %(default)s)")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="maximal median total startup time in ms (default %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(args.child)
+        return 0
+    phases, total = summarize(measure(args.runs))
+    over = total>args.budget
+    if args.json:
+        print(json.dumps({"phases": dict(phases), "total_ms": total, "budget_ms": args.budget, "over_budget": over}))
+    else:
+        for name, ms in phases:
+            print("%-14s %9.3f ms" % (name, ms))
+        print("%-14s %9.3f ms (budget %.1f ms)" % ("total", total, args.budget))
+        if over:
+            print("Startup is over the budget by %.3f ms" % (total-args.budget))
+    return 1 if over else 0
+
+if __name__=="__main__":
+    sys.exit(main())
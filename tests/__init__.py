@@ -0,0 +1,5 @@
+# Tests of Object Location Tones
+# Nothing here is shipped with the add-on
+# They run the add-on outside of NVDA, against the stand-ins of NVDA modules from bench.nvda
+# Run them from the repository root:
+#   python -m pytest tests
@@ -0,0 +1,12 @@
+# Part of Object Location Tones tests
+# Installs the stand-ins of NVDA modules before the add-on is imported
+
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from bench.nvda import install
+install()
@@ -0,0 +1,61 @@
+# Part of Object Location Tones tests
+# Cross-process lock files of the settings
+
+from time import time
+
+import os
+
+from globalPlugins.objloc.settings.locking import FileLock
+
+def write_lock (lock, pid, token):
+    with open(lock.path, "w") as f:
+        f.write("%i %s\n" % (pid, token))
+
+def test_lock_of_another_filelock_of_this_process_is_not_stale (tmp_path):
+    target = str(tmp_path/"settings.json")
+    first, second = FileLock(target), FileLock(target)
+    first.acquire(0)
+    try:
+        assert not second.is_stale(second._read(second.path))
+    finally:
+        first.release()
+    # Left over by this process, as no FileLock() holds the token
+    write_lock(first, os.getpid(), "0123456789abcdef")
+    assert second.is_stale(second._read(second.path))
+    second.acquire(0)
+    second.release()
+    assert not os.path.exists(second.path)
+
+def test_break_puts_back_a_lock_retaken_meanwhile (tmp_path):
+    target = str(tmp_path/"settings.json")
+    holder, breaker = FileLock(target), FileLock(target)
+    holder.acquire(0)
+    # What the breaker saw before the lock was broken and retaken by the holder
+    breaker._break((os.getpid(), "0123456789abcdef"))
+    assert holder._read(holder.path)==(os.getpid(), holder.token)
+    assert os.listdir(str(tmp_path))==["settings.json.lock"]
+    holder.release()
+    assert not os.path.exists(holder.path)
+
+def test_release_leaves_a_lock_taken_by_someone_else (tmp_path):
+    target = str(tmp_path/"settings.json")
+    lock = FileLock(target)
+    lock.acquire(0)
+    # Broken and retaken by another process while held
+    write_lock(lock, 1, "fedcba9876543210")
+    lock.release()
+    assert lock._read(lock.path)==(1, "fedcba9876543210")
+    assert os.listdir(str(tmp_path))==["settings.json.lock"]
+
+def test_refresh_keeps_a_long_held_lock_from_becoming_stale (tmp_path):
+    target = str(tmp_path/"settings.json")
+    holder, other = FileLock(target), FileLock(target)
+    holder.acquire(0)
+    try:
+        old = time()-2*FileLock.stale_after
+        os.utime(holder.path, (old, old))
+        assert other.is_stale(other._read(other.path))
+        holder.refresh()
+        assert not other.is_stale(other._read(other.path))
+    finally:
+        holder.release()
@@ -0,0 +1,16 @@
+# Part of Object Location Tones tests
+# Errors counted by the hot path metrics
+
+from types import SimpleNamespace
+
+from globalPlugins.objloc import metrics, GlobalPlugin
+
+def test_error_swallowed_by_a_handler_is_counted (monkeypatch):
+    registry = metrics.Metrics(True)
+    monkeypatch.setattr(metrics, "registry", registry)
+    plugin = SimpleNamespace(focusing=False, processing=False, caret=False)
+    passed = []
+    # An object without a location, like one that died meanwhile
+    GlobalPlugin._on_becomeNavigatorObject(plugin, object(), lambda: passed.append(True))
+    assert passed==[True]
+    assert registry.stage("event_becomeNavigatorObject").errors=={"LocationError": 1}
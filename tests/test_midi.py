@@ -0,0 +1,27 @@
+# Part of Object Location Tones tests
+# The command ring and the player thread of the midi package
+
+from globalPlugins.objloc.midi.ring   import Ring
+from globalPlugins.objloc.midi.player import Player
+
+class Output (object):
+    """
+    Accepts and forgets whatever the player sends.
+    """
+    def __getattr__ (self, name):
+        return lambda *args, **kwargs: None
+
+def test_ring_push_tells_empty_and_full ():
+    ring = Ring(2)
+    assert ring.push(1) is True
+    assert ring.push(2) is False
+    assert ring.push(3) is None
+    assert ring.pop()==1
+    assert ring.pop()==2
+    assert ring.pop() is None
+
+def test_player_thread_ends_on_quit ():
+    player = Player(Output())
+    player.stop()
+    player.quit()
+    assert not player.is_alive()
@@ -0,0 +1,52 @@
+# Part of Object Location Tones tests
+# Tone tables of the pitch scales, for beeps and MIDI
+
+import pytest
+
+from globalPlugins.objloc import posTones
+
+PENTATONIC = {0, 2, 4, 7, 9} # Pitch classes of the major pentatonic scale from C
+
+@pytest.fixture
+def scale ():
+    """
+    Yields a function selecting a pitch scale over 220 to 880 Hz with a bend range of 2 semitones,
+    and restores the module's settings afterwards.
+    """
+    saved = (posTones.minPitch, posTones.maxPitch, posTones.bendRange, posTones.pitchScale)
+    posTones.minPitch, posTones.maxPitch, posTones.bendRange = 220, 880, 2.0
+    def select (index):
+        posTones.setPitchScale(index)
+    yield select
+    posTones.minPitch, posTones.maxPitch, posTones.bendRange = saved[:3]
+    posTones.setPitchScale(saved[3])
+
+def pitches (table):
+    """
+    Returns the pitches of (note, bend) pairs in fractional MIDI notes.
+    """
+    return [n+bend*posTones.bendRange/8192.0 for n, bend in table]
+
+def test_log_scale_notes_are_equal_intervals (scale):
+    scale(posTones.pitchScales.index(posTones.logScale))
+    notes = pitches(posTones.noteTable(10))
+    steps = [a-b for a, b in zip(notes, notes[1:])]
+    # Two octaves over ten rows
+    assert steps == pytest.approx([2.4]*10, abs=0.01)
+    assert notes[0] == pytest.approx(posTones.hzToNote(880))
+    assert notes[-1] == pytest.approx(posTones.hzToNote(220))
+
+def test_pentatonic_scale_notes_are_pentatonic (scale):
+    scale(posTones.pitchScales.index(posTones.pentatonicScale))
+    table = posTones.noteTable(10)
+    assert all(bend==0 for n, bend in table)
+    notes = [n for n, bend in table]
+    assert all(n%12 in PENTATONIC for n in notes)
+    assert notes == sorted(notes, reverse=True)
+    assert (notes[0], notes[-1]) == (81, 57)
+
+def test_note_table_matches_hz_table (scale):
+    for index in range(len(posTones.pitchScales)):
+        scale(index)
+        for hz, pitch in zip(posTones.hzTable(10), pitches(posTones.noteTable(10))):
+            assert pitch == pytest.approx(posTones.hzToNote(hz), abs=0.001)
@@ -0,0 +1,28 @@
+# Part of Object Location Tones tests
+# Settings file formats and commit strategies
+
+import pytest
+import mmap
+
+from globalPlugins.objloc.settings.serialization import Format, JSONFormat
+from globalPlugins.objloc.settings.commit        import Committer
+
+def test_incomplete_format_fails_when_created ():
+    class Incomplete (Format):
+        name = "incomplete"
+        def dumps (self, d):
+            return b""
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_json_loads_from_a_mapped_file (tmp_path):
+    path = tmp_path/"settings.json"
+    path.write_bytes(b"\xef\xbb\xbf"+JSONFormat().dumps({"duration": 40, "name": "é"}))
+    with open(str(path), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        assert JSONFormat().loads(data)=={"duration": 40, "name": "é"}
+
+def test_incomplete_committer_fails_when_created ():
+    class Incomplete (Committer):
+        name = "incomplete"
+    with pytest.raises(TypeError):
+        Incomplete()
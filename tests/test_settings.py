@@ -0,0 +1,133 @@
+# Part of Object Location Tones tests
+# Deferred saves, tracked assignments and profiles of the settings
+
+from threading import Event
+
+import pytest
+import json
+import gc
+import os
+
+from globalPlugins.objloc.settings import Settings, Settable
+
+class Options (object):
+    def __init__ (self):
+        self.value = Settable(1)
+
+def test_value_changed_back_during_a_write_is_written (tmp_path):
+    path = os.path.join(str(tmp_path), "settings.json")
+    settings = Settings(path)
+    options = Options()
+    settings.load(options)
+    started = Event()
+    proceed = Event()
+    write = settings.writer.write
+    def blocking (d, changed):
+        started.set()
+        proceed.wait(5)
+        return write(d, changed)
+    settings.writer.write = blocking
+    settings.writer.delay = 0.0
+    options.value = 2
+    settings.save(options, defer=True)
+    assert started.wait(5)
+    # Back to the value in the file while 2 is being written
+    options.value = 1
+    settings.save(options, defer=True)
+    proceed.set()
+    settings.close()
+    attr = settings.by_name["value"]
+    with open(path) as f:
+        assert json.load(f)[attr.nickname]==1
+    assert attr.original==1
+    assert not attr.has_changed()
+
+def test_tracked_instance_entry_is_dropped_when_collected (tmp_path):
+    settings = Settings(os.path.join(str(tmp_path), "settings.json"))
+    options = Options()
+    settings.map_attrs(options)
+    tracker = Options.__dict__["value"]
+    assert id(options) in tracker.notify
+    options.value = 3
+    assert settings.by_name["value"] in settings.dirty
+    i = id(options)
+    # The Attribute()s hold the instance, so they go first
+    settings = None
+    options = None
+    gc.collect()
+    assert i not in tracker.notify
+
+class Profiled (object):
+    def __init__ (self):
+        self.duration = Settable(40)
+        self.mode     = Settable(0)
+
+@pytest.fixture
+def profiled (tmp_path):
+    """
+    Yields a Settings() with a profile "app" overriding the duration of the loaded Profiled() by 80.
+    """
+    settings = Settings(os.path.join(str(tmp_path), "settings.json"))
+    instance = Profiled()
+    settings.load(instance)
+    settings.profiles.set("app", settings.by_name["duration"].nickname, 80)
+    yield settings, instance
+    settings.close()
+
+def test_profile_keeps_the_base_value (profiled):
+    settings, instance = profiled
+    attr = settings.by_name["duration"]
+    settings.profiles.switch("app")
+    assert instance.duration==80
+    settings.save(instance)
+    with open(settings.path) as f:
+        assert json.load(f)[attr.nickname]==40
+    settings.profiles.switch(None)
+    assert instance.duration==40
+    assert not attr.has_changed()
+
+def test_assignment_while_a_profile_is_active_goes_into_it (profiled):
+    settings, instance = profiled
+    nickname = settings.by_name["duration"].nickname
+    settings.profiles.switch("app")
+    instance.duration = 100
+    settings.profiles.switch(None)
+    assert instance.duration==40
+    assert settings.profiles.get("app")=={nickname: 100}
+    settings.profiles.switch("app")
+    assert instance.duration==100
+
+def test_profiles_survive_a_save (profiled):
+    settings, instance = profiled
+    nickname = settings.by_name["mode"].nickname
+    settings.profiles.set("other", nickname, 2)
+    settings.save(instance)
+    assert not settings.profiles.pending()
+    loaded = Settings(settings.path)
+    loaded.load(Profiled())
+    assert loaded.profiles.get("app")==settings.profiles.get("app")
+    assert loaded.profiles.get("other")=={nickname: 2}
+
+def test_remove_from_the_active_profile_restores_the_base_value (profiled):
+    settings, instance = profiled
+    nickname = settings.by_name["mode"].nickname
+    settings.profiles.set("app", nickname, 3)
+    settings.profiles.switch("app")
+    assert (instance.duration, instance.mode)==(80, 3)
+    settings.profiles.remove("app", settings.by_name["duration"].nickname)
+    assert (instance.duration, instance.mode)==(40, 3)
+    settings.profiles.remove("app")
+    assert (instance.duration, instance.mode)==(40, 0)
+    assert settings.profiles.get("app")=={}
+
+def test_listeners_get_the_changed_attributes (profiled):
+    settings, instance = profiled
+    calls = []
+    settings.profiles.listen(calls.append)
+    settings.profiles.switch("app")
+    settings.profiles.switch("app")
+    settings.profiles.switch("elsewhere")
+    assert calls==[[settings.by_name["duration"]], [settings.by_name["duration"]]]
+    # A switch between applications without overrides changes nothing
+    settings.profiles.switch(None)
+    assert len(calls)==2
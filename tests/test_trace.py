@@ -0,0 +1,20 @@
+# Part of Object Location Tones tests
+# Recording of the handled events
+
+from globalPlugins.objloc import trace
+
+def test_mouse_event_with_position_by_name_is_recorded (tmp_path, monkeypatch):
+    path = str(tmp_path/"objloc.trace")
+    recorder = trace.TraceRecorder(path)
+    monkeypatch.setattr(trace, "recorder", recorder)
+    class Plugin (object):
+        @trace.traced(trace.EVENT_MOUSE)
+        def event_mouseMove (self, obj, nextHandler, x, y):
+            nextHandler()
+    plugin = Plugin()
+    # As NVDA calls it
+    plugin.event_mouseMove(None, lambda: None, x=120, y=45)
+    plugin.event_mouseMove(None, lambda: None, 300, 200)
+    recorder.close()
+    mouse = [fields for kind, t, fields in trace.readTrace(path) if kind==trace.EVENT_MOUSE]
+    assert [fields[-2:] for fields in mouse]==[(120, 45), (300, 200)]
@@ -0,0 +1,57 @@
+# Part of Object Location Tones tests
+# Text metrics of editables for caret positions
+
+import pytest
+
+from globalPlugins.objloc import utils
+
+class Editable (object):
+    """
+    An editable of a browser document, which shares its window handle with all others of the document.
+    """
+    windowHandle = 0x1234
+    def __init__ (self, uniqueID, location):
+        self.IA2UniqueID = uniqueID
+        self.location    = location
+
+@pytest.fixture
+def measured (monkeypatch):
+    """
+    Yields the list of editables measured, whose metrics have their IA2UniqueID as the line height,
+    and none for those with a negative one, which are empty.
+    """
+    done = []
+    def measure (obj, scale=1.0):
+        done.append(obj)
+        m = utils.TextMetrics.default(scale)
+        if obj.IA2UniqueID>=0:
+            m.lineHeight, m.measured = obj.IA2UniqueID, True
+        return m
+    monkeypatch.setattr(utils, "measureTextMetrics", measure)
+    utils.invalidateTextMetrics()
+    yield done
+    utils.invalidateTextMetrics()
+
+def test_editables_sharing_a_window_have_their_own_metrics (measured):
+    first, second = Editable(20, (0, 0, 200, 30)), Editable(40, (0, 50, 200, 60))
+    assert utils.getTextMetrics(first).lineHeight==20
+    assert utils.getTextMetrics(second).lineHeight==40
+    # A new object for the same editable
+    assert utils.getTextMetrics(Editable(20, (0, 0, 200, 30))).lineHeight==20
+    assert len(measured)==2
+
+def test_editable_is_measured_again_after_its_size_changed (measured):
+    utils.getTextMetrics(Editable(20, (0, 0, 200, 30)))
+    utils.getTextMetrics(Editable(20, (0, 0, 200, 30)))
+    # Resized, e.g. by a larger font
+    utils.getTextMetrics(Editable(20, (0, 0, 200, 45)))
+    assert len(measured)==2
+
+def test_empty_editable_is_measured_once_while_empty (measured):
+    empty = Editable(-1, (0, 0, 200, 30))
+    for i in range(3):
+        assert not utils.getTextMetrics(empty, empty=True).measured
+    assert len(measured)==1
+    # Once it has text, unmeasured metrics are not kept
+    utils.getTextMetrics(empty)
+    assert len(measured)==2